@@ -1,19 +1,44 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import Babysitter, Meetings, Requests
 from .models import Parents
 from .models import Kids
 from .models import Reviews
 from .models import AvailableTime
+from .availability import refresh_availability
 
 
+class AvailabilityRefreshAdmin(admin.ModelAdmin):
+    """
+    Keep the free slots and day bitmaps in sync with available times / meetings edited in the admin.
+    """
+    def save_model(self, request, obj, form, change):
+        old = None
+        if change:
+            old = type(obj).objects.filter(pk=obj.pk).values_list('babysitter_id', 'start_time', 'end_time').first()
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if old:
+                refresh_availability(*old)
+            refresh_availability(obj.babysitter_id, obj.start_time, obj.end_time)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            refresh_availability(obj.babysitter_id, obj.start_time, obj.end_time)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = list(queryset.values_list('babysitter_id', 'start_time', 'end_time'))
+            super().delete_queryset(request, queryset)
+            for babysitter_id, start_time, end_time in rows:
+                refresh_availability(babysitter_id, start_time, end_time)
+
 
 admin.site.register(Kids)
-admin.site.register(Meetings)
+admin.site.register(Meetings, AvailabilityRefreshAdmin)
 admin.site.register(Reviews)
-admin.site.register(AvailableTime)
+admin.site.register(AvailableTime, AvailabilityRefreshAdmin)
 admin.site.register(Requests)
 admin.site.register(Parents)
 admin.site.register(Babysitter)
-
-
-
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class BaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'base'
+
+    def ready(self):
+        # Connect the response cache invalidation signals
+        from . import caching  # noqa: F401
+        # Connect the delta sync tombstone signals
+        from . import sync  # noqa: F401
+        # Connect the address geocoding signals
+        from . import geo  # noqa: F401
+        # Register the search trigger check and reinstall the triggers dropped by migrations
+        from . import search  # noqa: F401
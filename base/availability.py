@@ -0,0 +1,260 @@
+# Free-slot computation: available windows minus approved meetings
+
+import heapq
+from collections import Counter, deque
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from .models import Babysitter, AvailableTime, Meetings, FreeSlot
+from .bitmaps import refresh_day_bitmaps
+from .caching import invalidate
+from .recurring import recurring_window, recurring_intervals, babysitters_with_recurring_cover
+
+def subtract_intervals(available, busy):
+    """
+    Subtract the busy intervals from the available intervals in a single merge pass.
+    - **available** (iterable): (start, end, *extra) tuples sorted by start.
+    - **busy** (iterable): (start, end) pairs sorted by start.
+
+    Yields the free (start, end, *extra) tuples in start order, where extra is copied from the
+    available interval the free part belongs to. Busy intervals are pulled lazily, so both
+    inputs can be streamed straight from the database.
+    """
+    busy = iter(busy)
+    pending = next(busy, None)
+    # Busy intervals that may still overlap the current or a later available interval
+    window = deque()
+
+    for avail_start, avail_end, *extra in available:
+        # Pull every busy interval that starts before this available interval ends
+        while pending is not None and pending[0] < avail_end:
+            window.append(pending)
+            pending = next(busy, None)
+        # Available intervals are sorted by start, so these can never overlap again
+        while window and window[0][1] <= avail_start:
+            window.popleft()
+
+        cursor = avail_start
+        for busy_start, busy_end in window:
+            if busy_start >= avail_end:
+                break
+            if busy_end <= cursor:
+                continue
+            if busy_start > cursor:
+                yield (cursor, busy_start, *extra)
+            cursor = busy_end
+            if cursor >= avail_end:
+                break
+        if cursor < avail_end:
+            yield (cursor, avail_end, *extra)
+
+def _in_window(queryset, start, end):
+    """
+    Restrict an interval queryset to the rows overlapping the [start, end) window.
+    """
+    if start is not None:
+        queryset = queryset.filter(end_time__gt=start)
+    if end is not None:
+        queryset = queryset.filter(start_time__lt=end)
+    return queryset
+
+def available_intervals(babysitter_id, start=None, end=None):
+    """
+    Stream the babysitter's available (start, end, id) tuples sorted by start time.
+    """
+    queryset = AvailableTime.objects.filter(babysitter_id=babysitter_id)
+    return (_in_window(queryset, start, end)
+            .order_by('start_time', 'end_time')
+            .values_list('start_time', 'end_time', 'id')
+            .iterator())
+
+def busy_intervals(babysitter_id, start=None, end=None):
+    """
+    Stream the babysitter's approved meeting (start, end) pairs sorted by start time.
+    """
+    queryset = Meetings.objects.filter(babysitter_id=babysitter_id, status='approved')
+    return (_in_window(queryset, start, end)
+            .order_by('start_time', 'end_time')
+            .values_list('start_time', 'end_time')
+            .iterator())
+
+def compute_free_slots(babysitter_id, start=None, end=None):
+    """
+    Compute the free (start, end, available_time_id) tuples of a babysitter from the source tables.
+    """
+    return subtract_intervals(available_intervals(babysitter_id, start, end),
+                              busy_intervals(babysitter_id, start, end))
+
+def free_slots(babysitter_id, start=None, end=None):
+    """
+    Return the free time slots of a babysitter (available and not busy with an approved meeting).
+    - **babysitter_id** (int): The id of the babysitter.
+    - **start** (datetime, optional): Only return free time after this moment.
+    - **end** (datetime, optional): Only return free time before this moment.
+
+    Concrete slots are read from the materialized FreeSlot table. Recurring availability is
+    expanded for the window only (see recurring_window). Slots crossing the window edges are
+    clipped to the window.
+    """
+    queryset = FreeSlot.objects.filter(babysitter_id=babysitter_id)
+    concrete = (_in_window(queryset, start, end)
+                .order_by('start_time', 'end_time')
+                .values_list('start_time', 'end_time')
+                .iterator())
+    recurring_start, recurring_end = recurring_window(start, end)
+    recurring = ((max(slot_start, recurring_start), min(slot_end, recurring_end))
+                 for slot_start, slot_end in subtract_intervals(
+                     recurring_intervals(babysitter_id, recurring_start, recurring_end),
+                     busy_intervals(babysitter_id, recurring_start, recurring_end)))
+
+    slots = []
+    for slot_start, slot_end in heapq.merge(concrete, recurring):
+        if start is not None and slot_start < start:
+            slot_start = start
+        if end is not None and slot_end > end:
+            slot_end = end
+        if slot_start < slot_end:
+            slots.append({'start_time': slot_start, 'end_time': slot_end})
+    return slots
+
+def refresh_free_slots(babysitter_id, start=None, end=None):
+    """
+    Recompute the materialized free slots of the babysitter's available times overlapping the window.
+    - **babysitter_id** (int): The id of the babysitter.
+    - **start** (datetime, optional): The start of the changed time period.
+    - **end** (datetime, optional): The end of the changed time period.
+
+    Called in the same transaction as the write that changed an available time or an approved
+    meeting, so only the available times touched by that write are recomputed.
+    """
+    available = list(available_intervals(babysitter_id, start, end))
+    if start is None and end is None:
+        FreeSlot.objects.filter(babysitter_id=babysitter_id).delete()
+    else:
+        FreeSlot.objects.filter(available_time_id__in=[row[2] for row in available]).delete()
+    if not available:
+        return
+
+    # Available times overlapping the window may stretch beyond it
+    busy = busy_intervals(babysitter_id, available[0][0], max(row[1] for row in available))
+    FreeSlot.objects.bulk_create(
+        (FreeSlot(babysitter_id=babysitter_id, available_time_id=available_time_id,
+                  start_time=slot_start, end_time=slot_end)
+         for slot_start, slot_end, available_time_id in subtract_intervals(available, busy)),
+        batch_size=500
+    )
+
+def refresh_availability(babysitter_id, start=None, end=None):
+    """
+    Recompute everything derived from the babysitter's available times and approved meetings
+    (free slots and day bitmaps) for the given time period, or for all time if omitted.
+
+    Must be called in the same transaction as the write that changed the source rows.
+    """
+    refresh_free_slots(babysitter_id, start, end)
+    refresh_day_bitmaps(babysitter_id, start, end)
+    # Bulk writes (coalescing, batch booking, declines) send no model signals
+    invalidate(f'availability:{babysitter_id}')
+
+def coalesce_available_time(available_time):
+    """
+    Merge the available times of the babysitter that overlap or touch the given one into it.
+
+    Must be called in a transaction. The babysitter row is locked so concurrent writes of the same
+    babysitter can not merge the same rows twice. Returns the merged available time.
+    """
+    Babysitter.objects.select_for_update().only('id').get(id=available_time.babysitter_id)
+    start, end = available_time.start_time, available_time.end_time
+    merged_ids = set()
+    while True:
+        # Extending the period may reach rows that only touch the previously merged ones
+        touching = list(AvailableTime.objects
+                        .filter(babysitter_id=available_time.babysitter_id, start_time__lte=end, end_time__gte=start)
+                        .exclude(id__in=merged_ids | {available_time.id})
+                        .values_list('id', 'start_time', 'end_time'))
+        if not touching:
+            break
+        for row_id, row_start, row_end in touching:
+            merged_ids.add(row_id)
+            start, end = min(start, row_start), max(end, row_end)
+
+    if merged_ids:
+        AvailableTime.objects.filter(id__in=merged_ids).delete()
+        available_time.start_time, available_time.end_time = start, end
+        available_time.save(update_fields=['start_time', 'end_time', 'updated_at'])
+    return available_time
+
+def coalesce_babysitter_available_times(babysitter_id):
+    """
+    Merge all overlapping or touching available times of a babysitter in one sorted pass.
+
+    Must be called in a transaction. Returns the number of deleted (merged away) rows.
+    """
+    Babysitter.objects.select_for_update().only('id').get(id=babysitter_id)
+    rows = (AvailableTime.objects.filter(babysitter_id=babysitter_id)
+            .order_by('start_time', 'end_time')
+            .values_list('id', 'start_time', 'end_time'))
+
+    # Runs of rows that overlap or touch: [kept id, start, end, changed]
+    runs, merged_ids = [], []
+    for row_id, row_start, row_end in rows:
+        if runs and row_start <= runs[-1][2]:
+            merged_ids.append(row_id)
+            if row_end > runs[-1][2]:
+                runs[-1][2] = row_end
+            runs[-1][3] = True
+        else:
+            runs.append([row_id, row_start, row_end, False])
+    if not merged_ids:
+        return 0
+
+    for offset in range(0, len(merged_ids), 500):
+        AvailableTime.objects.filter(id__in=merged_ids[offset:offset + 500]).delete()
+    now = timezone.now()
+    AvailableTime.objects.bulk_update(
+        [AvailableTime(id=row_id, start_time=start, end_time=end, updated_at=now)
+         for row_id, start, end, changed in runs if changed],
+        ['end_time', 'updated_at'],
+        batch_size=500
+    )
+    refresh_availability(babysitter_id)
+    return len(merged_ids)
+
+def free_slots_drift(babysitter_id):
+    """
+    Compare the materialized free slots of a babysitter with the ones computed from the source tables.
+
+    Returns a (missing, unexpected) pair of sorted (start, end, available_time_id) lists.
+    """
+    expected = Counter(compute_free_slots(babysitter_id))
+    stored = Counter(FreeSlot.objects.filter(babysitter_id=babysitter_id)
+                     .values_list('start_time', 'end_time', 'available_time_id')
+                     .iterator())
+    return sorted((expected - stored).elements()), sorted((stored - expected).elements())
+
+def babysitters_free_between(start, end):
+    """
+    Return the active babysitters that are free for the whole [start, end) window.
+
+    A babysitter is free when one of their materialized free slots or a recurring occurrence covers
+    the window, and no approved meeting overlaps or touches it (the rule book_meeting applies, so
+    every listed babysitter can be booked for the window).
+    """
+    covering = FreeSlot.objects.filter(
+        babysitter=OuterRef('pk'),
+        start_time__lte=start,
+        end_time__gte=end
+    )
+    # Same condition as booking.conflicting_meetings
+    conflicting = Meetings.objects.filter(
+        babysitter=OuterRef('pk'),
+        status='approved',
+        start_time__lte=end,
+        end_time__gte=start
+    )
+    # Every candidate gets the exact subquery: the day bitmaps lag the meetings approved without
+    # refresh_availability (admin, direct ORM writes), so they can not prove a babysitter idle
+    candidates = babysitters_with_recurring_cover(start, end)
+    return (Babysitter.objects
+            .filter(user__is_active=True)
+            .filter(Q(Exists(covering)) | Q(id__in=candidates))
+            .filter(~Exists(conflicting)))
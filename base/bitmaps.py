@@ -0,0 +1,211 @@
+# Per-day bitmaps of 15 minutes buckets: containment and overlap checks become bitwise operations
+
+from datetime import datetime, time, timedelta, timezone
+from django.db.models import Min, Max
+from .models import AvailableTime, Meetings, DayBitmap
+
+BUCKET = timedelta(minutes=15)
+BUCKETS_PER_DAY = 96
+BITMAP_BYTES = BUCKETS_PER_DAY // 8
+
+def to_bytes(bits):
+    return bits.to_bytes(BITMAP_BYTES, 'little')
+
+def from_bytes(blob):
+    return int.from_bytes(blob, 'little')
+
+def _day_start(moment):
+    moment = moment.astimezone(timezone.utc)
+    return datetime.combine(moment.date(), time(), tzinfo=timezone.utc)
+
+def _day_range(start, end):
+    """
+    Return the start of the first UTC day touched by [start, end] and the number of days touched.
+    """
+    first = _day_start(start)
+    return first, (_day_start(end) - first).days + 1
+
+def _span(first, last):
+    """
+    Bits first..last-1 set (clipped at bit 0).
+    """
+    first = max(first, 0)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def inner_mask(origin, start, end):
+    """
+    Mask of the buckets (counted from origin) fully covered by [start, end).
+    """
+    return _span(-((origin - start) // BUCKET), (end - origin) // BUCKET)
+
+def closed_mask(origin, start, end):
+    """
+    Mask of the buckets (counted from origin) touched by the closed period [start, end].
+    """
+    return _span((start - origin) // BUCKET, (end - origin) // BUCKET + 1)
+
+def _merged(intervals):
+    """
+    Merge sorted (start, end) pairs that overlap or touch, so unaligned neighbours still fill a bucket.
+    """
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def compute_bitmaps(babysitter_id, origin, days):
+    """
+    Compute the (available, busy) bits of a babysitter for `days` days from origin, from the source tables.
+    """
+    range_end = origin + timedelta(days=days)
+    available = 0
+    intervals = (AvailableTime.objects
+                 .filter(babysitter_id=babysitter_id, start_time__lt=range_end, end_time__gt=origin)
+                 .order_by('start_time')
+                 .values_list('start_time', 'end_time'))
+    for start, end in _merged(intervals):
+        available |= inner_mask(origin, start, end)
+
+    busy = 0
+    meetings = (Meetings.objects
+                .filter(babysitter_id=babysitter_id, status='approved', start_time__lt=range_end, end_time__gte=origin)
+                .values_list('start_time', 'end_time'))
+    for start, end in meetings:
+        busy |= closed_mask(origin, start, end)
+
+    size = (1 << (days * BUCKETS_PER_DAY)) - 1
+    return available & size, busy & size
+
+def _source_range(babysitter_id):
+    """
+    Return the (start, end) period covered by all available times and approved meetings of a babysitter.
+    """
+    bounds = [
+        AvailableTime.objects.filter(babysitter_id=babysitter_id)
+        .aggregate(start=Min('start_time'), end=Max('end_time')),
+        Meetings.objects.filter(babysitter_id=babysitter_id, status='approved')
+        .aggregate(start=Min('start_time'), end=Max('end_time')),
+    ]
+    starts = [bound['start'] for bound in bounds if bound['start'] is not None]
+    ends = [bound['end'] for bound in bounds if bound['end'] is not None]
+    if not starts:
+        return None, None
+    return min(starts), max(ends)
+
+def _split_days(origin, days, available, busy):
+    """
+    Yield the (day, available, busy) bits of every day that has any bit set.
+    """
+    full_day = (1 << BUCKETS_PER_DAY) - 1
+    for offset in range(days):
+        shift = offset * BUCKETS_PER_DAY
+        day_available = (available >> shift) & full_day
+        day_busy = (busy >> shift) & full_day
+        if day_available or day_busy:
+            yield (origin + timedelta(days=offset)).date(), day_available, day_busy
+
+def refresh_day_bitmaps(babysitter_id, start=None, end=None):
+    """
+    Recompute the day bitmaps of a babysitter for the days touched by the given period (all days if omitted).
+    """
+    bitmaps = DayBitmap.objects.filter(babysitter_id=babysitter_id)
+    if start is None and end is None:
+        bitmaps.delete()
+        start, end = _source_range(babysitter_id)
+        if start is None:
+            return
+    origin, days = _day_range(start, end)
+    bitmaps.filter(day__gte=origin.date(), day__lt=(origin + timedelta(days=days)).date()).delete()
+
+    available, busy = compute_bitmaps(babysitter_id, origin, days)
+    DayBitmap.objects.bulk_create(
+        (DayBitmap(babysitter_id=babysitter_id, day=day, available=to_bytes(day_available), busy=to_bytes(day_busy))
+         for day, day_available, day_busy in _split_days(origin, days, available, busy)),
+        batch_size=500
+    )
+
+def load_bitmaps(babysitter_id, origin, days):
+    """
+    Read the stored (available, busy) bits of a babysitter for `days` days from origin, as single integers.
+    """
+    available = busy = 0
+    rows = (DayBitmap.objects
+            .filter(babysitter_id=babysitter_id, day__gte=origin.date(),
+                    day__lt=(origin + timedelta(days=days)).date())
+            .values_list('day', 'available', 'busy'))
+    for day, day_available, day_busy in rows:
+        shift = (day - origin.date()).days * BUCKETS_PER_DAY
+        available |= from_bytes(day_available) << shift
+        busy |= from_bytes(day_busy) << shift
+    return available, busy
+
+def check_window(origin, available, busy, start, end):
+    """
+    Check a [start, end) window against loaded bits (see load_bitmaps).
+
+    Returns a (may_be_available, may_be_busy) pair. Both are necessary conditions: when
+    may_be_available is False no available time covers the window, and when may_be_busy is False
+    no approved meeting overlaps or touches it. Otherwise the exact range query decides.
+
+    The bits are only as fresh as the last refresh_availability, so a meeting approved without one
+    is missing from may_be_busy: conflict checks always run the exact query.
+    """
+    inner = inner_mask(origin, start, end)
+    return available & inner == inner, busy & closed_mask(origin, start, end) != 0
+
+def load_window(babysitter_id, start, end):
+    """
+    Read the stored bits of a babysitter for the days touched by [start, end] in one query.
+
+    Returns an (origin, available, busy) tuple to pass to check_window.
+    """
+    origin, days = _day_range(start, end)
+    return (origin, *load_bitmaps(babysitter_id, origin, days))
+
+def bitmap_check(babysitter_id, start, end):
+    """
+    Check a single [start, end) window of a babysitter with one bitmap read (see check_window).
+    """
+    origin, available, busy = load_window(babysitter_id, start, end)
+    return check_window(origin, available, busy, start, end)
+
+def bitmap_checks(babysitter_ids, start, end):
+    """
+    Check a [start, end) window for many babysitters with one bitmap read (see check_window).
+
+    Returns a {babysitter_id: (may_be_available, may_be_busy)} dict. The window masks are computed
+    once and every babysitter's bits are tested with the same two bitwise operations.
+    """
+    origin, days = _day_range(start, end)
+    inner, closed = inner_mask(origin, start, end), closed_mask(origin, start, end)
+    bits = dict.fromkeys(babysitter_ids, (0, 0))
+    rows = (DayBitmap.objects
+            .filter(babysitter_id__in=list(bits), day__gte=origin.date(),
+                    day__lt=(origin + timedelta(days=days)).date())
+            .values_list('babysitter_id', 'day', 'available', 'busy'))
+    for babysitter_id, day, day_available, day_busy in rows:
+        shift = (day - origin.date()).days * BUCKETS_PER_DAY
+        available, busy = bits[babysitter_id]
+        bits[babysitter_id] = (available | from_bytes(day_available) << shift, busy | from_bytes(day_busy) << shift)
+    return {babysitter_id: (available & inner == inner, busy & closed != 0)
+            for babysitter_id, (available, busy) in bits.items()}
+
+def day_bitmaps_drift(babysitter_id):
+    """
+    Return the number of days whose stored bitmap differs from the one computed from the source tables.
+    """
+    stored = {day: (from_bytes(available), from_bytes(busy)) for day, available, busy in
+              DayBitmap.objects.filter(babysitter_id=babysitter_id).values_list('day', 'available', 'busy')}
+    expected = {}
+    start, end = _source_range(babysitter_id)
+    if start is not None:
+        origin, days = _day_range(start, end)
+        available, busy = compute_bitmaps(babysitter_id, origin, days)
+        expected = {day: (day_available, day_busy)
+                    for day, day_available, day_busy in _split_days(origin, days, available, busy)}
+    return sum(1 for day in stored.keys() | expected.keys() if stored.get(day) != expected.get(day))
@@ -0,0 +1,163 @@
+# Meeting booking: every write that can change a babysitter's approved meetings goes through here
+
+import random
+import time
+from bisect import bisect_right
+from functools import wraps
+from itertools import accumulate
+from django.db import transaction, OperationalError
+from django.utils import timezone
+from .models import Babysitter, AvailableTime, Meetings
+from .availability import refresh_availability
+from .bitmaps import bitmap_check
+from .recurring import recurring_covers, recurring_intervals
+
+# Maximal number of meetings in a single batch booking
+MAX_BATCH_MEETINGS = 50
+
+# Lock contention retries (SQLite locks the whole database on write and reports the loser as "locked")
+BOOKING_RETRIES = 20
+BOOKING_RETRY_DELAY = 0.01
+
+class BookingError(Exception):
+    """
+    Raised when a meeting can not be booked or approved. The message is returned to the client.
+    """
+
+def serialized_per_babysitter(func):
+    """
+    Run the decorated function in a transaction that holds the babysitter row lock.
+
+    The decorated function receives the babysitter id as its first argument. Backends with row
+    locks (PostgreSQL, MySQL) serialize only the writes for that babysitter. SQLite ignores the
+    row lock and lets a single writer win, so the losing transaction is retried.
+    """
+    @wraps(func)
+    def wrapper(babysitter_id, *args, **kwargs):
+        for attempt in range(BOOKING_RETRIES):
+            try:
+                with transaction.atomic():
+                    Babysitter.objects.select_for_update().only('id').get(id=babysitter_id)
+                    return func(babysitter_id, *args, **kwargs)
+            except OperationalError as error:
+                if 'locked' not in str(error) or attempt == BOOKING_RETRIES - 1:
+                    raise
+                # Jittered backoff, so the losing transactions do not collide again in lockstep
+                time.sleep(BOOKING_RETRY_DELAY * (attempt + 1) * random.uniform(0.5, 1.5))
+    return wrapper
+
+def conflicting_meetings(babysitter_id, start_time, end_time):
+    """
+    Return the approved meetings of the babysitter that overlap or touch the given time period.
+    """
+    return Meetings.objects.filter(
+        babysitter_id=babysitter_id,
+        status='approved',
+        start_time__lte=end_time,
+        end_time__gte=start_time
+    )
+
+@serialized_per_babysitter
+def book_meeting(babysitter_id, family, start_time, end_time):
+    """
+    Create a pending meeting if the babysitter is available and not busy at the given time period.
+    """
+    # The day bitmaps rule out most unavailable requests before the exact range query runs
+    # (they only hold concrete availability, recurring rules are checked separately)
+    may_be_available, _ = bitmap_check(babysitter_id, start_time, end_time)
+
+    # Check if babysitter is available at the given meeting time (concrete or recurring availability)
+    available_time = may_be_available and AvailableTime.objects.filter(
+        babysitter_id=babysitter_id,
+        start_time__lte=start_time,
+        end_time__gte=end_time
+    ).exists()
+    if not available_time:
+        available_time = recurring_covers(babysitter_id, start_time, end_time)
+    if not available_time:
+        raise BookingError("Babysitter is not available at the requested time.")
+
+    # Check for existing meeting during the requested time period. Always exact: the busy bits lag the
+    # meetings approved without refresh_availability (admin, direct ORM writes)
+    if conflicting_meetings(babysitter_id, start_time, end_time).exists():
+        raise BookingError("Babysitter is busy during the requested time.")
+
+    return Meetings.objects.create(
+        babysitter_id=babysitter_id,
+        family=family,
+        start_time=start_time,
+        end_time=end_time
+    )
+
+@serialized_per_babysitter
+def book_meetings(babysitter_id, family, periods):
+    """
+    Create pending meetings for every (start_time, end_time) period the babysitter is available and not busy at.
+
+    All periods are checked against one read of the available times and the approved meetings of
+    the whole batch window, and the valid meetings are inserted with a single bulk_create. A period
+    overlapping or touching an earlier valid period of the batch is rejected, since approving one
+    of them would decline the other.
+    Returns one (meeting, error message) pair per period, in the given order.
+    """
+    window_start = min(start_time for start_time, _ in periods)
+    window_end = max(end_time for _, end_time in periods)
+
+    # Concrete and recurring availability sorted by start, with the running maximal end:
+    # a period is covered when an interval starting before it reaches its end
+    available = sorted([
+        *AvailableTime.objects
+        .filter(babysitter_id=babysitter_id, start_time__lte=window_end, end_time__gte=window_start)
+        .values_list('start_time', 'end_time'),
+        *recurring_intervals(babysitter_id, window_start, window_end),
+    ])
+    available_starts = [start_time for start_time, _ in available]
+    available_ends = list(accumulate((end_time for _, end_time in available), max))
+    busy = list(conflicting_meetings(babysitter_id, window_start, window_end).values_list('start_time', 'end_time'))
+
+    results, meetings = [], []
+    for start_time, end_time in periods:
+        covering = bisect_right(available_starts, start_time)
+        if covering == 0 or available_ends[covering - 1] < end_time:
+            results.append((None, "Babysitter is not available at the requested time."))
+        elif any(busy_start <= end_time and busy_end >= start_time for busy_start, busy_end in busy):
+            results.append((None, "Babysitter is busy during the requested time."))
+        elif any(meeting.start_time <= end_time and meeting.end_time >= start_time for meeting in meetings):
+            results.append((None, "The requested time overlaps another meeting of the batch."))
+        else:
+            meeting = Meetings(babysitter_id=babysitter_id, family=family, start_time=start_time, end_time=end_time)
+            meetings.append(meeting)
+            results.append((meeting, None))
+
+    Meetings.objects.bulk_create(meetings)
+    return results
+
+@serialized_per_babysitter
+def approve_meeting(babysitter_id, meeting_id):
+    """
+    Approve a meeting if it does not overlap another approved meeting of the babysitter.
+
+    The pending meetings of the babysitter that overlap the approved one can never be approved
+    anymore, so they are declined in the same transaction with a single UPDATE.
+    Returns the approved meeting and the ids of the declined meetings.
+    """
+    meeting = Meetings.objects.get(id=meeting_id, babysitter_id=babysitter_id)
+    if conflicting_meetings(babysitter_id, meeting.start_time, meeting.end_time).exclude(id=meeting.id).exists():
+        raise BookingError("Babysitter is busy during the requested time.")
+
+    meeting.status = 'approved'
+    meeting.save(update_fields=['status', 'updated_at'])
+
+    overlapping = Meetings.objects.filter(
+        babysitter_id=babysitter_id,
+        status='pending',
+        start_time__lte=meeting.end_time,
+        end_time__gte=meeting.start_time
+    ).exclude(id=meeting.id)
+    # The babysitter lock keeps the selected ids and the updated rows the same
+    declined_ids = list(overlapping.values_list('id', flat=True))
+    if declined_ids:
+        overlapping.update(status='declined', updated_at=timezone.now())
+
+    refresh_availability(babysitter_id, meeting.start_time, meeting.end_time)
+    return meeting, declined_ids
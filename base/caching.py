@@ -0,0 +1,202 @@
+# Response cache of the read endpoints, keyed by endpoint, parameters and role (and user where the payload
+# differs), and invalidated through model signals by bumping the version of the scopes a response depends on
+
+import hashlib
+import json
+import threading
+import uuid
+from collections import Counter
+from functools import wraps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.response import Response
+from .models import Babysitter, Parents, Reviews, AvailableTime, RecurringAvailability, Meetings, Requests
+
+_stats_lock = threading.Lock()
+_stats = Counter()
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+def _count(endpoint, outcome):
+    with _stats_lock:
+        _stats[endpoint, outcome] += 1
+
+def cache_stats():
+    """
+    Return the hit/miss counters of this process, per endpoint and in total.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    endpoints = {}
+    for (endpoint, outcome), count in sorted(stats.items()):
+        endpoints.setdefault(endpoint, {'hits': 0, 'misses': 0})[outcome] = count
+    return {
+        'hits': sum(counts['hits'] for counts in endpoints.values()),
+        'misses': sum(counts['misses'] for counts in endpoints.values()),
+        'endpoints': endpoints,
+    }
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+def user_role(user):
+    if not user.is_authenticated:
+        return 'anonymous'
+    if hasattr(user, 'Parent'):
+        return 'parent'
+    if hasattr(user, 'Babysitter'):
+        return 'babysitter'
+    return 'admin' if user.is_staff else 'user'
+
+def _version_key(scope):
+    return f'response-cache:version:{scope}'
+
+def _scope_versions(cache, scopes):
+    """
+    Return the current version token of every scope, creating the missing ones, or None if the cache
+    does not keep them (DummyCache).
+    """
+    keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # A fresh token (not a counter restarting at 0), so an evicted version never revives old entries
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+            if versions[key] is None:
+                return None
+    return [versions[key] for key in keys]
+
+def invalidate(*scopes):
+    """
+    Invalidate the cached responses depending on the given scopes, once the current transaction commits.
+    """
+    def bump():
+        _cache().set_many({_version_key(scope): uuid.uuid4().hex for scope in scopes}, None)
+    transaction.on_commit(bump)
+
+def cached_response(request, endpoint, scopes, per_user, compute):
+    """
+    Return the cached response of a GET request, or compute (and cache it if successful).
+    - **endpoint** (str): The name of the endpoint.
+    - **scopes** (list): The invalidation scopes of the response, or None to not cache it.
+    - **per_user** (bool): Whether the payload differs per user (not only per role).
+    - **compute** (callable): Returns the response.
+    """
+    if request.method != 'GET' or scopes is None:
+        return compute()
+
+    cache = _cache()
+    versions = _scope_versions(cache, scopes)
+    if versions is None:
+        return compute()
+    parameters = json.dumps([request.get_full_path(), request.data], sort_keys=True, default=str)
+    # A user has a single role, so per user payloads are not keyed by role as well
+    audience = f'user:{request.user.pk}' if per_user else f'role:{user_role(request.user)}'
+    key = hashlib.sha256('\n'.join([endpoint, parameters, audience, *versions]).encode())
+    key = f'response-cache:{endpoint}:{key.hexdigest()}'
+
+    cached = cache.get(key)
+    if cached is not None:
+        _count(endpoint, 'hits')
+        data, status_code = cached
+        response = Response(data, status=status_code)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    _count(endpoint, 'misses')
+    response = compute()
+    if response.status_code == status.HTTP_200_OK:
+        cache.set(key, (response.data, response.status_code), _timeout())
+    response['X-Cache'] = 'MISS'
+    return response
+
+def cache_response(scopes, per_user=False):
+    """
+    Decorator caching a function view (see cached_response).
+    - **scopes** (callable): Receives the request and returns its invalidation scopes (or None).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return cached_response(request, view.__name__, scopes(request), per_user,
+                                   lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+class CachedResponseMixin:
+    """
+    Cache the list/retrieve responses of a view (see cached_response).
+
+    Views set cache_scopes to the invalidation scopes of their responses (or override get_cache_scopes when
+    they depend on the request), and set cache_per_user (or override get_cache_per_user) when the payload
+    differs per user.
+    """
+    cache_scopes = None
+    cache_per_user = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # A view without scopes would never be invalidated, so it fails when defined rather than when requested
+        if cls.cache_scopes is None and cls.get_cache_scopes is CachedResponseMixin.get_cache_scopes:
+            raise ImproperlyConfigured(f"{cls.__name__} must set cache_scopes or override get_cache_scopes().")
+
+    def get_cache_scopes(self, request):
+        return list(self.cache_scopes)
+
+    def get_cache_per_user(self, request):
+        return self.cache_per_user
+
+    def list(self, request, *args, **kwargs):
+        return cached_response(request, type(self).__name__, self.get_cache_scopes(request),
+                               self.get_cache_per_user(request),
+                               lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return cached_response(request, type(self).__name__, self.get_cache_scopes(request),
+                               self.get_cache_per_user(request),
+                               lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs))
+
+# ============================================
+#                Invalidation
+# ============================================
+
+@receiver([post_save, post_delete], sender=Babysitter)
+def babysitter_changed(sender, instance, **kwargs):
+    invalidate('babysitters', f'babysitter:{instance.id}')
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Deactivated users are not listed
+    if hasattr(instance, 'Babysitter'):
+        invalidate('babysitters', f'babysitter:{instance.Babysitter.id}')
+
+@receiver([post_save, post_delete], sender=Parents)
+def parents_changed(sender, instance, **kwargs):
+    # Nearby babysitter lists around the parents' address
+    invalidate(f'parents:{instance.family_id}')
+
+@receiver([post_save, post_delete], sender=Reviews)
+def review_changed(sender, instance, **kwargs):
+    invalidate(f'reviews:{instance.babysitter_id}')
+
+@receiver([post_save, post_delete], sender=AvailableTime)
+@receiver([post_save, post_delete], sender=RecurringAvailability)
+@receiver([post_save, post_delete], sender=Meetings)
+def availability_changed(sender, instance, **kwargs):
+    invalidate(f'availability:{instance.babysitter_id}')
+
+@receiver([post_save, post_delete], sender=Requests)
+def request_changed(sender, instance, **kwargs):
+    invalidate(f'requests:family:{instance.family_id}', f'requests:babysitter:{instance.babysitter_id}')
@@ -0,0 +1,121 @@
+# Conditional GET: ETag / Last-Modified validators derived from the updated_at columns, so unchanged
+# payloads are answered with 304 Not Modified without serializing anything
+
+import hashlib
+import json
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+def list_validators(queryset, related=()):
+    """
+    Return the validator values of a list and its last modification time, with a single aggregate query.
+    - **related** (iterable): Names of nested relations whose rows are part of the payload.
+
+    The latest updated_at catches inserts and updates, the row count and the sum of the ids catch
+    deletions and rows leaving the filter.
+    """
+    # Joined relations repeat the rows, so they are counted distinct
+    distinct = bool(related)
+    aggregates = {
+        'updated': Max('updated_at'),
+        'count': Count('pk', distinct=distinct),
+        'ids': Sum('pk', distinct=distinct),
+    }
+    for name in related:
+        aggregates[f'{name}_updated'] = Max(f'{name}__updated_at')
+        aggregates[f'{name}_count'] = Count(f'{name}__pk', distinct=True)
+        aggregates[f'{name}_ids'] = Sum(f'{name}__pk', distinct=True)
+    values = queryset.order_by().aggregate(**aggregates)
+    last_modified = max((value for name, value in values.items() if name.endswith('updated') and value is not None),
+                        default=None)
+    return values, last_modified
+
+def object_validators(instance, related=()):
+    """
+    Return the validator values of a single object and its last modification time.
+    """
+    values = {'pk': instance.pk, 'updated': instance.updated_at}
+    last_modified = instance.updated_at
+    for name in related:
+        related_values, related_last_modified = list_validators(getattr(instance, name).all())
+        values[name] = related_values
+        if related_last_modified is not None:
+            last_modified = max(last_modified, related_last_modified)
+    return values, last_modified
+
+def conditional_response(request, values, last_modified, compute, check_last_modified=True):
+    """
+    Answer a GET request with 304 Not Modified if the client's validators match, or compute the response.
+    - **values** (dict): The validator values of the payload (see list_validators / object_validators).
+    - **compute** (callable): Returns the full response.
+    - **check_last_modified** (bool): Whether If-Modified-Since alone can be trusted (it can not see deletions).
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return compute()
+
+    # The payload also depends on the parameters, the user and the negotiated format
+    fingerprint = json.dumps([request.get_full_path(), request.data, request.user.pk,
+                              getattr(request, 'accepted_media_type', None), values], sort_keys=True, default=str)
+    etag = f'"{hashlib.sha256(fingerprint.encode()).hexdigest()[:32]}"'
+    timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=timestamp if check_last_modified else None)
+    if response is None:
+        response = compute()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    # Clients keep the payload but revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for the list and retrieve actions of a view.
+
+    Views set conditional_related to the nested relations their serializer includes (their rows need an
+    updated_at column as well), and return from get_conditional_context what else the payload depends on.
+    """
+    conditional_related = ()
+
+    def get_conditional_context(self, request):
+        return None
+
+    def conditional_queryset(self, request):
+        """
+        Return the rows of the list payload: the page window when paginated, so validating a page costs a
+        page read whatever the size of the list.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        streams = getattr(self, 'streams', None)
+        if streams is not None and streams(request):
+            return queryset
+        if self.paginator is None or not hasattr(self.paginator, 'page_window'):
+            return queryset
+        window = self.paginator.page_window(queryset, request, self)
+        if window is queryset:
+            return queryset
+        return queryset.model._base_manager.filter(pk__in=window.values('pk'))
+
+    def list(self, request, *args, **kwargs):
+        values, last_modified = list_validators(self.conditional_queryset(request), self.conditional_related)
+        values['context'] = self.get_conditional_context(request)
+        return conditional_response(request, values, last_modified,
+                                    lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+                                    check_last_modified=False)
+
+    def retrieve(self, request, *args, **kwargs):
+        # Permission checks of get_object run before anything is compared, the object is then reused
+        self.conditional_object = self.get_object()
+        values, last_modified = object_validators(self.conditional_object, self.conditional_related)
+        return conditional_response(request, values, last_modified,
+                                    lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
+
+    def get_object(self):
+        if getattr(self, 'conditional_object', None) is not None:
+            return self.conditional_object
+        return super().get_object()
@@ -0,0 +1,83 @@
+# Full table exports for admins: CSV or NDJSON streamed from a server-side cursor, never the whole table in memory
+
+import csv
+from django.http import StreamingHttpResponse
+from .models import Babysitter, Meetings, Requests, Reviews
+from .renderers import ORJSONRenderer
+
+EXPORT_CHUNK_SIZE = 2000
+
+# The exportable tables: name -> (model, creation time column)
+EXPORTS = {
+    'babysitters': (Babysitter, 'created_time'),
+    'meetings': (Meetings, 'created_time'),
+    'requests': (Requests, 'created_at'),
+    'reviews': (Reviews, 'created_time'),
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def export_columns(model):
+    # Foreign keys are exported as their id column (family_id, babysitter_id...)
+    return [field.attname for field in model._meta.concrete_fields]
+
+def export_rows(table, start=None, end=None):
+    """
+    Return the columns of a table and an iterator over its rows (as tuples, in primary key order).
+    - **table** (str): A name of EXPORTS.
+    - **start** (datetime, optional): Only export the rows created at or after this moment.
+    - **end** (datetime, optional): Only export the rows created before this moment.
+    """
+    model, created_column = EXPORTS[table]
+    columns = export_columns(model)
+    queryset = model.objects.all()
+    if start is not None:
+        queryset = queryset.filter(**{f'{created_column}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{created_column}__lt': end})
+    return columns, queryset.order_by('pk').values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+class _Echo:
+    # File-like object handing back what csv.writer writes, so every row is yielded as it is formatted
+    def write(self, value):
+        return value
+
+# Text cells starting with these are evaluated as formulas by spreadsheet applications
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        # User entered text (names, descriptions...) is quoted so a spreadsheet shows it as text
+        return "'" + value if value.startswith(CSV_FORMULA_PREFIXES) else value
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+def csv_lines(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns).encode()
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row]).encode()
+
+def ndjson_lines(columns, rows):
+    renderer = ORJSONRenderer()
+    for row in rows:
+        yield renderer.render(dict(zip(columns, row))) + b'\n'
+
+def export_lines(table, export_format, start=None, end=None):
+    """
+    Yield the encoded lines of a table export (see export_rows).
+    - **export_format** (str): csv (with a header line) or ndjson (one JSON object per line).
+    """
+    columns, rows = export_rows(table, start, end)
+    lines = csv_lines if export_format == 'csv' else ndjson_lines
+    return lines(columns, rows)
+
+def export_response(table, export_format, start=None, end=None):
+    response = StreamingHttpResponse(export_lines(table, export_format, start, end),
+                                     content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{table}.{export_format}"'
+    return response
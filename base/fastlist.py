@@ -0,0 +1,152 @@
+# Read-only fast path for list endpoints: rows are read with .values() and turned into the serializer's
+# output by precompiled per-field extractors, without a serializer instance or to_representation dispatch
+
+from rest_framework import fields, relations, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+def _datetime_extractor(field):
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None or output_format.lower() != fields.ISO_8601:
+        return field.to_representation
+    field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+    if field_timezone is None:
+        return field.to_representation
+
+    def extract(value):
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return extract
+
+def _decimal_extractor(field):
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.normalize_output or field.localize:
+        return field.to_representation
+    quantize = field.quantize
+    return lambda value: f'{quantize(value):f}'
+
+def _file_extractor(field, model_field):
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return lambda value: value or None
+    storage_url = model_field.storage.url
+    request = field.context.get('request', None)
+    if request is None:
+        return lambda value: storage_url(value) if value else None
+    # Most rows share the default picture, so each distinct file is resolved once per response
+    urls = {}
+
+    def extract(value):
+        if not value:
+            return None
+        url = urls.get(value)
+        if url is None:
+            url = urls[value] = request.build_absolute_uri(storage_url(value))
+        return url
+    return extract
+
+def _choice_extractor(field):
+    choices = field.choice_strings_to_values
+    return lambda value: value if value == '' else choices.get(str(value), value)
+
+def _extractor(field, model_field):
+    """
+    Return a function turning a raw .values() value into the field's representation, or None if
+    the field cannot be served from a single column.
+    """
+    # The other relations need the related object, only a primary key is read from the column
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return lambda value: value
+    if isinstance(field, (relations.RelatedField, relations.ManyRelatedField, serializers.BaseSerializer,
+                          fields.SerializerMethodField)):
+        return None
+    if isinstance(field, fields.FileField):
+        return _file_extractor(field, model_field)
+    if isinstance(field, fields.DateTimeField):
+        return _datetime_extractor(field)
+    if isinstance(field, fields.DecimalField):
+        return _decimal_extractor(field)
+    if isinstance(field, fields.ChoiceField):
+        return _choice_extractor(field)
+    if isinstance(field, fields.BooleanField):
+        return bool
+    if isinstance(field, fields.IntegerField):
+        return int
+    if isinstance(field, fields.CharField):
+        return str
+    if isinstance(field, fields.ReadOnlyField):
+        return lambda value: value
+    if isinstance(field, (fields.DateField, fields.TimeField, fields.FloatField, fields.UUIDField,
+                          fields.JSONField)):
+        return field.to_representation
+    return None
+
+class ValuesSerializer:
+    """
+    Precompiled, read-only equivalent of a ModelSerializer over .values() rows.
+
+    Produces the same output as `serializer(rows, many=True).data` for the serializers made of plain
+    model columns (see compile_values_serializer).
+    """
+    def __init__(self, columns, extractors):
+        self.columns = columns
+        self.extractors = extractors
+
+    def to_representation(self, rows):
+        extractors = self.extractors
+        return [{name: None if row[column] is None else extract(row[column])
+                 for name, column, extract in extractors}
+                for row in rows]
+
+def compile_values_serializer(serializer):
+    """
+    Compile a serializer instance into a ValuesSerializer, or return None if one of its readable fields
+    is not a plain model column (nested serializers, method fields, dotted sources, reverse relations).
+    """
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return None
+    model_fields = {model_field.name: model_field for model_field in model._meta.concrete_fields}
+    model_fields['pk'] = model._meta.pk
+
+    extractors = []
+    for field in serializer._readable_fields:
+        if len(field.source_attrs) != 1 or field.source_attrs[0] not in model_fields:
+            return None
+        model_field = model_fields[field.source_attrs[0]]
+        extract = _extractor(field, model_field)
+        if extract is None:
+            return None
+        # values() names foreign keys by the field name but returns the id column
+        extractors.append((field.field_name, model_field.name, extract))
+    return ValuesSerializer([column for _, column, _ in extractors], extractors)
+
+class FastListMixin:
+    """
+    Opt-in fast path for the list action of read-only list endpoints.
+
+    The page is read with .values() and serialized by a compiled ValuesSerializer. Views whose serializer
+    cannot be compiled fall back to the regular list.
+    """
+    def list(self, request, *args, **kwargs):
+        values_serializer = compile_values_serializer(self.get_serializer())
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        columns = list(values_serializer.columns)
+        # The cursor is read from the ordering column of every row and the primary key breaking its
+        # ties, so they have to be selected too
+        ordering = getattr(self, 'cursor_ordering', None) or getattr(self.paginator, 'ordering', None)
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        for column in [*(ordering or ()), 'pk']:
+            column = column.lstrip('-')
+            if column not in columns:
+                columns.append(column)
+
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.to_representation(page))
+        return Response(values_serializer.to_representation(queryset))
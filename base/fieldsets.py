@@ -0,0 +1,94 @@
+# Sparse fieldsets: ?fields=a,b / ?exclude=c limit both the serialized fields and the columns read from the database
+
+from rest_framework import exceptions, serializers
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import SAFE_METHODS
+
+def _names(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value is not None else None
+
+def requested_fields(request):
+    """
+    Return the (fields, exclude) sets of names asked for in the query string (None when not given).
+    Only read requests are restricted, so writes always validate the whole serializer.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None, None
+    # Serializers may also be given a plain Django request
+    query_params = getattr(request, 'query_params', request.GET)
+    return _names(query_params.get('fields')), _names(query_params.get('exclude'))
+
+def sparse_field_names(readable, fields, exclude):
+    """
+    Return the names of the readable fields to keep.
+    Names outside the serializer (including the fields hidden from the caller's role) are rejected.
+    """
+    unknown = ((fields or set()) | (exclude or set())) - set(readable)
+    if unknown:
+        raise exceptions.ValidationError({'fields': [f"Unknown field(s): {', '.join(sorted(unknown))}."]})
+    names = [name for name in readable if fields is None or name in fields]
+    return [name for name in names if exclude is None or name not in exclude]
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin applying ?fields= / ?exclude= to the top level serializer of a read request.
+
+    The serializer's own fields stay the upper bound, so the role based field sets can only be narrowed.
+    Nested serializers are not affected.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        requested, exclude = requested_fields(self.context.get('request'))
+        if requested is None and exclude is None:
+            return fields
+        readable = [name for name, field in fields.items() if not field.write_only]
+        keep = set(sparse_field_names(readable, requested, exclude))
+        return {name: field for name, field in fields.items() if field.write_only or name in keep}
+
+def serializer_columns(serializer, model):
+    """
+    Return the model columns the readable fields of a serializer are read from, or None if a field
+    reads something else (method fields, dotted sources).
+    """
+    concrete = {field.name for field in model._meta.concrete_fields}
+    relations = {field.name for field in model._meta.get_fields() if field.is_relation and not field.concrete}
+    columns = []
+    for field in serializer._readable_fields:
+        source = field.source_attrs[0] if len(field.source_attrs) == 1 else None
+        if source in concrete or source == 'pk':
+            columns.append(source)
+        elif source not in relations:
+            # Nested reverse relations are prefetched, anything else may read any column
+            return None
+    return columns
+
+class SparseFieldsFilter(BaseFilterBackend):
+    """
+    Filter backend deferring the columns that the sparse serializer of a read request does not output.
+    """
+    def filter_queryset(self, request, queryset, view):
+        requested, exclude = requested_fields(request)
+        if (requested is None and exclude is None) or not hasattr(view, 'get_serializer'):
+            return queryset
+        columns = serializer_columns(view.get_serializer(), queryset.model)
+        if columns is None:
+            return queryset
+
+        # Columns the views read besides the serializer: the cursor ordering, the relations traversed
+        # by permission checks and the conditional GET validator
+        ordering = getattr(view, 'cursor_ordering', None) or getattr(getattr(view, 'paginator', None), 'ordering', None)
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        # Annotations (a distance) are computed, not read
+        concrete = {field.name for field in queryset.model._meta.concrete_fields} | {'pk'}
+        columns += [column.lstrip('-') for column in ordering or () if column.lstrip('-') in concrete]
+        if isinstance(queryset.query.select_related, dict):
+            columns += list(queryset.query.select_related)
+        if any(field.name == 'updated_at' for field in queryset.model._meta.concrete_fields):
+            columns.append('updated_at')
+        return queryset.only(*columns)
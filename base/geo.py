@@ -0,0 +1,182 @@
+# Locations of the addresses: a pluggable geocoder fills latitude / longitude on save, and babysitters
+# are indexed by geohash so the ones near a point are read from a few index ranges
+
+import math
+from django.conf import settings
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Sqrt
+from django.db.models.signals import post_init, pre_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from .models import Babysitter, Parents
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+GEOHASH_PRECISION = 12
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# ============================================
+#                  Geocoding
+# ============================================
+
+class CityGeocoder:
+    """
+    Offline geocoder locating an address by the city it mentions (the city center).
+    - **cities** (dict, optional): Lowercase city name -> (latitude, longitude), defaults to CITIES.
+    """
+    CITIES = {
+        'tel aviv': (32.0853, 34.7818),
+        'jerusalem': (31.7683, 35.2137),
+        'haifa': (32.7940, 34.9896),
+        'petah tikva': (32.0840, 34.8878),
+        'rishon lezion': (31.9730, 34.7925),
+        'ashdod': (31.8044, 34.6553),
+        'netanya': (32.3215, 34.8532),
+        'beer sheva': (31.2518, 34.7913),
+        'holon': (32.0158, 34.7874),
+        'bnei brak': (32.0807, 34.8338),
+        'ramat gan': (32.0823, 34.8107),
+        'rehovot': (31.8928, 34.8113),
+        'bat yam': (32.0171, 34.7454),
+        'herzliya': (32.1624, 34.8447),
+        'kfar saba': (32.1782, 34.9076),
+        'hod hasharon': (32.1593, 34.8932),
+        'raanana': (32.1848, 34.8713),
+        'modiin': (31.8980, 35.0104),
+        'ashkelon': (31.6688, 34.5743),
+        'eilat': (29.5577, 34.9519),
+    }
+
+    def __init__(self, cities=None):
+        self.cities = cities if cities is not None else self.CITIES
+
+    def geocode(self, address):
+        """
+        Return the (latitude, longitude) of an address, or None if it is not found.
+        """
+        address = ' '.join(address.lower().replace('-', ' ').replace("'", '').split())
+        # The longest name wins ("ramat gan" rather than "gan")
+        for city in sorted(self.cities, key=len, reverse=True):
+            if city in address:
+                return self.cities[city]
+        return None
+
+def geocoder():
+    """
+    Return the geocoder of the GEOCODER setting (a class path), CityGeocoder by default.
+    """
+    return import_string(getattr(settings, 'GEOCODER', 'base.geo.CityGeocoder'))()
+
+# ============================================
+#                   Geohash
+# ============================================
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, value, even = [], 0, 0, True
+    while len(geohash) < precision:
+        # Bits alternate between longitude and latitude, starting with longitude
+        interval, coordinate = (longitude_range, longitude) if even else (latitude_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            geohash.append(_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(geohash)
+
+def geohash_cell_size(precision):
+    """
+    Return the (latitude, longitude) size in degrees of the geohash cells of a precision.
+    """
+    longitude_bits = (5 * precision + 1) // 2
+    latitude_bits = 5 * precision // 2
+    return 180.0 / 2 ** latitude_bits, 360.0 / 2 ** longitude_bits
+
+def covering_cells(latitude, longitude, radius):
+    """
+    Return the geohash prefixes whose cells together cover the circle of radius (km) around the point.
+
+    The longest prefix whose cells are at least as large as the radius is used: the circle is then inside
+    the 3x3 block of cells around the center.
+    """
+    latitude_radius = radius / KM_PER_DEGREE
+    longitude_radius = radius / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+    precision = 1
+    while precision < GEOHASH_PRECISION:
+        cell_latitude, cell_longitude = geohash_cell_size(precision + 1)
+        if cell_latitude < latitude_radius or cell_longitude < longitude_radius:
+            break
+        precision += 1
+    cell_latitude, cell_longitude = geohash_cell_size(precision)
+    cells = set()
+    for latitude_step in (-1, 0, 1):
+        for longitude_step in (-1, 0, 1):
+            cell_center_latitude = min(max(latitude + latitude_step * cell_latitude, -90.0), 90.0)
+            cell_center_longitude = (longitude + longitude_step * cell_longitude + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(cell_center_latitude, cell_center_longitude, precision))
+    return sorted(cells)
+
+# ============================================
+#                Nearby Search
+# ============================================
+
+def distance_expression(latitude, longitude):
+    """
+    Return the distance in km of the rows' (latitude, longitude) to the point, as a database expression.
+
+    Equirectangular approximation: exact enough within the search radius and free of trigonometry in SQL.
+    """
+    scale = math.cos(math.radians(latitude))
+    return Sqrt((F('latitude') - latitude) * (F('latitude') - latitude)
+                + (F('longitude') - longitude) * (F('longitude') - longitude) * (scale * scale),
+                output_field=FloatField()) * KM_PER_DEGREE
+
+def near(queryset, latitude, longitude, radius):
+    """
+    Restrict a babysitter queryset to the ones within radius (km) of the point, annotated with their distance.
+    """
+    cells = Q()
+    for cell in covering_cells(latitude, longitude, radius):
+        # A prefix as an index range ('{' follows the last geohash character)
+        cells |= Q(geohash__gte=cell, geohash__lt=cell + '{')
+    return (queryset.filter(cells)
+            .annotate(distance=distance_expression(latitude, longitude))
+            .filter(distance__lte=radius))
+
+# ============================================
+#                  Signals
+# ============================================
+
+@receiver(post_init, sender=Babysitter)
+@receiver(post_init, sender=Parents)
+def remember_address(sender, instance, **kwargs):
+    # Read from __dict__: deferred fields would be loaded one query per instance
+    located = instance.__dict__.get('latitude') is not None
+    instance._geocoded_address = instance.__dict__.get('address') if located else None
+
+@receiver(pre_save, sender=Babysitter)
+@receiver(pre_save, sender=Parents)
+def locate_address(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'address' not in update_fields:
+        return
+    if instance.address != getattr(instance, '_geocoded_address', None):
+        locate(instance)
+
+def locate(instance, geocoder_instance=None):
+    """
+    Set the latitude / longitude (and geohash) of a babysitter or parents from their address.
+    Returns whether the address was found.
+    """
+    location = (geocoder_instance or geocoder()).geocode(instance.address) if instance.address else None
+    instance.latitude, instance.longitude = location or (None, None)
+    if isinstance(instance, Babysitter):
+        instance.geohash = geohash_encode(*location) if location else None
+    instance._geocoded_address = instance.address if location else None
+    return location is not None
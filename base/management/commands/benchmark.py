@@ -0,0 +1,309 @@
+import io
+import json
+import time
+import tracemalloc
+from datetime import datetime, time as dt_time, timedelta, timezone
+from decimal import Decimal
+from itertools import combinations
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from base.fastlist import compile_values_serializer
+from base.renderers import ORJSONRenderer, ORJSONParser, orjson
+from base.streaming import stream_json_array
+from base.models import Babysitter, Parents, Reviews, Requests, AvailableTime, FreeSlot, RecurringAvailability
+from base.views import BabysitterListView
+from base.search import search_babysitters
+from base.geo import CityGeocoder, geohash_encode
+from base.recommendations import recompute_recommendations, recommended_babysitters
+from base.availability import babysitters_free_between
+from base.serializer import (BabysitterSerializerForParents, ReviewsSerializer, AvailableTimeSerializer,
+                             RequestsSerializer)
+
+BATCH_SIZE = 5000
+
+CITIES = ['Tel Aviv', 'Jerusalem', 'Haifa', 'Petah Tikva', 'Rishon LeZion', 'Ashdod', 'Netanya', 'Beer Sheva',
+          'Holon', 'Ramat Gan']
+SKILLS = ['speaks French', 'first aid certified', 'loves dogs', 'swimming teacher', 'plays the piano', 'cooks vegetarian',
+          'has a driving license', 'helps with homework', 'knows sign language', 'works night shifts', 'speaks Arabic',
+          'studies nursing', 'great with toddlers', 'twins experience']
+
+def _timed(function, repeat=1):
+    """
+    Return the best time of `repeat` calls of function and its result.
+    """
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def populate(first, rows):
+    """
+    Grow the throwaway database from `first` to `rows` babysitters, families, reviews, requests and available times.
+    """
+    origin = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    # Only babysitters with an active user are listed
+    User.objects.bulk_create((User(username=f'babysitter{i}') for i in range(first, rows)), batch_size=BATCH_SIZE)
+    user_ids = list(User.objects.filter(username__startswith='babysitter').order_by('id')
+                    .values_list('id', flat=True)[first:])
+    # Spread around the city centers (bulk_create skips the geocoding signal)
+    locations = {city: CityGeocoder().geocode(city) for city in CITIES}
+
+    def location(i):
+        latitude, longitude = locations[CITIES[i % len(CITIES)]]
+        latitude, longitude = latitude + (i * 37 % 1000 - 500) / 10000, longitude + (i * 91 % 1000 - 500) / 10000
+        return {'latitude': latitude, 'longitude': longitude, 'geohash': geohash_encode(latitude, longitude)}
+
+    # Every babysitter gets a single review, rated 1 + i % 5 (see below)
+    Babysitter.objects.bulk_create(
+        (Babysitter(name=f'Babysitter {i}', age=18 + i % 50, address=CITIES[i % len(CITIES)],
+                    city=CITIES[i % len(CITIES)].lower(),
+                    hourly_rate=Decimal(40 + i % 60), phone_number=f'05{i:08d}',
+                    description=f'{SKILLS[i % len(SKILLS)]}, {SKILLS[i // len(SKILLS) % len(SKILLS)]}. ' + 'Description ' * 8,
+                    user_id=user_id, rating_count=1, rating_sum=1 + i % 5, rating_average=1 + i % 5,
+                    **{f'rating_{1 + i % 5}_count': 1}, **location(i))
+         for i, user_id in zip(range(first, rows), user_ids)),
+        batch_size=BATCH_SIZE)
+    Parents.objects.bulk_create(
+        (Parents(dad_name=f'Dad {i}', mom_name=f'Mom {i}', address=f'Street {i}', last_name=f'Family {i}',
+                 phone_number=f'07{i:08d}', latitude=location(i)['latitude'], longitude=location(i)['longitude'])
+         for i in range(first, rows)),
+        batch_size=BATCH_SIZE)
+    babysitter_ids = list(Babysitter.objects.order_by('id').values_list('id', flat=True)[first:])
+    family_ids = list(Parents.objects.order_by('family_id').values_list('family_id', flat=True)[first:])
+    Reviews.objects.bulk_create(
+        (Reviews(family_id=family_id, babysitter_id=babysitter_id, review_text=f'Great, {SKILLS[i * 7 % len(SKILLS)]}. ' + 'Great ' * 16,
+                 rating=1 + i % 5)
+         for i, (family_id, babysitter_id) in enumerate(zip(family_ids, babysitter_ids), first)),
+        batch_size=BATCH_SIZE)
+    Requests.objects.bulk_create(
+        (Requests(family_id=family_id, babysitter_id=babysitter_id, status=('pending', 'approved', 'declined')[i % 3])
+         for i, (family_id, babysitter_id) in enumerate(zip(family_ids, babysitter_ids))),
+        batch_size=BATCH_SIZE)
+    available_times = AvailableTime.objects.bulk_create(
+        (AvailableTime(babysitter_id=babysitter_id, start_time=origin + timedelta(minutes=15 * i),
+                       end_time=origin + timedelta(minutes=15 * i, hours=3))
+         for i, babysitter_id in enumerate(babysitter_ids, first)),
+        batch_size=BATCH_SIZE)
+    # No meetings are approved, so every available time is a single free slot
+    FreeSlot.objects.bulk_create(
+        (FreeSlot(babysitter_id=available_time.babysitter_id, available_time_id=available_time.id,
+                  start_time=available_time.start_time, end_time=available_time.end_time)
+         for available_time in available_times),
+        batch_size=BATCH_SIZE)
+    # Every 10th babysitter is available 09:00-17:00 on one weekday
+    RecurringAvailability.objects.bulk_create(
+        (RecurringAvailability(babysitter_id=babysitter_id, weekday=i // 10 % 7, start_time=dt_time(9),
+                               end_time=dt_time(17), start_date=origin.date())
+         for i, babysitter_id in enumerate(babysitter_ids, first) if i % 10 == 0),
+        batch_size=BATCH_SIZE)
+
+class Command(BaseCommand):
+    help = ("Run performance benchmarks on a throwaway test database. "
+            "Scenarios: serializers (ModelSerializer vs. the .values() fast list path), "
+            "renderers (stdlib json vs. orjson renderer and parser), "
+            "streaming (peak memory of a buffered vs. a streamed JSON list, e.g. with --rows 1000000), "
+            "search (query plans and timings of every babysitter list filter combination), "
+            "fulltext (full text search queries, e.g. with --rows 300000), "
+            "recommendations (batch scoring time per parent, and the recommended list read), "
+            "free-between (babysitters free for a window, against the 100 ms target at 50000 babysitters).")
+
+    scenarios = ['serializers', 'renderers', 'streaming', 'search', 'fulltext', 'recommendations', 'free-between']
+
+    # Target of a babysitters_free_between query
+    free_between_target = 0.1
+
+    # Windows (days from the first available time, start hour, hours) of the free-between scenario
+    free_between_windows = [(0, 8, 1), (3, 10, 2), (30, 13, 3), (200, 9, 8), (2000, 10, 1)]
+
+    # Parents scored by the recommendations scenario (the time per parent is reported)
+    recommendation_families = 100
+
+    fulltext_queries = ['french', 'speaks French, first aid', '"first aid" -dogs', 'piano or swimming',
+                        'toddlers nursing', 'nothing matches this']
+
+    # Babysitter list filters: name -> query parameters
+    search_filters = {
+        'rate': {'min_hourly_rate': '50', 'max_hourly_rate': '60'},
+        'age': {'min_age': '25', 'max_age': '30'},
+        'city': {'city': 'haifa'},
+        'rating': {'min_rating': '4.5'},
+        # Around the benchmark parent's address
+        'nearby': {'nearby': 'true', 'radius': '3'},
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=self.scenarios)
+        parser.add_argument('--rows', type=int, action='append', dest='row_counts',
+                            help="Number of rows to benchmark with (can be repeated, default 10000 and 100000).")
+
+    def handle(self, *args, **options):
+        row_counts = options['row_counts'] or [10_000, 100_000]
+        test_database = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=False)
+        self.stdout.write(f"Using the throwaway database {test_database}")
+        try:
+            benchmark = getattr(self, f"benchmark_{options['scenario'].replace('-', '_')}")
+            populated = 0
+            for rows in sorted(row_counts):
+                populate(populated, rows)
+                populated = rows
+                benchmark(rows)
+        finally:
+            connection.creation.destroy_test_db(test_database, verbosity=0)
+
+    def benchmark_serializers(self, rows):
+        # The profile picture URLs are made absolute with the request host
+        request = APIRequestFactory().get('/', HTTP_HOST='localhost')
+        for serializer_class, queryset in [
+            (BabysitterSerializerForParents, Babysitter.objects.all()),
+            (ReviewsSerializer, Reviews.objects.all()),
+            (AvailableTimeSerializer, AvailableTime.objects.all()),
+            (RequestsSerializer, Requests.objects.all()),
+        ]:
+            context = {'request': request}
+            values_serializer = compile_values_serializer(serializer_class(context=context))
+            if values_serializer is None:
+                raise CommandError(f"{serializer_class.__name__} cannot be compiled")
+
+            serializer_time, expected = _timed(
+                lambda: serializer_class(queryset.order_by('pk'), many=True, context=context).data)
+            fast_time, output = _timed(
+                lambda: values_serializer.to_representation(
+                    queryset.order_by('pk').values(*values_serializer.columns).iterator()))
+            if json.dumps(output) != json.dumps(expected):
+                raise CommandError(f"{serializer_class.__name__}: the fast path output differs")
+
+            self.stdout.write(f"{serializer_class.__name__:32} {rows:>7} rows: serializer {serializer_time:7.3f}s, "
+                              f"values {fast_time:7.3f}s ({serializer_time / fast_time:.1f}x)")
+
+    def benchmark_renderers(self, rows):
+        if orjson is None:
+            raise CommandError("orjson is not installed, ORJSONRenderer falls back to the stdlib renderer")
+        request = APIRequestFactory().get('/', HTTP_HOST='localhost')
+        for serializer_class, queryset in [
+            (BabysitterSerializerForParents, Babysitter.objects.all()),
+            (RequestsSerializer, Requests.objects.all()),
+            (AvailableTimeSerializer, AvailableTime.objects.all()),
+        ]:
+            data = serializer_class(queryset.order_by('pk'), many=True, context={'request': request}).data
+            json_time, expected = _timed(lambda: JSONRenderer().render(data), repeat=5)
+            orjson_time, output = _timed(lambda: ORJSONRenderer().render(data), repeat=5)
+            if output != expected:
+                raise CommandError(f"{serializer_class.__name__}: the orjson output differs")
+            json_parse_time, _ = _timed(lambda: JSONParser().parse(io.BytesIO(expected), parser_context={}), repeat=5)
+            orjson_parse_time, _ = _timed(lambda: ORJSONParser().parse(io.BytesIO(expected), parser_context={}), repeat=5)
+
+            self.stdout.write(f"{serializer_class.__name__:32} {rows:>7} rows ({len(expected) / 2 ** 20:.1f} MB): "
+                              f"render json {json_time:6.3f}s, orjson {orjson_time:6.3f}s "
+                              f"({json_time / orjson_time:.1f}x); parse json {json_parse_time:6.3f}s, "
+                              f"orjson {orjson_parse_time:6.3f}s ({json_parse_time / orjson_parse_time:.1f}x)")
+
+    def benchmark_streaming(self, rows):
+        values_serializer = compile_values_serializer(AvailableTimeSerializer())
+        queryset = AvailableTime.objects.order_by('pk').values(*values_serializer.columns)
+
+        def buffered():
+            return len(ORJSONRenderer().render(values_serializer.to_representation(queryset)))
+
+        def streamed():
+            # The chunks are sent to the client and dropped, only their size is kept
+            return sum(len(chunk) for chunk in stream_json_array(queryset.iterator(chunk_size=2000),
+                                                                 values_serializer.to_representation))
+
+        for name, function in [('buffered', buffered), ('streamed', streamed)]:
+            tracemalloc.start()
+            try:
+                elapsed, size = _timed(function)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.stdout.write(f"AvailableTime {name:8} {rows:>7} rows ({size / 2 ** 20:.1f} MB): "
+                              f"{elapsed:7.3f}s, peak memory {peak / 2 ** 20:8.1f} MB")
+
+    def benchmark_search(self, rows):
+        user = User.objects.filter(username='benchmark-parent').first()
+        if user is None:
+            user = User.objects.create_user(username='benchmark-parent')
+            Parents.objects.create(dad_name='Dad', mom_name='Mom', address='Haifa', last_name='Benchmark',
+                                   phone_number='0600000000', user=user)
+        view = BabysitterListView.as_view()
+
+        unindexed = []
+        for size in range(1, len(self.search_filters) + 1):
+            for names in combinations(self.search_filters, size):
+                parameters = {}
+                for name in names:
+                    parameters.update(self.search_filters[name])
+                for ordering in [None, '-hourly_rate']:
+                    if ordering is not None:
+                        parameters['ordering'] = ordering
+                    request = APIRequestFactory().get('/', parameters, HTTP_HOST='localhost')
+                    force_authenticate(request, user=user)
+                    # Every query is run, not answered from the response cache
+                    with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}), \
+                            CaptureQueriesContext(connection) as queries:
+                        elapsed, response = _timed(lambda: view(request).render())
+                    if response.status_code != 200:
+                        raise CommandError(f"{names}: status {response.status_code}")
+
+                    plans = []
+                    for query in queries:
+                        if 'FROM "base_babysitter"' not in query['sql']:
+                            continue
+                        with connection.cursor() as cursor:
+                            cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                            plans += [row[-1] for row in cursor.fetchall() if 'base_babysitter' in row[-1]]
+                    indexed = all('USING' in plan and 'INDEX' in plan for plan in plans)
+                    if not indexed:
+                        unindexed.append((names, ordering))
+                    label = '+'.join(names) + (f' by {ordering}' if ordering else '')
+                    self.stdout.write(f"{label:36} {rows:>7} rows: {elapsed * 1000:8.1f} ms, "
+                                      f"{'indexed' if indexed else 'SCAN'}: {'; '.join(sorted(set(plans)))}")
+        if unindexed:
+            raise CommandError(f"{len(unindexed)} filter combinations scan the babysitter table: {unindexed}")
+
+    def benchmark_fulltext(self, rows):
+        for text in self.fulltext_queries:
+            elapsed, matches = _timed(lambda: search_babysitters(text, 50), repeat=5)
+            count_time, total = _timed(lambda: len(search_babysitters(text, rows)))
+            self.stdout.write(f"{text!r:30} {rows:>7} rows: first page {elapsed * 1000:7.2f} ms, "
+                              f"all {total:>6} matches {count_time * 1000:8.2f} ms")
+
+    def benchmark_recommendations(self, rows):
+        family_ids = list(Parents.objects.order_by('family_id')
+                          .values_list('family_id', flat=True)[:self.recommendation_families])
+        elapsed, _ = _timed(lambda: recompute_recommendations(family_ids))
+        self.stdout.write(f"scoring {rows:>7} babysitters: {elapsed / len(family_ids) * 1000:8.2f} ms per parent")
+
+        family = Parents.objects.get(family_id=family_ids[0])
+        with CaptureQueriesContext(connection) as queries:
+            elapsed, recommendations = _timed(lambda: recommended_babysitters(family), repeat=5)
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {queries[-1]['sql']}")
+            plans = [row[-1] for row in cursor.fetchall()]
+        if not any('base_recommendation' in plan and 'INDEX' in plan for plan in plans):
+            raise CommandError(f"The recommended list scans the recommendation table: {plans}")
+        self.stdout.write(f"recommended list {len(recommendations)} babysitters: {elapsed * 1000:6.2f} ms, "
+                          f"{len(queries) // 5} query: {'; '.join(plans)}")
+
+    def benchmark_free_between(self, rows):
+        origin = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        slow = []
+        for days, hour, hours in self.free_between_windows:
+            start = origin + timedelta(days=days, hours=hour)
+            end = start + timedelta(hours=hours)
+            elapsed, babysitter_ids = _timed(
+                lambda: list(babysitters_free_between(start, end).values_list('id', flat=True)), repeat=5)
+            if elapsed > self.free_between_target:
+                slow.append(start)
+            self.stdout.write(f"{start:%Y-%m-%d %H:%M} +{hours}h {rows:>7} babysitters: {elapsed * 1000:7.2f} ms, "
+                              f"{len(babysitter_ids)} free")
+        if slow and rows <= 50_000:
+            raise CommandError(f"{len(slow)} windows took over {self.free_between_target * 1000:.0f} ms: {slow}")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from base.availability import coalesce_babysitter_available_times
+from base.models import AvailableTime
+
+class Command(BaseCommand):
+    help = "Merge the overlapping or touching available times of every babysitter into single rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--babysitter', type=int, action='append', dest='babysitter_ids',
+                            help="Limit to the given babysitter id (can be repeated).")
+
+    def handle(self, *args, **options):
+        babysitter_ids = options['babysitter_ids'] or list(
+            AvailableTime.objects.values_list('babysitter_id', flat=True).distinct().order_by('babysitter_id'))
+
+        merged = 0
+        for babysitter_id in babysitter_ids:
+            # One transaction per babysitter keeps the locks short
+            with transaction.atomic():
+                merged += coalesce_babysitter_available_times(babysitter_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged away {merged} available times of {len(babysitter_ids)} babysitters."))
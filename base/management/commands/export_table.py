@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from base.export import EXPORTS, EXPORT_FORMATS, export_lines
+from base.serializer import TimeWindowSerializer
+
+class Command(BaseCommand):
+    help = ("Export a whole table as CSV or NDJSON, streamed from a server-side cursor "
+            "(same output as the export/<table>.<format> endpoint).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', dest='file_format')
+        parser.add_argument('--from', dest='from', help="Only export the rows created at or after this moment.")
+        parser.add_argument('--to', dest='to', help="Only export the rows created before this moment.")
+        parser.add_argument('--output', help="File to write to (default: standard output).")
+
+    def handle(self, *args, **options):
+        window_serializer = TimeWindowSerializer(
+            data={name: options[name] for name in ('from', 'to') if options[name] is not None})
+        if not window_serializer.is_valid():
+            raise CommandError(window_serializer.errors)
+        window = window_serializer.validated_data
+
+        lines = export_lines(options['table'], options['file_format'], window.get('from'), window.get('to'))
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line.decode(), ending='')
+            return
+        with open(options['output'], 'wb') as output:
+            for line in lines:
+                output.write(line)
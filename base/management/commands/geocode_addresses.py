@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from base.caching import invalidate
+from base.geo import geocoder, locate
+from base.models import Babysitter, Parents
+
+class Command(BaseCommand):
+    help = ("Set the latitude / longitude of the babysitters and parents from their address with the GEOCODER, "
+            "for the ones without a location (or all of them).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Geocode the located addresses again as well.")
+
+    def handle(self, *args, **options):
+        geocoder_instance = geocoder()
+        for model, fields in [(Babysitter, ['latitude', 'longitude', 'geohash']), (Parents, ['latitude', 'longitude'])]:
+            queryset = model.objects.only('pk', 'address', *fields)
+            if not options['all']:
+                queryset = queryset.filter(latitude__isnull=True)
+            located, batch = 0, []
+            for instance in queryset.iterator(chunk_size=1000):
+                located += locate(instance, geocoder_instance)
+                batch.append(instance)
+                if len(batch) == 1000:
+                    model.objects.bulk_update(batch, fields)
+                    batch = []
+            model.objects.bulk_update(batch, fields)
+            self.stdout.write(f"{model.__name__}: located {located} addresses")
+        # Bulk updates send no model signals
+        invalidate('babysitters')
+        self.stdout.write(self.style.SUCCESS("Geocoded the addresses."))
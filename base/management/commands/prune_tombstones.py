@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from base.sync import prune_tombstones
+
+class Command(BaseCommand):
+    help = ("Delete the delta sync tombstones older than SYNC_TOMBSTONE_RETENTION "
+            "(clients with an older cursor get a full sync).")
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired tombstones."))
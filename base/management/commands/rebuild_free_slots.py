@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from base.availability import refresh_availability, free_slots_drift
+from base.bitmaps import day_bitmaps_drift
+from base.models import Babysitter
+
+class Command(BaseCommand):
+    help = ("Rebuild the materialized FreeSlot and DayBitmap tables from AvailableTime and approved Meetings, "
+            "or verify them for drift.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Only report babysitters whose free slots or day bitmaps drifted from the source data.")
+        parser.add_argument('--babysitter', type=int, action='append', dest='babysitter_ids',
+                            help="Limit to the given babysitter id (can be repeated).")
+
+    def handle(self, *args, **options):
+        babysitter_ids = options['babysitter_ids'] or list(Babysitter.objects.values_list('id', flat=True))
+
+        if not options['verify']:
+            for babysitter_id in babysitter_ids:
+                with transaction.atomic():
+                    refresh_availability(babysitter_id)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt free slots and day bitmaps of {len(babysitter_ids)} babysitters."))
+            return
+
+        drifted = 0
+        for babysitter_id in babysitter_ids:
+            missing, unexpected = free_slots_drift(babysitter_id)
+            drifted_days = day_bitmaps_drift(babysitter_id)
+            if missing or unexpected or drifted_days:
+                drifted += 1
+                self.stdout.write(f"Babysitter {babysitter_id}: {len(missing)} missing, {len(unexpected)} unexpected free slots, "
+                                  f"{drifted_days} drifted day bitmaps")
+        if drifted:
+            raise CommandError(f"{drifted} of {len(babysitter_ids)} babysitters have drifted free slots or day bitmaps.")
+        self.stdout.write(self.style.SUCCESS(f"Free slots and day bitmaps of {len(babysitter_ids)} babysitters are up to date."))
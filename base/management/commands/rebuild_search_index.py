@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from base.search import search_backend
+
+class Command(BaseCommand):
+    help = ("Recreate the full text search index of the babysitters (and its triggers, which SQLite drops when "
+            "a migration rebuilds the babysitter or reviews table; migrate reinstalls them) from the source tables.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            search_backend().install(cursor)
+        self.stdout.write(self.style.SUCCESS("Rebuilt the babysitter search index."))
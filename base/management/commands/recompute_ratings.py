@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from base.ratings import recompute_ratings
+
+class Command(BaseCommand):
+    help = "Recompute the rating aggregates of the babysitters from their reviews, or verify them for drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true',
+                            help="Only report babysitters whose rating aggregates drifted from their reviews.")
+        parser.add_argument('--babysitter', type=int, action='append', dest='babysitter_ids',
+                            help="Limit to the given babysitter id (can be repeated).")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = recompute_ratings(options['babysitter_ids'], verify=options['verify'])
+
+        if not options['verify']:
+            self.stdout.write(self.style.SUCCESS(f"Fixed the rating aggregates of {len(drifted)} babysitters."))
+            return
+        for babysitter_id in drifted:
+            self.stdout.write(f"Babysitter {babysitter_id}: drifted rating aggregates")
+        if drifted:
+            raise CommandError(f"{len(drifted)} babysitters have drifted rating aggregates.")
+        self.stdout.write(self.style.SUCCESS("Rating aggregates are up to date."))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from base.recommendations import recompute_recommendations
+
+class Command(BaseCommand):
+    help = ("Score the babysitters for every parent and store each parent's top recommendations "
+            "(meant to run periodically, e.g. nightly).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--parent', type=int, action='append', dest='family_ids',
+                            help="Limit to the given parents family id (can be repeated).")
+        parser.add_argument('--top', type=int, dest='k',
+                            help="Number of babysitters stored per parent (default RECOMMENDATION_TOP_K).")
+
+    def handle(self, *args, **options):
+        if options['k'] is not None and options['k'] < 1:
+            raise CommandError("--top must be positive.")
+        begin = time.perf_counter()
+        stored = recompute_recommendations(options['family_ids'], k=options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored the recommendations of {stored} parents in {time.perf_counter() - begin:.1f}s."))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_alter_availabletime_end_time_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabletime',
+            index=models.Index(fields=['babysitter', 'start_time', 'end_time'], name='avail_sitter_start_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meetings',
+            index=models.Index(fields=['babysitter', 'status', 'start_time'], name='meet_sitter_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requests',
+            index=models.Index(fields=['family', 'babysitter', 'status', 'is_active'], name='req_family_sitter_status_idx'),
+        ),
+    ]
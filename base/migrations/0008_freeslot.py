@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+from collections import deque
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of base.availability.subtract_intervals as of this migration
+def subtract_intervals(available, busy):
+    busy = iter(busy)
+    pending = next(busy, None)
+    window = deque()
+
+    for avail_start, avail_end, *extra in available:
+        while pending is not None and pending[0] < avail_end:
+            window.append(pending)
+            pending = next(busy, None)
+        while window and window[0][1] <= avail_start:
+            window.popleft()
+
+        cursor = avail_start
+        for busy_start, busy_end in window:
+            if busy_start >= avail_end:
+                break
+            if busy_end <= cursor:
+                continue
+            if busy_start > cursor:
+                yield (cursor, busy_start, *extra)
+            cursor = busy_end
+            if cursor >= avail_end:
+                break
+        if cursor < avail_end:
+            yield (cursor, avail_end, *extra)
+
+
+def populate_free_slots(apps, schema_editor):
+    AvailableTime = apps.get_model('base', 'AvailableTime')
+    Meetings = apps.get_model('base', 'Meetings')
+    FreeSlot = apps.get_model('base', 'FreeSlot')
+    babysitter_ids = AvailableTime.objects.values_list('babysitter_id', flat=True).distinct()
+    for babysitter_id in list(babysitter_ids):
+        available = (AvailableTime.objects.filter(babysitter_id=babysitter_id)
+                     .order_by('start_time', 'end_time')
+                     .values_list('start_time', 'end_time', 'id'))
+        busy = (Meetings.objects.filter(babysitter_id=babysitter_id, status='approved')
+                .order_by('start_time', 'end_time')
+                .values_list('start_time', 'end_time'))
+        FreeSlot.objects.bulk_create(
+            [FreeSlot(babysitter_id=babysitter_id, available_time_id=available_time_id,
+                      start_time=start_time, end_time=end_time)
+             for start_time, end_time, available_time_id in subtract_intervals(available, busy)],
+            batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0007_availability_meetings_requests_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FreeSlot',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('available_time', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='free_slots', to='base.availabletime')),
+                ('babysitter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='free_slots', to='base.babysitter')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['babysitter', 'start_time', 'end_time'], name='free_sitter_start_end_idx')],
+            },
+        ),
+        migrations.RunPython(populate_free_slots, migrations.RunPython.noop),
+    ]
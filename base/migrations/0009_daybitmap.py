@@ -0,0 +1,113 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:41
+
+from datetime import datetime, time, timedelta, timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Min, Max
+
+
+# Frozen copies of the base.bitmaps helpers as of this migration
+BUCKET = timedelta(minutes=15)
+BUCKETS_PER_DAY = 96
+BITMAP_BYTES = BUCKETS_PER_DAY // 8
+
+
+def to_bytes(bits):
+    return bits.to_bytes(BITMAP_BYTES, 'little')
+
+
+def _day_start(moment):
+    moment = moment.astimezone(timezone.utc)
+    return datetime.combine(moment.date(), time(), tzinfo=timezone.utc)
+
+
+def _day_range(start, end):
+    first = _day_start(start)
+    return first, (_day_start(end) - first).days + 1
+
+
+def _span(first, last):
+    first = max(first, 0)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def inner_mask(origin, start, end):
+    return _span(-((origin - start) // BUCKET), (end - origin) // BUCKET)
+
+
+def closed_mask(origin, start, end):
+    return _span((start - origin) // BUCKET, (end - origin) // BUCKET + 1)
+
+
+def _merged(intervals):
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _split_days(origin, days, available, busy):
+    full_day = (1 << BUCKETS_PER_DAY) - 1
+    for offset in range(days):
+        shift = offset * BUCKETS_PER_DAY
+        day_available = (available >> shift) & full_day
+        day_busy = (busy >> shift) & full_day
+        if day_available or day_busy:
+            yield (origin + timedelta(days=offset)).date(), day_available, day_busy
+
+
+def populate_day_bitmaps(apps, schema_editor):
+    AvailableTime = apps.get_model('base', 'AvailableTime')
+    Meetings = apps.get_model('base', 'Meetings')
+    DayBitmap = apps.get_model('base', 'DayBitmap')
+    babysitter_ids = set(AvailableTime.objects.values_list('babysitter_id', flat=True))
+    babysitter_ids |= set(Meetings.objects.filter(status='approved').values_list('babysitter_id', flat=True))
+    for babysitter_id in babysitter_ids:
+        available_times = AvailableTime.objects.filter(babysitter_id=babysitter_id)
+        meetings = Meetings.objects.filter(babysitter_id=babysitter_id, status='approved')
+        bounds = [queryset.aggregate(start=Min('start_time'), end=Max('end_time'))
+                  for queryset in (available_times, meetings)]
+        origin, days = _day_range(min(bound['start'] for bound in bounds if bound['start'] is not None),
+                                  max(bound['end'] for bound in bounds if bound['end'] is not None))
+        available = busy = 0
+        for start, end in _merged(available_times.order_by('start_time').values_list('start_time', 'end_time')):
+            available |= inner_mask(origin, start, end)
+        for start, end in meetings.values_list('start_time', 'end_time'):
+            busy |= closed_mask(origin, start, end)
+        size = (1 << (days * BUCKETS_PER_DAY)) - 1
+        DayBitmap.objects.bulk_create(
+            [DayBitmap(babysitter_id=babysitter_id, day=day, available=to_bytes(day_available), busy=to_bytes(day_busy))
+             for day, day_available, day_busy in _split_days(origin, days, available & size, busy & size)],
+            batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_freeslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DayBitmap',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('available', models.BinaryField(max_length=12)),
+                ('busy', models.BinaryField(max_length=12)),
+                ('babysitter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_bitmaps', to='base.babysitter')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'babysitter'], name='bitmap_day_sitter_idx')],
+                'constraints': [models.UniqueConstraint(fields=('babysitter', 'day'), name='bitmap_sitter_day_unique')],
+            },
+        ),
+        migrations.RunPython(populate_day_bitmaps, migrations.RunPython.noop),
+    ]
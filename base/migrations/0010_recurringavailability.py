@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0009_daybitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringAvailability',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('weekday', models.IntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField(blank=True, null=True)),
+                ('exceptions', models.JSONField(blank=True, default=list)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('babysitter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_availabilities', to='base.babysitter')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['babysitter', 'start_date', 'end_date'], name='recur_sitter_dates_idx'), models.Index(fields=['weekday', 'start_time', 'end_time'], name='recur_weekday_times_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_null_reviews(apps, schema_editor):
+    # Databases created before 0002 still allow NULL review_text / rating, which the table rebuild
+    # of the AddField below would reject: use the model defaults
+    Reviews = apps.get_model('base', 'Reviews')
+    Reviews.objects.filter(review_text__isnull=True).update(review_text="Write")
+    Reviews.objects.filter(rating__isnull=True).update(rating=5)
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows were last changed at the latest when they were created
+    for model_name in ['Babysitter', 'Parents', 'Kids', 'RecurringAvailability', 'Meetings', 'Reviews']:
+        apps.get_model('base', model_name).objects.update(updated_at=F('created_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0010_recurringavailability'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_null_reviews, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='availabletime',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='kids',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='meetings',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='parents',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recurringavailability',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='reviews',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='requests',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
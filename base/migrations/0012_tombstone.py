@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0011_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('model', models.CharField(choices=[('requests', 'Requests'), ('meetings', 'Meetings'), ('availability', 'AvailableTime'), ('kids', 'Kids'), ('reviews', 'Reviews')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('family_id', models.IntegerField(blank=True, null=True)),
+                ('babysitter_id', models.IntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['family_id', 'deleted_at'], name='tomb_family_deleted_idx'), models.Index(fields=['babysitter_id', 'deleted_at'], name='tomb_sitter_deleted_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Babysitter = apps.get_model('base', 'Babysitter')
+    Reviews = apps.get_model('base', 'Reviews')
+    rows = (Reviews.objects.order_by().values('babysitter_id')
+            .annotate(rating_count=Count('id'), rating_sum=Sum('rating'),
+                      **{f'rating_{star}_count': Count('id', filter=Q(rating=star)) for star in range(1, 6)}))
+    for row in rows:
+        babysitter_id = row.pop('babysitter_id')
+        Babysitter.objects.filter(id=babysitter_id).update(
+            rating_average=row['rating_sum'] / row['rating_count'], **row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0012_tombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_1_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_2_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_3_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_4_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_5_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='babysitter',
+            index=models.Index(fields=['rating_average', 'id'], name='sitter_rating_idx'),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:20
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0013_babysitter_ratings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='babysitter',
+            index=models.Index(fields=['hourly_rate', 'age'], name='sitter_rate_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='babysitter',
+            index=models.Index(fields=['age', 'hourly_rate'], name='sitter_age_rate_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='babysitter',
+            index=models.Index(django.db.models.functions.text.Lower('address'), models.F('hourly_rate'), name='sitter_city_rate_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations
+
+# Frozen copy of base.search.SQLiteSearchBackend's index as of this migration
+TRIGGERS = ['base_babysitter_fts_insert', 'base_babysitter_fts_update', 'base_babysitter_fts_delete',
+            'base_reviews_fts_insert', 'base_reviews_fts_update', 'base_reviews_fts_delete']
+
+SETUP_SQL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS base_babysitter_fts USING fts5(
+        name, description, reviews, tokenize = 'porter unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS base_babysitter_fts_insert AFTER INSERT ON base_babysitter BEGIN
+        INSERT INTO base_babysitter_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS base_babysitter_fts_update AFTER UPDATE OF name, description ON base_babysitter
+    BEGIN
+        UPDATE base_babysitter_fts SET name = new.name, description = new.description WHERE rowid = new.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS base_babysitter_fts_delete AFTER DELETE ON base_babysitter BEGIN
+        DELETE FROM base_babysitter_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS base_reviews_fts_insert AFTER INSERT ON base_reviews BEGIN
+        UPDATE base_babysitter_fts SET reviews = (SELECT group_concat(review_text, ' ') FROM base_reviews
+                                                  WHERE babysitter_id = new.babysitter_id)
+        WHERE rowid = new.babysitter_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS base_reviews_fts_update AFTER UPDATE OF review_text, babysitter_id ON base_reviews
+    BEGIN
+        UPDATE base_babysitter_fts SET reviews = (SELECT group_concat(review_text, ' ') FROM base_reviews
+                                                  WHERE babysitter_id = base_babysitter_fts.rowid)
+        WHERE rowid IN (old.babysitter_id, new.babysitter_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS base_reviews_fts_delete AFTER DELETE ON base_reviews BEGIN
+        UPDATE base_babysitter_fts SET reviews = (SELECT group_concat(review_text, ' ') FROM base_reviews
+                                                  WHERE babysitter_id = old.babysitter_id)
+        WHERE rowid = old.babysitter_id;
+    END""",
+    "DELETE FROM base_babysitter_fts",
+    """INSERT INTO base_babysitter_fts(rowid, name, description, reviews)
+        SELECT id, name, description,
+               (SELECT group_concat(review_text, ' ') FROM base_reviews WHERE babysitter_id = base_babysitter.id)
+        FROM base_babysitter""",
+]
+
+# PostgreSQL searches the source tables directly, so only SQLite has an index to install
+def install_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in SETUP_SQL:
+            cursor.execute(sql)
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for trigger in TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute('DROP TABLE IF EXISTS base_babysitter_fts')
+
+class Migration(migrations.Migration):
+    dependencies = [('base', '0014_babysitter_search_indexes')]
+    operations = [migrations.RunPython(install_search_index, drop_search_index)]
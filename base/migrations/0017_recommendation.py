@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0016_locations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('babysitter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='base.babysitter')),
+                ('family', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='base.parents')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('family', 'rank'), name='recommend_family_rank_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of base.models.address_city
+def address_city(address):
+    return ' '.join(address.rsplit(',', 1)[-1].lower().split())
+
+
+def backfill_cities(apps, schema_editor):
+    Babysitter = apps.get_model('base', 'Babysitter')
+    for address in Babysitter.objects.order_by().values_list('address', flat=True).distinct():
+        Babysitter.objects.filter(address=address).update(city=address_city(address))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0017_recommendation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='babysitter',
+            name='sitter_city_rate_idx',
+        ),
+        migrations.AddField(
+            model_name='babysitter',
+            name='city',
+            field=models.CharField(blank=True, editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(backfill_cities, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='babysitter',
+            index=models.Index(fields=['city', 'hourly_rate'], name='sitter_city_rate_idx'),
+        ),
+    ]
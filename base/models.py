@@ -1,6 +1,12 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+def address_city(address):
+    """
+    Return the city of an address: its last comma separated part, lowercased ("Dizengoff 5, Tel Aviv" -> "tel aviv").
+    """
+    return ' '.join(address.rsplit(',', 1)[-1].lower().split())
+
 class Babysitter(models.Model):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
@@ -11,8 +17,43 @@ class Babysitter(models.Model):
     profile_picture = models.ImageField(upload_to='babysitters_profile_pics/', blank=False, null=False, default='static/default_image.jpg')
     phone_number = models.CharField(max_length=15 , unique=True)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, unique=True , related_name="Babysitter")
+    # City of the address (see address_city), set on save
+    city = models.CharField(max_length=255, null=True, blank=True, editable=False)
+    # Aggregates of the babysitter's reviews, maintained by base.ratings
+    rating_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_average = models.FloatField(default=0)  # 0 when there are no reviews
+    rating_1_count = models.IntegerField(default=0)
+    rating_2_count = models.IntegerField(default=0)
+    rating_3_count = models.IntegerField(default=0)
+    rating_4_count = models.IntegerField(default=0)
+    rating_5_count = models.IntegerField(default=0)
+    # Location of the address, set by base.geo (empty when it could not be geocoded)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    geohash = models.CharField(max_length=12, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Babysitter list sorted / filtered by average rating
+            models.Index(fields=['rating_average', 'id'], name='sitter_rating_idx'),
+            # Babysitter list filters (see BabysitterListView)
+            models.Index(fields=['hourly_rate', 'age'], name='sitter_rate_age_idx'),
+            models.Index(fields=['age', 'hourly_rate'], name='sitter_age_rate_idx'),
+            models.Index(fields=['city', 'hourly_rate'], name='sitter_city_rate_idx'),
+            # Babysitters near a point: ranges of geohash prefixes
+            models.Index(fields=['geohash'], name='sitter_geohash_idx'),
+        ]
     
+    def save(self, *args, **kwargs):
+        self.city = address_city(self.address)
+        # The city and the location (set by base.geo's pre_save) follow the address
+        if kwargs.get('update_fields') is not None and 'address' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'city', 'latitude', 'longitude', 'geohash'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -25,7 +66,17 @@ class Parents(models.Model):
     profile_picture = models.ImageField(upload_to='parents_profile_pics/', blank=False, null=False, default='static/default_image.jpg')
     phone_number = models.CharField(max_length=15 , unique=True)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, unique=True , related_name="Parent")
+    # Location of the address, set by base.geo (empty when it could not be geocoded)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        # The location (set by base.geo's pre_save) follows the address
+        if kwargs.get('update_fields') is not None and 'address' in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'latitude', 'longitude'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.last_name
@@ -36,6 +87,7 @@ class Kids(models.Model):
     name = models.CharField(max_length=255, )
     age = models.IntegerField(default=0)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.name
@@ -45,10 +97,89 @@ class AvailableTime(models.Model):
     babysitter = models.ForeignKey(Babysitter, related_name='available_times', on_delete=models.CASCADE)
     start_time = models.DateTimeField(null=False)
     end_time = models.DateTimeField(null=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['babysitter', 'start_time', 'end_time'], name='avail_sitter_start_end_idx'),
+        ]
 
     def __str__(self):
         return f"from {self.start_time} to {self.end_time}"
 
+class RecurringAvailability(models.Model):
+    """
+    Weekly availability pattern of a babysitter, expanded into concrete time periods only when queried.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    babysitter = models.ForeignKey(Babysitter, related_name='recurring_availabilities', on_delete=models.CASCADE)
+    weekday = models.IntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField(null=False)
+    end_time = models.TimeField(null=False)  # Not after start_time means the next day
+    start_date = models.DateField(null=False)
+    end_date = models.DateField(null=True, blank=True)  # Empty means no end
+    exceptions = models.JSONField(default=list, blank=True)  # Dates (YYYY-MM-DD) without the occurrence
+    created_time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['babysitter', 'start_date', 'end_date'], name='recur_sitter_dates_idx'),
+            models.Index(fields=['weekday', 'start_time', 'end_time'], name='recur_weekday_times_idx'),
+        ]
+
+    def __str__(self):
+        return f"every {self.get_weekday_display()} from {self.start_time} to {self.end_time}"
+
+class FreeSlot(models.Model):
+    """
+    Materialized part of an available time that is not busy with an approved meeting.
+    """
+    id = models.AutoField(primary_key=True)
+    babysitter = models.ForeignKey(Babysitter, related_name='free_slots', on_delete=models.CASCADE)
+    available_time = models.ForeignKey(AvailableTime, related_name='free_slots', on_delete=models.CASCADE)
+    start_time = models.DateTimeField(null=False)
+    end_time = models.DateTimeField(null=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['babysitter', 'start_time', 'end_time'], name='free_sitter_start_end_idx'),
+        ]
+
+    def __str__(self):
+        return f"free from {self.start_time} to {self.end_time}"
+
+class DayBitmap(models.Model):
+    """
+    Availability and busy time of a babysitter on a single (UTC) day, one bit per 15 minutes bucket.
+    """
+    id = models.AutoField(primary_key=True)
+    babysitter = models.ForeignKey(Babysitter, related_name='day_bitmaps', on_delete=models.CASCADE)
+    day = models.DateField(null=False)
+    available = models.BinaryField(max_length=12)  # Buckets fully covered by available times
+    busy = models.BinaryField(max_length=12)  # Buckets touched by approved meetings
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['babysitter', 'day'], name='bitmap_sitter_day_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'babysitter'], name='bitmap_day_sitter_idx'),
+        ]
+
+    def __str__(self):
+        return f"bitmap of {self.babysitter} on {self.day}"
+
 class Meetings(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -62,8 +193,14 @@ class Meetings(models.Model):
     family = models.ForeignKey(Parents, null=False, related_name='meetings', on_delete=models.CASCADE)
     babysitter = models.ForeignKey(Babysitter, null=False, related_name='meetings', on_delete=models.CASCADE)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['babysitter', 'status', 'start_time'], name='meet_sitter_status_start_idx'),
+        ]
+
     def __str__(self):
         return f"Meeting on {self.meeting_time} between {self.family} and {self.babysitter}"
     
@@ -74,6 +211,7 @@ class Reviews(models.Model):
     review_text = models.TextField(null=False, blank=False , default="Write")
     rating = models.IntegerField(null=False, blank=False , default=5)
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Review for {self.babysitter} by {self.family}"
@@ -90,8 +228,62 @@ class Requests(models.Model):
     babysitter = models.ForeignKey(Babysitter, related_name='requests', on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     is_active = models.BooleanField(default='True')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['family', 'babysitter', 'status', 'is_active'], name='req_family_sitter_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Request from {self.family} to {self.babysitter} - {self.status}"
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted row, so clients syncing changes since a cursor also learn about deletions.
+    The owners are plain ids, as the owner rows may be deleted as well.
+    """
+    MODEL_CHOICES = [
+        ('requests', 'Requests'),
+        ('meetings', 'Meetings'),
+        ('availability', 'AvailableTime'),
+        ('kids', 'Kids'),
+        ('reviews', 'Reviews'),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    family_id = models.IntegerField(null=True, blank=True)
+    babysitter_id = models.IntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['family_id', 'deleted_at'], name='tomb_family_deleted_idx'),
+            models.Index(fields=['babysitter_id', 'deleted_at'], name='tomb_sitter_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+class Recommendation(models.Model):
+    """
+    Babysitter recommended to parents: the parents' top K babysitters, precomputed by base.recommendations.
+    """
+    id = models.AutoField(primary_key=True)
+    family = models.ForeignKey(Parents, related_name='recommendations', on_delete=models.CASCADE)
+    babysitter = models.ForeignKey(Babysitter, related_name='recommendations', on_delete=models.CASCADE)
+    rank = models.IntegerField()  # 1 is the best
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # Also the index of the recommended list: the family's rows in rank order
+            models.UniqueConstraint(fields=['family', 'rank'], name='recommend_family_rank_unique'),
+        ]
+
     def __str__(self):
-        return f"Request from {self.family} to {self.babysitter} - {self.status}"
\ No newline at end of file
+        return f"{self.babysitter} recommended to {self.family} (#{self.rank})"
@@ -0,0 +1,154 @@
+# Keyset (cursor) pagination: every page is a range read on an indexed column, without COUNT(*)
+
+import json
+from itertools import islice
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Default pagination of all list endpoints.
+
+    Pages are ordered on the primary key unless the view sets `cursor_ordering` to another
+    (indexed) column. The primary key then breaks the ties and the cursor holds both values, so any
+    number of rows sharing a value are paged as index ranges (DRF's single column cursor skips them
+    with an offset, capped at offset_cutoff).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = '-pk'
+
+    def get_ordering(self, request, queryset, view):
+        self.ordering = getattr(view, 'cursor_ordering', type(self).ordering)
+        ordering = super().get_ordering(request, queryset, view)
+        if len(ordering) == 1 and ordering[0].lstrip('-') != 'pk':
+            ordering += ('-pk' if ordering[0].startswith('-') else 'pk',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(request, queryset, view)
+        if len(ordering) == 1:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+
+        self.cursor = self.decode_cursor(request)
+        reverse, position = (False, None) if self.cursor is None else (self.cursor.reverse, self.cursor.position)
+        results = list(self.page_window(queryset, request, view))
+        self.page = results[:self.page_size]
+        following_position = (self._get_position_from_instance(results[-1], ordering)
+                              if len(results) > len(self.page) else None)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = position is not None, position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = position is not None, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def page_window(self, queryset, request, view=None):
+        """
+        Return the rows read for the requested page, and the one after it telling whether there is a next
+        page, as an unevaluated queryset (the whole queryset if the request is not paginated).
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return queryset
+        self.ordering = ordering = self.get_ordering(request, queryset, view)
+        cursor = self.decode_cursor(request)
+        offset, reverse, position = (0, False, None) if cursor is None else cursor
+        queryset = queryset.order_by(*(pagination._reverse_ordering(ordering) if reverse else ordering))
+        if len(ordering) > 1:
+            # Positions are unique, so the links never need an offset
+            return (queryset if position is None else self.keyset_filter(queryset, position, reverse))[:page_size + 1]
+        if position is not None:
+            # DRF's single column cursor
+            lookup = 'lt' if reverse != ordering[0].startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{ordering[0].lstrip('-')}__{lookup}": position})
+        return queryset[offset:offset + page_size + 1]
+
+    def keyset_filter(self, queryset, position, reverse):
+        """
+        Restrict the queryset to the rows after the position (before it for reverse cursors).
+        """
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError(position)
+            after, equal = Q(), {}
+            for column, value in zip(self.ordering, values):
+                name = column.lstrip('-')
+                lookup = 'lt' if column.startswith('-') != reverse else 'gt'
+                after |= Q(**equal, **{f'{name}__{lookup}': value})
+                equal[name] = value
+            # The bound on the leading column alone lets the database read a single index range
+            first = self.ordering[0].lstrip('-')
+            bound = 'lte' if self.ordering[0].startswith('-') != reverse else 'gte'
+            return queryset.filter(after, **{f'{first}__{bound}': values[0]})
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        values = []
+        for column in ordering:
+            name = column.lstrip('-')
+            values.append(str(instance[name] if isinstance(instance, dict) else getattr(instance, name)))
+        return json.dumps(values)
+
+class IntervalCursorPagination(CursorPagination):
+    """
+    Forward-only cursor pagination over a stream of intervals sorted by (start_time, end_time).
+
+    Used where the results are not all database rows (concrete available times merged with
+    recurring occurrences), so the cursor holds the last start time and the number of results
+    with that start time that were already returned.
+    """
+    def paginate_stream(self, stream, request, view=None):
+        """
+        Return a page of the stream.
+        - **stream** (callable): Receives a position (datetime or None) and returns the sorted intervals
+          starting at or after it.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.next_link = None
+
+        cursor = self.decode_cursor(request)
+        offset, position = 0, None
+        if cursor is not None:
+            offset, position = cursor.offset, parse_datetime(cursor.position or '')
+            if position is None:
+                raise NotFound(self.invalid_cursor_message)
+
+        results = list(islice(stream(position), offset, offset + self.page_size + 1))
+        page = results[:self.page_size]
+        if len(results) > len(page):
+            last = page[-1].start_time
+            returned = sum(1 for item in page if item.start_time == last)
+            # The results skipped by this cursor started at the same time as well
+            if last == position:
+                returned += offset
+            self.next_link = self.encode_cursor(
+                pagination.Cursor(offset=returned, reverse=False, position=last.isoformat()))
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': None,
+            'results': data,
+        })
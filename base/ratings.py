@@ -0,0 +1,79 @@
+# Rating aggregates of the babysitters (count, sum, average and per star histogram), maintained
+# incrementally with F() expressions on every review write and recomputed from Reviews to fix drift
+
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+from .models import Babysitter, Reviews
+from .caching import invalidate
+
+RATING_STARS = range(1, 6)
+
+AGGREGATE_FIELDS = (['rating_count', 'rating_sum', 'rating_average']
+                    + [f'rating_{star}_count' for star in RATING_STARS])
+
+def add_rating(babysitter_id, rating, sign=1):
+    """
+    Add (sign=1) or remove (sign=-1) a rating from the babysitter's aggregates in a single UPDATE.
+
+    The new values are computed by the database from the current ones, so concurrent review writes
+    never overwrite each other.
+    """
+    count = F('rating_count') + sign
+    total = F('rating_sum') + sign * rating
+    changes = {
+        'rating_count': count,
+        'rating_sum': total,
+        'rating_average': Case(When(rating_count=-sign, then=Value(0.0)),
+                               default=Cast(total, FloatField()) / count, output_field=FloatField()),
+        # The aggregates are part of the babysitter payloads and their validators
+        'updated_at': timezone.now(),
+    }
+    if rating in RATING_STARS:
+        changes[f'rating_{rating}_count'] = F(f'rating_{rating}_count') + sign
+    Babysitter.objects.filter(id=babysitter_id).update(**changes)
+    # Updates send no model signals
+    invalidate('babysitters', f'babysitter:{babysitter_id}')
+
+def remove_rating(babysitter_id, rating):
+    add_rating(babysitter_id, rating, sign=-1)
+
+def computed_ratings(babysitter_ids=None):
+    """
+    Return the rating aggregates of the babysitters computed from their reviews, by babysitter id.
+    Babysitters without reviews are left out.
+    """
+    reviews = Reviews.objects.all()
+    if babysitter_ids is not None:
+        reviews = reviews.filter(babysitter_id__in=babysitter_ids)
+    rows = (reviews.order_by().values('babysitter_id')
+            .annotate(rating_count=Count('id'), rating_sum=Sum('rating'),
+                      **{f'rating_{star}_count': Count('id', filter=Q(rating=star)) for star in RATING_STARS}))
+    aggregates = {}
+    for row in rows:
+        babysitter_id = row.pop('babysitter_id')
+        row['rating_average'] = row['rating_sum'] / row['rating_count']
+        aggregates[babysitter_id] = row
+    return aggregates
+
+def recompute_ratings(babysitter_ids=None, verify=False):
+    """
+    Compare the stored rating aggregates with the ones computed from the reviews and fix them
+    (unless verify). Returns the ids of the babysitters whose aggregates drifted.
+    """
+    computed = computed_ratings(babysitter_ids)
+    empty = {field: 0 for field in AGGREGATE_FIELDS}
+    babysitters = Babysitter.objects.order_by('id').only('id', *AGGREGATE_FIELDS)
+    if babysitter_ids is not None:
+        babysitters = babysitters.filter(id__in=babysitter_ids)
+
+    drifted = []
+    for babysitter in babysitters.iterator():
+        expected = computed.get(babysitter.id, empty)
+        if any(getattr(babysitter, field) != expected[field] for field in AGGREGATE_FIELDS):
+            drifted.append(babysitter.id)
+            if not verify:
+                Babysitter.objects.filter(id=babysitter.id).update(updated_at=timezone.now(), **expected)
+    if drifted and not verify:
+        invalidate('babysitters', *(f'babysitter:{babysitter_id}' for babysitter_id in drifted))
+    return drifted
@@ -0,0 +1,220 @@
+# Babysitter recommendations: a batch job scores every babysitter for every parent on distance, rating,
+# price, availability and approval history, and stores each parent's top K, so the recommended list is
+# a single indexed read
+
+import heapq
+import math
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count, Q
+from django.utils import timezone
+from .models import AvailableTime, Babysitter, Meetings, Parents, Recommendation, Requests
+from .geo import KM_PER_DEGREE
+from .recurring import expand_rule, recurring_rules, recurring_window
+
+# Relative weights of the signals, each scored between 0 and 1
+RECOMMENDATION_WEIGHTS = {'distance': 0.3, 'rating': 0.25, 'price': 0.15, 'availability': 0.15, 'approval': 0.15}
+RECOMMENDATION_TOP_K = 50
+
+# A babysitter this far away scores half of one next door
+DISTANCE_SCALE_KM = 5.0
+# Ratings are averaged with this many reviews of this many stars, so a single 5 stars review is no jackpot
+RATING_PRIOR_COUNT, RATING_PRIOR_AVERAGE = 2, 3.0
+WEEK_HOURS = 7 * 24
+# Parents are scored and stored in batches of this size
+FAMILY_BATCH = 500
+
+def recommendation_weights():
+    return getattr(settings, 'RECOMMENDATION_WEIGHTS', RECOMMENDATION_WEIGHTS)
+
+def recommendation_top_k():
+    return getattr(settings, 'RECOMMENDATION_TOP_K', RECOMMENDATION_TOP_K)
+
+def week_hours(start, end):
+    """
+    Return the hours of the week (0 is Monday 00:00, local time) that the [start, end) period overlaps.
+    """
+    hour = timezone.localtime(start).replace(minute=0, second=0, microsecond=0)
+    hours = set()
+    while hour < end and len(hours) < WEEK_HOURS:
+        hours.add(hour.weekday() * 24 + hour.hour)
+        hour += timedelta(hours=1)
+    return hours
+
+# ============================================
+#                  Features
+# ============================================
+
+class Candidates:
+    """
+    The recommendable (active) babysitters and their features that do not depend on the parents, as
+    lists in babysitter id order.
+    """
+    def __init__(self, now=None):
+        rows = list(Babysitter.objects.filter(user__is_active=True).order_by('id')
+                    .values_list('id', 'latitude', 'longitude', 'hourly_rate', 'rating_count', 'rating_sum'))
+        self.ids = [row[0] for row in rows]
+        self.positions = {babysitter_id: position for position, babysitter_id in enumerate(self.ids)}
+        self.latitude = [row[1] for row in rows]
+        self.longitude = [row[2] for row in rows]
+        self.hourly_rate = [float(row[3]) for row in rows]
+        self.mean_hourly_rate = sum(self.hourly_rate) / len(rows) if rows else 0.0
+        self.rating = [(rating_sum + RATING_PRIOR_AVERAGE * RATING_PRIOR_COUNT) / (rating_count + RATING_PRIOR_COUNT) / 5
+                       for *_, rating_count, rating_sum in rows]
+
+        # Share of the decided requests the babysitter approved, starting from 1 in 2
+        self.approval = [0.5] * len(rows)
+        decided = (Requests.objects.filter(status__in=['approved', 'declined']).order_by().values('babysitter_id')
+                   .annotate(approved=Count('id', filter=Q(status='approved')), decided=Count('id')))
+        for row in decided:
+            if row['babysitter_id'] in self.positions:
+                self.approval[self.positions[row['babysitter_id']]] = (row['approved'] + 1) / (row['decided'] + 2)
+
+        # Hour of the week -> positions of the babysitters available then in the coming weeks
+        start, end = recurring_window(now)
+        available = [set() for _ in rows]
+        periods = (AvailableTime.objects.filter(start_time__lt=end, end_time__gt=start)
+                   .values_list('babysitter_id', 'start_time', 'end_time'))
+        for babysitter_id, period_start, period_end in periods.iterator():
+            if babysitter_id in self.positions:
+                available[self.positions[babysitter_id]] |= week_hours(period_start, period_end)
+        for rule in recurring_rules(start, end).iterator():
+            if rule.babysitter_id not in self.positions:
+                continue
+            for occurrence_start, occurrence_end in expand_rule(rule, start, end):
+                available[self.positions[rule.babysitter_id]] |= week_hours(occurrence_start, occurrence_end)
+        available_at = {}
+        for position, hours in enumerate(available):
+            for hour in hours:
+                available_at.setdefault(hour, []).append(position)
+        self.available_at = available_at
+
+
+def family_profiles(families, candidates, now=None):
+    """
+    Return the features of the families that score the babysitters, by family id:
+    - **location** ((float, float) or None): The family's latitude / longitude.
+    - **hourly_rate** (float): The average hourly rate of the babysitters they met, else of all of them.
+    - **hours** (dict): Hour of the week -> share of their past meetings' hours.
+    - **approvals** (dict): Candidate position -> 1 if the babysitter approved one of their requests, 0 if
+      the babysitter only declined them.
+    """
+    now = now or timezone.now()
+    family_ids = [family.family_id for family in families]
+    meetings = Meetings.objects.filter(family_id__in=family_ids).exclude(status='declined').order_by()
+    hourly_rates = dict(meetings.values('family_id').annotate(rate=Avg('babysitter__hourly_rate'))
+                        .values_list('family_id', 'rate'))
+    profiles = {family.family_id: {
+        'location': (family.latitude, family.longitude) if family.latitude is not None else None,
+        'hourly_rate': float(hourly_rates.get(family.family_id) or candidates.mean_hourly_rate),
+        'hours': {},
+        'approvals': {},
+    } for family in families}
+
+    for family_id, start, end in meetings.filter(start_time__lt=now).values_list('family_id', 'start_time', 'end_time'):
+        hours = profiles[family_id]['hours']
+        for hour in week_hours(start, end):
+            hours[hour] = hours.get(hour, 0) + 1
+    for profile in profiles.values():
+        total = sum(profile['hours'].values())
+        profile['hours'] = {hour: count / total for hour, count in profile['hours'].items()}
+
+    requests = (Requests.objects.filter(family_id__in=family_ids, status__in=['approved', 'declined'])
+                .values_list('family_id', 'babysitter_id', 'status'))
+    for family_id, babysitter_id, request_status in requests:
+        if babysitter_id in candidates.positions:
+            approvals = profiles[family_id]['approvals']
+            position = candidates.positions[babysitter_id]
+            approvals[position] = max(approvals.get(position, 0.0), 1.0 if request_status == 'approved' else 0.0)
+    return profiles
+
+# ============================================
+#                  Scoring
+# ============================================
+
+def score_babysitters(candidates, profile, weights):
+    """
+    Return the scores of the candidates for a family, in candidate order.
+    """
+    availability = [0.0] * len(candidates.ids)
+    for hour, share in profile['hours'].items():
+        for position in candidates.available_at.get(hour, ()):
+            availability[position] += share
+    approval = list(candidates.approval)
+    for position, value in profile['approvals'].items():
+        approval[position] = value
+    reference_rate = max(profile['hourly_rate'], 1.0)
+    if profile['location'] is not None:
+        family_latitude, family_longitude = profile['location']
+        scale = math.cos(math.radians(family_latitude))
+
+    scores = []
+    for position in range(len(candidates.ids)):
+        distance = 0.0
+        if profile['location'] is not None and candidates.latitude[position] is not None:
+            # Equirectangular approximation, as base.geo
+            kilometers = math.hypot(candidates.latitude[position] - family_latitude,
+                                    (candidates.longitude[position] - family_longitude) * scale) * KM_PER_DEGREE
+            distance = 1 / (1 + kilometers / DISTANCE_SCALE_KM)
+        price = 1 / (1 + abs(candidates.hourly_rate[position] - reference_rate) / reference_rate)
+        scores.append(weights['distance'] * distance + weights['rating'] * candidates.rating[position]
+                      + weights['price'] * price + weights['availability'] * availability[position]
+                      + weights['approval'] * approval[position])
+    return scores
+
+def top_k(candidates, scores, k):
+    """
+    Return the (babysitter id, score) pairs of the k best scores, best first (then by babysitter id).
+    """
+    positions = heapq.nsmallest(k, range(len(scores)),
+                                key=lambda position: (-scores[position], candidates.ids[position]))
+    return [(candidates.ids[position], scores[position]) for position in positions]
+
+# ============================================
+#                  Batch Job
+# ============================================
+
+def recompute_recommendations(family_ids=None, k=None, now=None):
+    """
+    Score the babysitters for every family (or the given ones) and replace their stored top K.
+    Returns the number of families whose recommendations were stored.
+    """
+    now = now or timezone.now()
+    k = k or recommendation_top_k()
+    weights = recommendation_weights()
+
+    candidates = Candidates(now)
+    families = Parents.objects.order_by('family_id').only('family_id', 'latitude', 'longitude')
+    if family_ids is not None:
+        families = families.filter(family_id__in=family_ids)
+    batch, stored = [], 0
+    for family in families.iterator(chunk_size=FAMILY_BATCH):
+        batch.append(family)
+        if len(batch) == FAMILY_BATCH:
+            stored += _store_batch(batch, candidates, weights, k, now)
+            batch = []
+    if batch:
+        stored += _store_batch(batch, candidates, weights, k, now)
+    return stored
+
+def _store_batch(families, candidates, weights, k, now):
+    profiles = family_profiles(families, candidates, now)
+    rows = []
+    for family_id, profile in profiles.items():
+        best = top_k(candidates, score_babysitters(candidates, profile, weights), k) if candidates.ids else []
+        rows.extend(Recommendation(family_id=family_id, babysitter_id=babysitter_id, rank=rank, score=value,
+                                   computed_at=now)
+                    for rank, (babysitter_id, value) in enumerate(best, 1))
+    with transaction.atomic():
+        Recommendation.objects.filter(family_id__in=list(profiles)).delete()
+        Recommendation.objects.bulk_create(rows, batch_size=1000)
+    return len(profiles)
+
+def recommended_babysitters(family):
+    """
+    Return the family's recommendations that are still active, best first, with their babysitters.
+    A single read of the recommend_family_rank_unique index.
+    """
+    return list(Recommendation.objects.filter(family=family, babysitter__user__is_active=True)
+                .select_related('babysitter').order_by('rank'))
@@ -0,0 +1,105 @@
+# Recurring (weekly) availability: rules are expanded lazily into concrete time periods
+
+import heapq
+from datetime import datetime, timedelta
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import RecurringAvailability
+
+# How far ahead recurring availability is expanded when a query has no end
+RECURRING_HORIZON = timedelta(days=28)
+
+def recurring_window(start=None, end=None):
+    """
+    Fill in the missing edges of a query window, so open-ended rules expand into a finite period.
+    """
+    if start is None:
+        start = timezone.now() if end is None else end - RECURRING_HORIZON
+    if end is None:
+        end = start + RECURRING_HORIZON
+    return start, end
+
+def occurrence(rule, date, tz, overnight):
+    """
+    Return the (start, end) of the occurrence of a recurring rule starting on the given local date.
+    """
+    return (timezone.make_aware(datetime.combine(date, rule.start_time), tz),
+            timezone.make_aware(datetime.combine(date + timedelta(days=1) if overnight else date, rule.end_time), tz))
+
+def expand_rule(rule, start, end):
+    """
+    Yield the (start, end) occurrences of a recurring rule that overlap the [start, end) window, in time order.
+    """
+    tz = timezone.get_current_timezone()
+    overnight = rule.end_time <= rule.start_time
+    # An overnight occurrence of the previous day may still overlap the window
+    first_date = max(rule.start_date, timezone.localtime(start, tz).date() - timedelta(days=1))
+    last_date = timezone.localtime(end, tz).date()
+    if rule.end_date is not None:
+        last_date = min(last_date, rule.end_date)
+    exceptions = set(rule.exceptions)
+
+    date = first_date + timedelta(days=(rule.weekday - first_date.weekday()) % 7)
+    while date <= last_date:
+        if date.isoformat() not in exceptions:
+            occurrence_start, occurrence_end = occurrence(rule, date, tz, overnight)
+            if occurrence_start < end and occurrence_end > start:
+                yield occurrence_start, occurrence_end
+        date += timedelta(days=7)
+
+def recurring_rules(start, end, **filters):
+    """
+    Return the recurring rules that may have an occurrence overlapping the [start, end) window.
+    """
+    tz = timezone.get_current_timezone()
+    return RecurringAvailability.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=timezone.localtime(start, tz).date() - timedelta(days=1)),
+        start_date__lte=timezone.localtime(end, tz).date(),
+        **filters
+    )
+
+def recurring_intervals(babysitter_id, start, end):
+    """
+    Lazily yield the babysitter's recurring (start, end) occurrences overlapping the window, sorted by start.
+    """
+    rules = recurring_rules(start, end, babysitter_id=babysitter_id)
+    return heapq.merge(*(expand_rule(rule, start, end) for rule in rules))
+
+def recurring_covers(babysitter_id, start, end):
+    """
+    Check if one recurring occurrence of the babysitter covers the whole [start, end] period.
+    """
+    return any(occurrence_start <= start and occurrence_end >= end
+               for occurrence_start, occurrence_end in recurring_intervals(babysitter_id, start, end))
+
+def babysitters_with_recurring_cover(start, end):
+    """
+    Return the ids of the babysitters with a recurring occurrence covering the whole [start, end] period.
+    """
+    tz = timezone.get_current_timezone()
+    local_start, local_end = timezone.localtime(start, tz), timezone.localtime(end, tz)
+    weekday, previous_weekday = local_start.weekday(), (local_start.weekday() - 1) % 7
+    overnight = Q(end_time__lte=F('start_time'))
+
+    # Narrow the candidates with the indexed weekday/time columns, then check the exact occurrences
+    if local_start.date() == local_end.date():
+        candidates = (Q(weekday=weekday, start_time__lte=local_start.time(), end_time__gte=local_end.time())
+                      | (overnight & Q(weekday=weekday, start_time__lte=local_start.time()))
+                      | (overnight & Q(weekday=previous_weekday, end_time__gte=local_end.time())))
+    else:
+        candidates = overnight & Q(weekday=weekday, start_time__lte=local_start.time())
+    rules = (recurring_rules(start, end).filter(candidates)
+             .only('babysitter', 'weekday', 'start_time', 'end_time', 'start_date', 'end_date', 'exceptions'))
+
+    # Only the occurrence starting on the local start date (or the day before, for the overnight
+    # rules of the previous weekday) can cover the window, so it is computed without expanding the rule
+    babysitter_ids = set()
+    for rule in rules.iterator():
+        date = local_start.date() - timedelta(days=(weekday - rule.weekday) % 7)
+        if (date < rule.start_date or (rule.end_date is not None and date > rule.end_date)
+                or date.isoformat() in rule.exceptions):
+            continue
+        occurrence_start, occurrence_end = occurrence(rule, date, tz, rule.end_time <= rule.start_time)
+        if occurrence_start <= start and occurrence_end >= end:
+            babysitter_ids.add(rule.babysitter_id)
+    return babysitter_ids
@@ -0,0 +1,53 @@
+# JSON renderer and parser on top of orjson, falling back to DRF's stdlib json ones when it is not installed
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Same output as DRF's JSONEncoder: UTC datetimes end with 'Z', dict keys may be non strings
+    ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer rendering the compact JSON of API responses with orjson.
+
+    datetime, date, time and UUID values are encoded natively; the other types (Decimal, lazy strings,
+    querysets...) go through DRF's JSONEncoder. Indented output (browsable API, `indent` media type
+    parameter) and non-UTF-8 settings are rendered by the stdlib JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+        # Same as JSONRenderer: escape \u2028 and \u2029 so the output is a strict javascript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser parsing UTF-8 request bodies with orjson (and the other encodings with the stdlib one).
+    """
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8 and always rejects NaN and Infinity
+        if orjson is None or not self.strict or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -0,0 +1,218 @@
+# Full text search over the babysitters' names, descriptions and review texts, ranked by relevance.
+# SQLite uses an FTS5 index kept in sync by triggers, PostgreSQL its text search functions, behind the
+# same websearch-style query syntax
+
+import re
+from django.apps import apps
+from django.core import checks
+from django.db import connection, connections
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+# Relative weights of the name, description and reviews columns
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+# websearch_to_tsquery syntax: "quoted phrases", -excluded terms and `or` between terms
+_QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"?|(\S+)')
+_WORD = re.compile(r'\w+')
+
+def parse_query(text):
+    """
+    Parse a websearch-style query into (operator, words) pairs, where the words are a single term or a
+    phrase and the operator is 'AND', 'OR' or 'NOT' (for the excluded terms).
+    """
+    parsed, operator = [], 'AND'
+    for negate, phrase, word in _QUERY_TOKEN.findall(text):
+        if word.lower() == 'or':
+            operator = 'OR'
+            continue
+        if word:
+            negate, phrase = word[:1] == '-', word.lstrip('-')
+        # Punctuated words ("first-aid") are searched as phrases
+        words = _WORD.findall(phrase.lower())
+        if words:
+            parsed.append(('NOT' if negate else operator, words))
+        operator = 'AND'
+    return parsed
+
+def fts5_query(text):
+    """
+    Translate a websearch-style query into an FTS5 MATCH expression, or None if it has no searchable term.
+    """
+    included, excluded = [], []
+    for operator, words in parse_query(text):
+        term = '"' + ' '.join(words) + '"'
+        if operator == 'NOT':
+            excluded.append(term)
+        elif included:
+            included.append(f'{operator} {term}')
+        else:
+            included.append(term)
+    if not included:
+        return None
+    # AND binds tighter than OR in FTS5, as in tsquery
+    query = ' '.join(included)
+    for term in excluded:
+        query = f'({query}) NOT {term}'
+    return query
+
+class SQLiteSearchBackend:
+    """
+    FTS5 table with one row per babysitter (rowid = babysitter id), ranked with BM25.
+    """
+    table = 'base_babysitter_fts'
+
+    triggers = ['base_babysitter_fts_insert', 'base_babysitter_fts_update', 'base_babysitter_fts_delete',
+                'base_reviews_fts_insert', 'base_reviews_fts_update', 'base_reviews_fts_delete']
+
+    setup_sql = [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            name, description, reviews, tokenize = 'porter unicode61 remove_diacritics 2')""",
+        # Babysitters
+        f"""CREATE TRIGGER IF NOT EXISTS base_babysitter_fts_insert AFTER INSERT ON base_babysitter BEGIN
+            INSERT INTO {table}(rowid, name, description) VALUES (new.id, new.name, new.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_babysitter_fts_update AFTER UPDATE OF name, description ON base_babysitter
+        BEGIN
+            UPDATE {table} SET name = new.name, description = new.description WHERE rowid = new.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_babysitter_fts_delete AFTER DELETE ON base_babysitter BEGIN
+            DELETE FROM {table} WHERE rowid = old.id;
+        END""",
+        # Reviews: the reviews column of the babysitter is rebuilt from the reviews table
+        f"""CREATE TRIGGER IF NOT EXISTS base_reviews_fts_insert AFTER INSERT ON base_reviews BEGIN
+            UPDATE {table} SET reviews = (SELECT group_concat(review_text, ' ') FROM base_reviews
+                                          WHERE babysitter_id = new.babysitter_id)
+            WHERE rowid = new.babysitter_id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_reviews_fts_update AFTER UPDATE OF review_text, babysitter_id ON base_reviews
+        BEGIN
+            UPDATE {table} SET reviews = (SELECT group_concat(review_text, ' ') FROM base_reviews
+                                          WHERE babysitter_id = {table}.rowid)
+            WHERE rowid IN (old.babysitter_id, new.babysitter_id);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS base_reviews_fts_delete AFTER DELETE ON base_reviews BEGIN
+            UPDATE {table} SET reviews = (SELECT group_concat(review_text, ' ') FROM base_reviews
+                                          WHERE babysitter_id = old.babysitter_id)
+            WHERE rowid = old.babysitter_id;
+        END""",
+    ]
+
+    rebuild_sql = [
+        f"DELETE FROM {table}",
+        f"""INSERT INTO {table}(rowid, name, description, reviews)
+            SELECT id, name, description,
+                   (SELECT group_concat(review_text, ' ') FROM base_reviews WHERE babysitter_id = base_babysitter.id)
+            FROM base_babysitter""",
+    ]
+
+    def install(self, cursor, rebuild=True):
+        """
+        Create the index table and its triggers if missing, and fill it from the source tables.
+
+        SQLite drops the triggers of a table that a migration rebuilds (AlterField, some AddField), so
+        the index is installed again after every migrate that lost one (see reinstall_search_index).
+        """
+        for sql in self.setup_sql + (self.rebuild_sql if rebuild else []):
+            cursor.execute(sql)
+
+    def missing_triggers(self, cursor):
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+        installed = {row[0] for row in cursor.fetchall()}
+        return [trigger for trigger in self.triggers if trigger not in installed]
+
+    def search(self, text, limit, offset=0):
+        query = fts5_query(text)
+        if query is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""SELECT {self.table}.rowid, -bm25({self.table}, %s, %s, %s) AS score
+                    FROM {self.table}
+                    JOIN base_babysitter ON base_babysitter.id = {self.table}.rowid
+                    JOIN auth_user ON auth_user.id = base_babysitter.user_id
+                    WHERE {self.table} MATCH %s AND auth_user.is_active
+                    ORDER BY bm25({self.table}, %s, %s, %s)
+                    LIMIT %s OFFSET %s""",
+                [*SEARCH_WEIGHTS, query, *SEARCH_WEIGHTS, limit, offset])
+            return cursor.fetchall()
+
+class PostgresSearchBackend:
+    """
+    PostgreSQL text search with the same query syntax (websearch_to_tsquery) and weighted columns.
+
+    The document is computed at query time; a stored tsvector column with a GIN index is the next step
+    once the data outgrows that.
+    """
+    def install(self, cursor, rebuild=True):
+        pass
+
+    def missing_triggers(self, cursor):
+        return []
+
+    def search(self, text, limit, offset=0):
+        from django.contrib.postgres.aggregates import StringAgg
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+        from .models import Babysitter
+
+        query = SearchQuery(text, search_type='websearch', config='english')
+        vector = (SearchVector('name', weight='A', config='english')
+                  + SearchVector('description', weight='B', config='english')
+                  + SearchVector(StringAgg('reviews__review_text', ' ', default=''), weight='C', config='english'))
+        return list(Babysitter.objects
+                    .filter(user__is_active=True)
+                    .annotate(score=SearchRank(vector, query, weights=[0.0, 0.1, 0.5, 1.0]))
+                    .filter(score__gt=0)
+                    .order_by('-score', 'id')
+                    .values_list('id', 'score')[offset:offset + limit])
+
+def search_backend(vendor=None):
+    vendor = vendor or connection.vendor
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    raise NotImplementedError(f"Full text search is not supported on {vendor}")
+
+def search_babysitters(text, limit, offset=0):
+    """
+    Return the (babysitter id, score) pairs of the active babysitters matching a query, best first.
+    - **text** (str): Websearch-style query: words, "quoted phrases", -excluded words and `or`.
+    """
+    return search_backend().search(text, limit, offset)
+
+@checks.register(checks.Tags.database)
+def check_search_triggers(app_configs=None, databases=None, **kwargs):
+    """
+    Report the search index triggers missing from a database, since the index then silently goes stale.
+    """
+    errors = []
+    for alias in databases or []:
+        database = connections[alias]
+        # Not migrated yet: migrate installs the index
+        if database.vendor != 'sqlite' or 'base_babysitter' not in database.introspection.table_names():
+            continue
+        with database.cursor() as cursor:
+            missing = search_backend(database.vendor).missing_triggers(cursor)
+        if missing:
+            errors.append(checks.Warning(
+                f"The babysitter search index triggers {', '.join(missing)} are missing from the {alias} database.",
+                hint="Run `manage.py migrate` or `manage.py rebuild_search_index`.",
+                id='base.W001',
+            ))
+    return errors
+
+@receiver(post_migrate)
+def reinstall_search_index(sender, using='default', **kwargs):
+    """
+    Install and refill the search index again when a migration rebuilt a source table and dropped its triggers.
+    """
+    if sender is not apps.get_app_config('base'):
+        return
+    database = connections[using]
+    if database.vendor != 'sqlite':
+        return
+    with database.cursor() as cursor:
+        backend = search_backend(database.vendor)
+        if backend.missing_triggers(cursor):
+            backend.install(cursor)
@@ -1,13 +1,19 @@
 # Connect between the views.py to the database
 
 from rest_framework import serializers
-from .models import Babysitter, Meetings, Requests, Parents, Kids, Reviews, AvailableTime
+from .models import Babysitter, Meetings, Requests, Parents, Kids, Reviews, AvailableTime, RecurringAvailability
 from django.contrib.auth.models import User
+from .fieldsets import SparseFieldsMixin
 
-__all__ = ["RegistrationSerializer", "BabysitterSerializer", "BabysitterSerializerForParents", "KidsSerializer",
+__all__ = ["RegistrationSerializer", "BabysitterSerializer", "BabysitterSerializerForParents", "BabysitterSearchSerializer",
+           "BabysitterTextSearchSerializer", "BabysitterRecommendationSerializer", "KidsSerializer",
            "ParentsSerializer", "ParentsSerializerForBabysitter", "MeetingsSerializer", "MeetingsSerializerForCreating",
+            "MeetingsBatchSerializerForCreating",
             "ReviewsSerializer", "AvailableTimeSerializer", "RequestsSerializer", "RequestsIsActiveSerializer",
-            "RequestsStatusSerializer", "MeetingsStatusSerializer"]
+            "RequestsStatusSerializer", "MeetingsStatusSerializer", "FreeSlotSerializer", "TimeWindowSerializer",
+            "BabysitterFiltersSerializer",
+            "RecurringAvailabilitySerializer", "MeetingsSyncSerializer", "AvailableTimeSyncSerializer",
+            "KidsSyncSerializer", "ReviewsSyncSerializer"]
 
 class RegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
@@ -36,28 +42,51 @@ class RegistrationSerializer(serializers.ModelSerializer):
     #         raise serializers.ValidationError("A user with that password already exists.")
     #     return value        
 
-class BabysitterSerializer(serializers.ModelSerializer):
+class BabysitterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Babysitter
         fields = ['name', 'age', 'address', 'hourly_rate', 'description', 'profile_picture', 'phone_number', 'user']
 
-class BabysitterSerializerForParents(serializers.ModelSerializer):
+class BabysitterSerializerForParents(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Babysitter
-        fields = ['name', 'age', 'address', 'hourly_rate', 'description', 'profile_picture']    
+        fields = ['name', 'age', 'address', 'hourly_rate', 'description', 'profile_picture', 'rating_average',
+                  'rating_count']
+        read_only_fields = ['rating_average', 'rating_count']
 
-class KidsSerializer(serializers.ModelSerializer):
+class BabysitterSearchSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Babysitter
+        fields = ['id', 'name', 'age', 'address', 'hourly_rate', 'description', 'profile_picture', 'rating_average',
+                  'rating_count']
+        read_only_fields = ['rating_average', 'rating_count']
+
+class BabysitterTextSearchSerializer(BabysitterSearchSerializer):
+    # Relevance of the babysitter for the query (higher is better)
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(BabysitterSearchSerializer.Meta):
+        fields = BabysitterSearchSerializer.Meta.fields + ['score']
+
+class BabysitterRecommendationSerializer(BabysitterSearchSerializer):
+    # How well the babysitter matches the parents (higher is better, at most 1)
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(BabysitterSearchSerializer.Meta):
+        fields = BabysitterSearchSerializer.Meta.fields + ['score']
+
+class KidsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Kids
         fields = [ 'name', 'age']
 
-class ParentsSerializer(serializers.ModelSerializer):
+class ParentsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     kids = KidsSerializer(many=True, read_only=True)
     class Meta:
         model = Parents
         fields = ['dad_name' , 'mom_name' , 'address' , 'last_name' , 'profile_picture' , 'phone_number' , 'user' , 'kids']
    
-class ParentsSerializerForBabysitter(serializers.ModelSerializer):
+class ParentsSerializerForBabysitter(SparseFieldsMixin, serializers.ModelSerializer):
     kids = KidsSerializer(many=True, read_only=True)
     class Meta:
         model = Parents
@@ -73,12 +102,16 @@ class MeetingsSerializerForCreating(serializers.ModelSerializer):
             raise serializers.ValidationError("start_time must be before end_time.")
         return data
 
-class MeetingsStatusSerializer(serializers.ModelSerializer):
+class MeetingsBatchSerializerForCreating(serializers.Serializer):
+    # Every item is validated with MeetingsSerializerForCreating, so errors are reported per item
+    meetings = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+class MeetingsStatusSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Requests
         fields = ['id', 'status']
 
-class MeetingsSerializer(serializers.ModelSerializer):
+class MeetingsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     babysitter_id = serializers.SerializerMethodField()
 
     class Meta:
@@ -86,15 +119,16 @@ class MeetingsSerializer(serializers.ModelSerializer):
         fields = ['start_time', 'end_time', 'babysitter_id']
 
     def get_babysitter_id(self, obj):
-        # This assumes `babysitter` is a related field to the `Babysitter` model
-        return obj.babysitter.id if obj.babysitter else None
+        # Read the foreign key column, so the babysitter row is not loaded for every meeting
+        return obj.babysitter_id
 
-class ReviewsSerializer(serializers.ModelSerializer):
+class ReviewsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Reviews
         fields = ['review_text', 'rating']
+        extra_kwargs = {'rating': {'min_value': 1, 'max_value': 5}}
 
-class AvailableTimeSerializer(serializers.ModelSerializer):
+class AvailableTimeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AvailableTime
         fields = [ 'babysitter', 'start_time', 'end_time']
@@ -105,17 +139,99 @@ class AvailableTimeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("start_time must be before end_time.")
         return data
 
-class RequestsSerializer(serializers.ModelSerializer):
+class RecurringAvailabilitySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    exceptions = serializers.ListField(child=serializers.DateField(), required=False)
+
+    class Meta:
+        model = RecurringAvailability
+        fields = ['id', 'babysitter', 'weekday', 'start_time', 'end_time', 'start_date', 'end_date', 'exceptions']
+        read_only_fields = ['id', 'babysitter']
+
+    def validate_exceptions(self, value):
+        # Stored as ISO dates in a JSON list
+        return sorted({date.isoformat() for date in value})
+
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time == end_time:
+            raise serializers.ValidationError("start_time must be different from end_time.")
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if end_date is not None and end_date < start_date:
+            raise serializers.ValidationError("start_date must not be after end_date.")
+        return data
+
+class FreeSlotSerializer(SparseFieldsMixin, serializers.Serializer):
+    start_time = serializers.DateTimeField(read_only=True)
+    end_time = serializers.DateTimeField(read_only=True)
+
+class TimeWindowSerializer(serializers.Serializer):
+    # 'from' is a reserved word, so the fields are declared here instead of as class attributes
+    def get_fields(self):
+        return {
+            'from': serializers.DateTimeField(required=False),
+            'to': serializers.DateTimeField(required=False),
+        }
+
+    def validate(self, data):
+        if 'from' in data and 'to' in data and data['from'] >= data['to']:
+            raise serializers.ValidationError("from must be before to.")
+        return data
+
+class BabysitterFiltersSerializer(serializers.Serializer):
+    min_hourly_rate = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    max_hourly_rate = serializers.DecimalField(max_digits=6, decimal_places=2, required=False)
+    min_age = serializers.IntegerField(required=False)
+    max_age = serializers.IntegerField(required=False)
+    city = serializers.CharField(required=False)
+    min_rating = serializers.FloatField(required=False)
+    nearby = serializers.BooleanField(required=False, default=False)
+    latitude = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    radius = serializers.FloatField(required=False, default=10, min_value=0.1, max_value=100)
+
+    def validate(self, data):
+        for name in ['hourly_rate', 'age']:
+            if f'min_{name}' in data and f'max_{name}' in data and data[f'min_{name}'] > data[f'max_{name}']:
+                raise serializers.ValidationError(f"min_{name} must not be above max_{name}.")
+        if ('latitude' in data) != ('longitude' in data):
+            raise serializers.ValidationError("latitude and longitude must be given together.")
+        return data
+
+class RequestsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Requests
         fields = '__all__'
 
-class RequestsStatusSerializer(serializers.ModelSerializer):
+class RequestsStatusSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Requests
         fields = ['id', 'status']
 
-class RequestsIsActiveSerializer(serializers.ModelSerializer):
+class RequestsIsActiveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Requests
-        fields = ['id', 'is_active']
\ No newline at end of file
+        fields = ['id', 'is_active']
+
+# ===== Delta sync (rows with their ids, so clients can merge them) =====
+
+class MeetingsSyncSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Meetings
+        fields = '__all__'
+
+class AvailableTimeSyncSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = AvailableTime
+        fields = ['id', 'babysitter', 'start_time', 'end_time', 'updated_at']
+
+class KidsSyncSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Kids
+        fields = ['id', 'name', 'age', 'updated_at']
+
+class ReviewsSyncSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Reviews
+        fields = '__all__'
@@ -0,0 +1,91 @@
+# Delta sync: the rows of a user that changed since a cursor, and tombstones of the deleted ones
+
+from datetime import timedelta
+from django.conf import settings
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework import serializers
+from .models import Requests, Meetings, AvailableTime, Kids, Reviews, Tombstone
+from .serializer import (RequestsSerializer, MeetingsSyncSerializer, AvailableTimeSyncSerializer, KidsSyncSerializer,
+                         ReviewsSyncSerializer, ParentsSerializer, BabysitterSerializer)
+
+# Rows are matched from a little before the cursor: a transaction that started before the previous
+# sync may commit a slightly older updated_at after it. Clients merge rows by id, so repeats are harmless.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# (name, model, serializer, owner fields as family / babysitter) of the synced tables
+SYNCED_MODELS = [
+    ('requests', Requests, RequestsSerializer, ('family_id', 'babysitter_id')),
+    ('meetings', Meetings, MeetingsSyncSerializer, ('family_id', 'babysitter_id')),
+    ('availability', AvailableTime, AvailableTimeSyncSerializer, (None, 'babysitter_id')),
+    ('kids', Kids, KidsSyncSerializer, ('family_id', None)),
+    ('reviews', Reviews, ReviewsSyncSerializer, ('family_id', 'babysitter_id')),
+]
+
+def tombstone_retention():
+    return getattr(settings, 'SYNC_TOMBSTONE_RETENTION', timedelta(days=30))
+
+def changes_since(user, since=None):
+    """
+    Return the rows of the user's profile and tables changed since the cursor, and the ids deleted since.
+    - **since** (datetime, optional): The cursor returned by the previous sync. Everything is returned if omitted.
+
+    Deletions older than the tombstone retention are forgotten, so an older cursor gets a full sync
+    (`full` is True and the client replaces its data).
+    """
+    cursor = timezone.now()
+    full = since is None or since < cursor - tombstone_retention()
+    if hasattr(user, 'Parent'):
+        profile, owner_index = user.Parent, 0
+        profile_serializer = ParentsSerializer
+    else:
+        profile, owner_index = user.Babysitter, 1
+        profile_serializer = BabysitterSerializer
+
+    start = None if full else since - SYNC_OVERLAP
+    changes = {
+        'cursor': serializers.DateTimeField().to_representation(cursor),
+        'full': full,
+        'profile': profile_serializer(profile).data if full or profile.updated_at >= start else None,
+    }
+    for name, model, serializer_class, owners in SYNCED_MODELS:
+        owner_field = owners[owner_index]
+        if owner_field is None:
+            continue
+        rows = model.objects.filter(**{owner_field: profile.pk})
+        tombstones = Tombstone.objects.filter(model=name, **{owner_field: profile.pk})
+        if start is not None:
+            rows = rows.filter(updated_at__gte=start)
+            tombstones = tombstones.filter(deleted_at__gte=start)
+        changes[name] = {
+            'changed': serializer_class(rows.order_by('updated_at', 'pk'), many=True).data,
+            'deleted': [] if full else list(tombstones.values_list('object_id', flat=True).distinct()),
+        }
+    return changes
+
+def prune_tombstones():
+    """
+    Delete the tombstones older than the retention. Returns the number of deleted tombstones.
+    """
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()
+    return deleted
+
+# ============================================
+#                 Tombstones
+# ============================================
+
+@receiver(post_delete, sender=Requests)
+@receiver(post_delete, sender=Meetings)
+@receiver(post_delete, sender=AvailableTime)
+@receiver(post_delete, sender=Kids)
+@receiver(post_delete, sender=Reviews)
+def record_deletion(sender, instance, **kwargs):
+    name, _, (family_field, babysitter_field) = next(
+        (name, model, owners) for name, model, _, owners in SYNCED_MODELS if model is sender)
+    Tombstone.objects.create(
+        model=name,
+        object_id=instance.pk,
+        family_id=getattr(instance, family_field) if family_field else None,
+        babysitter_id=getattr(instance, babysitter_field) if babysitter_field else None,
+    )
@@ -1,3 +1,1639 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command, CommandError
+from django.db import connection, transaction
+from unittest import skipIf
+from unittest.mock import patch
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import generics
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import Cursor
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APIRequestFactory
+from .models import (address_city, Babysitter, Meetings, Requests, Parents, AvailableTime, Kids, Reviews,
+                     Recommendation, DayBitmap, FreeSlot, RecurringAvailability)
+from .serializer import BabysitterSerializerForParents, RequestsSerializer, ReviewsSerializer
+from .booking import MAX_BATCH_MEETINGS, BookingError, book_meeting, approve_meeting
+from .availability import (subtract_intervals, refresh_availability, free_slots, free_slots_drift,
+                           babysitters_free_between, coalesce_available_time)
+from .recurring import recurring_intervals, recurring_covers, babysitters_with_recurring_cover
+from .bitmaps import (inner_mask, closed_mask, to_bytes, from_bytes, refresh_day_bitmaps, bitmap_check,
+                      bitmap_checks, day_bitmaps_drift)
+from .caching import CachedResponseMixin, cache_stats, reset_cache_stats
+from .ratings import recompute_ratings
+from .geo import covering_cells, geohash_encode, near
+from .recommendations import recompute_recommendations
+from .search import check_search_triggers, reinstall_search_index
+from .streaming import stream_json_array
+from .renderers import ORJSONRenderer, ORJSONParser, orjson
+from .pagination import IntervalCursorPagination
 
-# Create your tests here.
+# ============================================
+#                  Helpers
+# ============================================
+
+def make_babysitter(phone_number='0500000000', **kwargs):
+    fields = {'name': 'Babysitter', 'age': 20, 'address': 'Tel Aviv', 'hourly_rate': 50,
+              'description': 'Description', 'phone_number': phone_number}
+    fields.update(kwargs)
+    return Babysitter.objects.create(**fields)
+
+def make_parents(phone_number='0510000000', **kwargs):
+    fields = {'dad_name': 'Dad', 'mom_name': 'Mom', 'address': 'Tel Aviv', 'last_name': 'Family',
+              'phone_number': phone_number}
+    fields.update(kwargs)
+    return Parents.objects.create(**fields)
+
+def at(hour, day=1):
+    return datetime(2025, 1, day, hour, tzinfo=timezone.utc)
+
+def make_tied_babysitters(count, **kwargs):
+    """
+    Bulk create count active babysitters (named Tied <i>) sharing the given column values.
+    """
+    users = User.objects.bulk_create(User(username=f'tied{i}') for i in range(count))
+    fields = {'age': 20, 'address': 'Tel Aviv', 'hourly_rate': 50, 'description': 'Description'}
+    fields.update(kwargs)
+    # bulk_create skips save(), which sets the city
+    fields['city'] = address_city(fields['address'])
+    return Babysitter.objects.bulk_create(Babysitter(name=f'Tied {i}', phone_number=f'059{i:07d}', user=user, **fields)
+                                          for i, user in enumerate(users))
+
+def page_through(client, url, parameters, limit=100):
+    """
+    Follow the next links of a list and return all its rows, failing after limit pages.
+    """
+    response = client.get(url, parameters)
+    rows = []
+    for _ in range(limit):
+        assert response.status_code == 200, response.data
+        rows += response.data['results']
+        if response.data['next'] is None:
+            return rows
+        response = client.get(response.data['next'])
+    raise AssertionError(f"{url} did not end after {limit} pages")
+
+# ============================================
+#                  Indexes
+# ============================================
+
+class QueryPlanTests(TestCase):
+    """
+    Check with EXPLAIN QUERY PLAN that the hot availability/meeting/request filters use the composite indexes.
+    """
+    def setUp(self):
+        self.babysitter = make_babysitter()
+        self.parents = make_parents()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_available_time_lookup(self):
+        queryset = AvailableTime.objects.filter(
+            babysitter=self.babysitter,
+            start_time__lte=at(10),
+            end_time__gte=at(12)
+        )
+        self.assertUsesIndex(queryset, 'avail_sitter_start_end_idx')
+
+    def test_conflicting_meeting_lookup(self):
+        queryset = Meetings.objects.filter(
+            babysitter=self.babysitter,
+            start_time__lte=at(12),
+            end_time__gte=at(10),
+            status='approved'
+        )
+        self.assertUsesIndex(queryset, 'meet_sitter_status_start_idx')
+
+    def test_approved_request_lookup(self):
+        queryset = Requests.objects.filter(
+            babysitter=self.babysitter,
+            family=self.parents,
+            status='approved',
+            is_active=True
+        )
+        self.assertUsesIndex(queryset, 'req_family_sitter_status_idx')
+
+    def test_rating_lookup(self):
+        queryset = Babysitter.objects.filter(rating_average__gte=4).order_by('-rating_average')
+        self.assertUsesIndex(queryset, 'sitter_rating_idx')
+
+    def test_city_lookup(self):
+        queryset = Babysitter.objects.filter(city='haifa', hourly_rate__lte=60)
+        self.assertUsesIndex(queryset, 'sitter_city_rate_idx')
+
+    def test_nearby_lookup(self):
+        self.assertUsesIndex(near(Babysitter.objects.all(), 32.0, 34.8, 5), 'sitter_geohash_idx')
+
+# ============================================
+#                  Booking
+# ============================================
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """
+    Stress the booking path from many threads and check that no two approved meetings overlap.
+    """
+    THREADS = 8
+    ATTEMPTS_PER_THREAD = 25
+
+    def setUp(self):
+        self.babysitter = make_babysitter()
+        self.parents = [make_parents(phone_number=f'05100000{i:02d}') for i in range(self.THREADS)]
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(0), end_time=at(0, day=3))
+        refresh_availability(self.babysitter.id)
+
+    def book_and_approve(self, parents, offsets):
+        booked = 0
+        try:
+            for offset in offsets:
+                # Every thread competes for the same overlapping half-hour slots
+                start_time = at(8) + timedelta(minutes=offset)
+                try:
+                    meeting = book_meeting(self.babysitter.id, parents, start_time, start_time + timedelta(hours=1))
+                    approve_meeting(self.babysitter.id, meeting.id)
+                    booked += 1
+                except BookingError:
+                    pass
+        finally:
+            connection.close()
+        return booked
+
+    def test_no_double_booking(self):
+        offsets = [30 * i for i in range(self.ATTEMPTS_PER_THREAD)]
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            booked = sum(executor.map(self.book_and_approve, self.parents, [offsets] * self.THREADS))
+        elapsed = time.perf_counter() - begin
+
+        approved = list(Meetings.objects.filter(babysitter=self.babysitter, status='approved')
+                        .order_by('start_time').values_list('start_time', 'end_time'))
+        self.assertEqual(len(approved), booked)
+        self.assertGreater(booked, 0)
+        for (_, previous_end), (next_start, _) in zip(approved, approved[1:]):
+            self.assertLess(previous_end, next_start)
+        print(f"\n{self.THREADS * self.ATTEMPTS_PER_THREAD} booking attempts, {booked} approved, "
+              f"{self.THREADS * self.ATTEMPTS_PER_THREAD / elapsed:.0f} bookings/sec")
+
+class BatchBookingTests(APITestCase):
+    """
+    The batch endpoint reports a result per item and inserts the valid meetings with one bulk insert.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='parent')
+        self.parents = make_parents(user=self.user)
+        self.babysitter = make_babysitter()
+        Requests.objects.create(family=self.parents, babysitter=self.babysitter, status='approved')
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8), end_time=at(20))
+        Meetings.objects.create(babysitter=self.babysitter, family=self.parents, status='approved',
+                                start_time=at(12), end_time=at(13))
+        refresh_availability(self.babysitter.id)
+        self.client.force_authenticate(user=self.user)
+
+    def book(self, meetings):
+        return self.client.post('/meetings-add-batch/', {'babysitter_id': self.babysitter.id, 'meetings': meetings},
+                                format='json')
+
+    def test_results_per_item(self):
+        items = [
+            {'start_time': at(8), 'end_time': at(9)},
+            {'start_time': at(10), 'end_time': at(9)},
+            {'start_time': at(19), 'end_time': at(21)},
+            {'start_time': at(11), 'end_time': at(12)},
+            # Overlaps and touches the first item
+            {'start_time': at(8) + timedelta(minutes=30), 'end_time': at(10)},
+            {'start_time': at(9), 'end_time': at(10)},
+            {'start_time': at(14), 'end_time': at(15)},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.book([{key: value.isoformat() for key, value in item.items()} for item in items])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result['created'] for result in response.data],
+                         [True, False, False, False, False, False, True])
+        self.assertIn('errors', response.data[1])
+        self.assertEqual([result.get('message') for result in response.data[2:6]], [
+            "Babysitter is not available at the requested time.",
+            "Babysitter is busy during the requested time.",
+            "The requested time overlaps another meeting of the batch.",
+            "The requested time overlaps another meeting of the batch.",
+        ])
+        self.assertEqual(list(Meetings.objects.filter(status='pending').order_by('start_time')
+                              .values_list('start_time', 'end_time')), [(at(8), at(9)), (at(14), at(15))])
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "base_meetings"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_nothing_created(self):
+        response = self.book([{'start_time': at(11).isoformat(), 'end_time': at(12).isoformat()}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.data[0]['created'])
+        self.assertFalse(Meetings.objects.filter(status='pending').exists())
+
+    def test_too_many_meetings(self):
+        day = timedelta(days=1)
+        response = self.book([{'start_time': (at(8) + i * day).isoformat(), 'end_time': (at(9) + i * day).isoformat()}
+                              for i in range(MAX_BATCH_MEETINGS + 1)])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Meetings.objects.filter(status='pending').exists())
+
+class ApprovalTests(APITestCase):
+    """
+    Approving a meeting declines the babysitter's overlapping pending meetings in one UPDATE and reports them.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='babysitter')
+        self.babysitter = make_babysitter(user=self.user)
+        self.parents = make_parents()
+        self.client.force_authenticate(user=self.user)
+
+    def meeting(self, start_time, end_time, babysitter=None, status='pending'):
+        return Meetings.objects.create(babysitter=babysitter or self.babysitter, family=self.parents, status=status,
+                                       start_time=start_time, end_time=end_time)
+
+    def approve(self, meeting):
+        return self.client.patch(f'/meeting-update/{meeting.id}/', {'status': 'approved'}, format='json')
+
+    def test_declines_overlapping_pending(self):
+        meeting = self.meeting(at(10), at(12))
+        overlapping = self.meeting(at(11), at(13))
+        touching = self.meeting(at(8), at(10))
+        later = self.meeting(at(14), at(15))
+        other_babysitter = self.meeting(at(10), at(12), babysitter=make_babysitter(phone_number='0500000001'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.approve(meeting)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.data['declined_meeting_ids']), sorted([overlapping.id, touching.id]))
+        statuses = dict(Meetings.objects.values_list('id', 'status'))
+        self.assertEqual(statuses, {meeting.id: 'approved', overlapping.id: 'declined', touching.id: 'declined',
+                                    later.id: 'pending', other_babysitter.id: 'pending'})
+        declines = [query for query in queries
+                    if query['sql'].startswith('UPDATE "base_meetings"') and "'declined'" in query['sql']]
+        self.assertEqual(len(declines), 1)
+
+    def test_nothing_to_decline(self):
+        meeting = self.meeting(at(10), at(12))
+        response = self.approve(meeting)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['declined_meeting_ids'], [])
+
+    def test_conflicting_approval(self):
+        self.meeting(at(9), at(10), status='approved')
+        meeting = self.meeting(at(10), at(12))
+        pending = self.meeting(at(11), at(12))
+        response = self.approve(meeting)
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('declined_meeting_ids', response.data)
+        self.assertEqual(Meetings.objects.get(id=meeting.id).status, 'pending')
+        self.assertEqual(Meetings.objects.get(id=pending.id).status, 'pending')
+
+# ============================================
+#                 Free slots
+# ============================================
+
+class SubtractIntervalsTests(TestCase):
+    """
+    The sweep-line engine subtracting approved meetings from available times.
+    """
+    def subtract(self, available, busy):
+        return list(subtract_intervals(available, iter(busy)))
+
+    def test_nested(self):
+        self.assertEqual(self.subtract([(at(8), at(12))], [(at(9), at(10))]),
+                         [(at(8), at(9)), (at(10), at(12))])
+        self.assertEqual(self.subtract([(at(8), at(12))], [(at(7), at(13))]), [])
+
+    def test_adjacent(self):
+        # Meetings ending where the availability starts or starting where it ends take nothing
+        self.assertEqual(self.subtract([(at(8), at(12))], [(at(6), at(8)), (at(12), at(14))]),
+                         [(at(8), at(12))])
+
+    def test_touching_meetings(self):
+        self.assertEqual(self.subtract([(at(8), at(12))], [(at(9), at(10)), (at(10), at(11))]),
+                         [(at(8), at(9)), (at(11), at(12))])
+        self.assertEqual(self.subtract([(at(8), at(12))], [(at(8), at(10)), (at(10), at(12))]), [])
+
+    def test_overlapping_meetings(self):
+        self.assertEqual(self.subtract([(at(8), at(12))], [(at(9), at(11)), (at(10), at(10) + timedelta(minutes=30))]),
+                         [(at(8), at(9)), (at(11), at(12))])
+
+    def test_meeting_across_available_times(self):
+        self.assertEqual(self.subtract([(at(8), at(12), 1), (at(13), at(16), 2)], [(at(11), at(14))]),
+                         [(at(8), at(11), 1), (at(14), at(16), 2)])
+
+    def test_nested_available_times(self):
+        half_past = at(9) + timedelta(minutes=30)
+        self.assertEqual(self.subtract([(at(8), at(12), 1), (at(9), at(10), 2)], [(half_past, at(11))]),
+                         [(at(8), half_past, 1), (at(11), at(12), 1), (at(9), half_past, 2)])
+
+    def test_free_slots(self):
+        babysitter = make_babysitter()
+        parents = make_parents()
+        AvailableTime.objects.create(babysitter=babysitter, start_time=at(8), end_time=at(12))
+        for start_time, end_time, status in [(at(9), at(10), 'approved'), (at(10), at(11), 'approved'),
+                                             (at(11), at(12), 'pending')]:
+            Meetings.objects.create(babysitter=babysitter, family=parents, status=status,
+                                    start_time=start_time, end_time=end_time)
+        refresh_availability(babysitter.id)
+        self.assertEqual(free_slots(babysitter.id, at(0), at(0, day=2)), [
+            {'start_time': at(8), 'end_time': at(9)},
+            {'start_time': at(11), 'end_time': at(12)},
+        ])
+        # Clipped to the window
+        self.assertEqual(free_slots(babysitter.id, at(8) + timedelta(minutes=30), at(11) + timedelta(minutes=30)), [
+            {'start_time': at(8) + timedelta(minutes=30), 'end_time': at(9)},
+            {'start_time': at(11), 'end_time': at(11) + timedelta(minutes=30)},
+        ])
+
+class FreeSlotTests(APITestCase):
+    """
+    The materialized free slots follow every availability and meeting write, and the rebuild command finds drift.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='babysitter')
+        self.babysitter = make_babysitter(user=self.user)
+        self.parents = make_parents()
+        self.client.force_authenticate(user=self.user)
+        # An available time the writes below never touch
+        self.client.post('/availability/', {'start_time': at(8, day=5), 'end_time': at(12, day=5)}, format='json')
+        self.untouched = FreeSlot.objects.get(babysitter=self.babysitter)
+
+    def assertSlots(self, expected):
+        slots = list(FreeSlot.objects.filter(babysitter=self.babysitter).exclude(id=self.untouched.id)
+                     .order_by('start_time').values_list('start_time', 'end_time'))
+        self.assertEqual(slots, expected)
+        self.assertEqual(free_slots_drift(self.babysitter.id), ([], []))
+        self.assertTrue(FreeSlot.objects.filter(id=self.untouched.id).exists())
+
+    def test_incremental_maintenance(self):
+        response = self.client.post('/availability/', {'start_time': at(8), 'end_time': at(12)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        available_time_id = AvailableTime.objects.get(babysitter=self.babysitter, start_time=at(8)).id
+        self.assertSlots([(at(8), at(12))])
+
+        meeting = Meetings.objects.create(babysitter=self.babysitter, family=self.parents,
+                                          start_time=at(9), end_time=at(10))
+        # Pending meetings do not take free time
+        self.assertSlots([(at(8), at(12))])
+        response = self.client.patch(f'/meeting-update/{meeting.id}/', {'status': 'approved'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertSlots([(at(8), at(9)), (at(10), at(12))])
+
+        response = self.client.patch(f'/availability/{available_time_id}/', {'start_time': at(8), 'end_time': at(11)},
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertSlots([(at(8), at(9)), (at(10), at(11))])
+
+        response = self.client.patch(f'/meeting-update/{meeting.id}/', {'status': 'declined'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertSlots([(at(8), at(11))])
+
+        response = self.client.delete(f'/availability/{available_time_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertSlots([])
+
+    def test_rebuild_verify(self):
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8), end_time=at(12))
+        output = io.StringIO()
+        with self.assertRaisesMessage(CommandError, '1 of 1 babysitters'):
+            call_command('rebuild_free_slots', '--verify', stdout=output)
+        self.assertIn('1 missing, 0 unexpected free slots, 1 drifted day bitmaps', output.getvalue())
+
+        call_command('rebuild_free_slots', stdout=io.StringIO())
+        output = io.StringIO()
+        call_command('rebuild_free_slots', '--verify', stdout=output)
+        self.assertIn('are up to date', output.getvalue())
+
+# ============================================
+#                 Coalescing
+# ============================================
+
+class CoalesceTests(APITestCase):
+    """
+    Overlapping and touching available times are merged on write (when enabled) and by the bulk command.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='babysitter')
+        self.babysitter = make_babysitter(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, start_time, end_time, babysitter=None):
+        return AvailableTime.objects.create(babysitter=babysitter or self.babysitter,
+                                            start_time=start_time, end_time=end_time)
+
+    def rows(self, babysitter=None):
+        return list(AvailableTime.objects.filter(babysitter=babysitter or self.babysitter)
+                    .order_by('start_time').values_list('start_time', 'end_time'))
+
+    def coalesce(self, available_time):
+        with transaction.atomic():
+            return coalesce_available_time(available_time)
+
+    def test_overlapping(self):
+        self.add(at(8), at(10))
+        merged = self.coalesce(self.add(at(9), at(12)))
+        self.assertEqual((merged.start_time, merged.end_time), (at(8), at(12)))
+        self.assertEqual(self.rows(), [(at(8), at(12))])
+
+    def test_touching(self):
+        self.add(at(12), at(14))
+        self.add(at(15), at(16))
+        self.coalesce(self.add(at(10), at(12)))
+        self.assertEqual(self.rows(), [(at(10), at(14)), (at(15), at(16))])
+
+    def test_chained_touching(self):
+        # The new row only touches the first one, which touches the next one, and so on
+        self.add(at(8), at(10))
+        self.add(at(10), at(11))
+        self.add(at(11), at(12))
+        self.coalesce(self.add(at(7), at(8)))
+        self.assertEqual(self.rows(), [(at(7), at(12))])
+
+    def test_on_write_setting(self):
+        self.add(at(8), at(10))
+        self.client.post('/availability/', {'start_time': at(10), 'end_time': at(12)}, format='json')
+        self.assertEqual(self.rows(), [(at(8), at(10)), (at(10), at(12))])
+
+        with self.settings(COALESCE_AVAILABLE_TIMES=True):
+            response = self.client.post('/availability/', {'start_time': at(11), 'end_time': at(13)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.rows(), [(at(8), at(13))])
+        self.assertEqual(free_slots_drift(self.babysitter.id), ([], []))
+
+    def test_command(self):
+        other = make_babysitter(phone_number='0500000001')
+        # Overlapping, touching, chained touching and separate rows
+        for start, end in [(at(8), at(10)), (at(9), at(11)), (at(11), at(12)), (at(12), at(13)),
+                           (at(14), at(15)), (at(9, day=2), at(10, day=2))]:
+            self.add(start, end)
+        self.add(at(8), at(9), other)
+        self.add(at(10), at(11), other)
+
+        output = io.StringIO()
+        call_command('coalesce_available_times', stdout=output)
+        self.assertIn('Merged away 3 available times of 2 babysitters', output.getvalue())
+        self.assertEqual(self.rows(), [(at(8), at(13)), (at(14), at(15)), (at(9, day=2), at(10, day=2))])
+        self.assertEqual(self.rows(other), [(at(8), at(9)), (at(10), at(11))])
+        self.assertEqual(free_slots_drift(self.babysitter.id), ([], []))
+        self.assertEqual(day_bitmaps_drift(self.babysitter.id), 0)
+
+# ============================================
+#            Recurring availability
+# ============================================
+
+class RecurringAvailabilityTests(APITestCase):
+    """
+    Weekly rules expand into occurrences within their dates, skip their exceptions, and are bookable like
+    concrete available times. 2025-01-01 is a Wednesday.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='babysitter')
+        self.babysitter = make_babysitter(user=self.user)
+        self.parents = make_parents()
+
+    def add_rule(self, start_hour, end_hour, **kwargs):
+        fields = {'weekday': at(0).weekday(), 'start_date': at(0).date()}
+        fields.update(kwargs)
+        return RecurringAvailability.objects.create(babysitter=self.babysitter, start_time=at(start_hour).time(),
+                                                    end_time=at(end_hour).time(), **fields)
+
+    def covered(self, start, end):
+        covers = recurring_covers(self.babysitter.id, start, end)
+        self.assertEqual(self.babysitter.id in babysitters_with_recurring_cover(start, end), covers)
+        return covers
+
+    def test_overnight(self):
+        self.add_rule(22, 6)
+        self.assertEqual(list(recurring_intervals(self.babysitter.id, at(0), at(0, day=9))),
+                         [(at(22), at(6, day=2)), (at(22, day=8), at(6, day=9))])
+        # The occurrence of the previous day
+        self.assertEqual(list(recurring_intervals(self.babysitter.id, at(3, day=2), at(5, day=2))),
+                         [(at(22), at(6, day=2))])
+        self.assertTrue(self.covered(at(23), at(5, day=2)))
+        self.assertTrue(self.covered(at(2, day=2), at(5, day=2)))
+        self.assertFalse(self.covered(at(21), at(23)))
+        self.assertFalse(self.covered(at(5, day=2), at(7, day=2)))
+
+    def test_dates_and_exceptions(self):
+        self.add_rule(8, 12, start_date=at(0, day=8).date(), end_date=at(0, day=22).date(),
+                      exceptions=[at(0, day=15).date().isoformat()])
+        self.assertEqual(list(recurring_intervals(self.babysitter.id, at(0), at(0, day=31))),
+                         [(at(8, day=8), at(12, day=8)), (at(8, day=22), at(12, day=22))])
+        for day, expected in [(1, False), (8, True), (15, False), (22, True), (29, False)]:
+            self.assertEqual(self.covered(at(9, day), at(11, day)), expected, day)
+
+    def test_booking_and_free_slots(self):
+        self.add_rule(8, 12, exceptions=[at(0, day=15).date().isoformat()])
+        self.add_rule(22, 6)
+        meeting = book_meeting(self.babysitter.id, self.parents, at(9, day=8), at(10, day=8))
+        approve_meeting(self.babysitter.id, meeting.id)
+        book_meeting(self.babysitter.id, self.parents, at(23, day=8), at(5, day=9))
+        for start, end in [(at(9, day=15), at(10, day=15)), (at(11, day=8), at(13, day=8)),
+                           (at(10, day=8), at(11, day=8))]:
+            with self.assertRaises(BookingError):
+                book_meeting(self.babysitter.id, self.parents, start, end)
+
+        self.assertEqual(free_slots(self.babysitter.id, at(0, day=8), at(0, day=9)), [
+            {'start_time': at(8, day=8), 'end_time': at(9, day=8)},
+            {'start_time': at(10, day=8), 'end_time': at(12, day=8)},
+            {'start_time': at(22, day=8), 'end_time': at(0, day=9)},
+        ])
+        self.assertFalse(babysitters_free_between(at(9, day=8), at(10, day=8)).exists())
+        self.assertTrue(babysitters_free_between(at(8, day=22), at(12, day=22)).exists())
+
+    def test_endpoint(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/recurring-availability/', {
+            'weekday': 2, 'start_time': '22:00', 'end_time': '06:00', 'start_date': '2025-01-01',
+            'exceptions': ['2025-01-15', '2025-01-08', '2025-01-15'],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['exceptions'], ['2025-01-08', '2025-01-15'])
+
+        response = self.client.post('/recurring-availability/', {
+            'weekday': 2, 'start_time': '08:00', 'end_time': '12:00', 'start_date': '2025-01-08',
+            'end_date': '2025-01-01',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+# ============================================
+#             Availability search
+# ============================================
+
+class AvailabilitySearchTests(APITestCase):
+    """
+    babysitters_free_between lists exactly the babysitters book_meeting accepts, on both the free slot
+    and the recurring path.
+    """
+    def setUp(self):
+        self.parents = make_parents()
+        self.babysitter = make_babysitter(user=User.objects.create_user(username='babysitter'))
+
+    def approve(self, babysitter, start_time, end_time):
+        Meetings.objects.create(babysitter=babysitter, family=self.parents, status='approved',
+                                start_time=start_time, end_time=end_time)
+        refresh_availability(babysitter.id)
+
+    def assertFreeAsBooked(self, windows):
+        for start, end, expected in windows:
+            free = babysitters_free_between(start, end).filter(id=self.babysitter.id).exists()
+            try:
+                book_meeting(self.babysitter.id, self.parents, start, end)
+                booked = True
+            except BookingError:
+                booked = False
+            self.assertEqual((free, booked), (expected, expected), (start, end))
+
+    def windows(self, day=1):
+        quarter = timedelta(minutes=15)
+        return [
+            (at(8, day), at(9, day), True),
+            (at(11, day) + quarter, at(12, day), True),
+            # The meeting touches these windows
+            (at(9, day), at(10, day), False),
+            (at(11, day), at(12, day), False),
+            (at(8, day), at(12, day), False),
+            # Not covered
+            (at(7, day), at(9, day), False),
+            (at(11, day) + quarter, at(13, day), False),
+        ]
+
+    def test_free_slots(self):
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8), end_time=at(12))
+        self.approve(self.babysitter, at(10), at(11))
+        self.assertFreeAsBooked(self.windows())
+
+    def test_recurring(self):
+        RecurringAvailability.objects.create(babysitter=self.babysitter, weekday=at(0).weekday(),
+                                             start_time=at(8).time(), end_time=at(12).time(), start_date=at(0).date())
+        self.approve(self.babysitter, at(10), at(11))
+        self.assertFreeAsBooked(self.windows())
+        # The next occurrence has no meeting
+        self.assertFreeAsBooked([(at(8, day=8), at(12, day=8), True)])
+
+    def test_stale_bitmaps(self):
+        RecurringAvailability.objects.create(babysitter=self.babysitter, weekday=at(0).weekday(),
+                                             start_time=at(8).time(), end_time=at(12).time(), start_date=at(0).date())
+        refresh_availability(self.babysitter.id)
+        # Approved without refresh_availability (admin, direct ORM writes): the day bitmaps still show no meeting
+        Meetings.objects.create(babysitter=self.babysitter, family=self.parents, status='approved',
+                                start_time=at(10), end_time=at(11))
+        self.assertFreeAsBooked(self.windows())
+
+    def test_pending_and_inactive(self):
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8), end_time=at(12))
+        refresh_availability(self.babysitter.id)
+        Meetings.objects.create(babysitter=self.babysitter, family=self.parents, start_time=at(9), end_time=at(10))
+        self.assertTrue(babysitters_free_between(at(9), at(10)).filter(id=self.babysitter.id).exists())
+        User.objects.filter(id=self.babysitter.user_id).update(is_active=False)
+        self.assertFalse(babysitters_free_between(at(9), at(10)).exists())
+
+    def test_endpoint(self):
+        idle = make_babysitter(phone_number='0500000001', user=User.objects.create_user(username='idle'))
+        for babysitter in (self.babysitter, idle):
+            RecurringAvailability.objects.create(babysitter=babysitter, weekday=at(0).weekday(),
+                                                 start_time=at(8).time(), end_time=at(12).time(),
+                                                 start_date=at(0).date())
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(14), end_time=at(18))
+        self.approve(self.babysitter, at(10), at(11))
+
+        user = User.objects.create_user(username='parent')
+        make_parents(phone_number='0510000001', user=user)
+        self.client.force_authenticate(user=user)
+        for start, end, expected in [(at(9), at(10), [idle.id]), (at(15), at(16), [self.babysitter.id])]:
+            response = self.client.generic('GET', '/babysitters-available/',
+                                           json.dumps({'from': start.isoformat(), 'to': end.isoformat()}),
+                                           content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([row['id'] for row in response.data['results']], expected)
+
+# ============================================
+#                 Day bitmaps
+# ============================================
+
+class DayBitmapTests(TestCase):
+    """
+    Check the 15 minutes bucket masks, the stored day bitmaps and the drift check against the source tables.
+    """
+    def setUp(self):
+        self.babysitter = make_babysitter()
+        self.parents = make_parents()
+
+    def bits(self, first, last):
+        return ((1 << (last - first)) - 1) << first
+
+    def stored(self, babysitter=None):
+        return {day: (from_bytes(available), from_bytes(busy)) for day, available, busy in
+                DayBitmap.objects.filter(babysitter=babysitter or self.babysitter).values_list('day', 'available', 'busy')}
+
+    def test_masks(self):
+        origin = at(0)
+        # 08:07-09:00 fully covers the 08:15, 08:30 and 08:45 buckets and touches the 08:00 and 09:00 ones
+        self.assertEqual(inner_mask(origin, at(8) + timedelta(minutes=7), at(9)), self.bits(33, 36))
+        self.assertEqual(closed_mask(origin, at(8) + timedelta(minutes=7), at(9)), self.bits(32, 37))
+        # Periods starting before the origin are clipped at the first bucket
+        self.assertEqual(inner_mask(at(0, day=2), at(22), at(1, day=2)), self.bits(0, 4))
+        self.assertEqual(inner_mask(origin, at(8), at(8) + timedelta(minutes=10)), 0)
+
+    def test_refresh_day_bitmaps(self):
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8), end_time=at(12))
+        # Unaligned neighbours fill the buckets they cover together
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(12),
+                                     end_time=at(12) + timedelta(minutes=10))
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(12) + timedelta(minutes=10),
+                                     end_time=at(12) + timedelta(minutes=30))
+        Meetings.objects.create(babysitter=self.babysitter, family=self.parents, status='approved',
+                                start_time=at(9, day=2), end_time=at(10, day=2))
+        Meetings.objects.create(babysitter=self.babysitter, family=self.parents,
+                                start_time=at(9, day=3), end_time=at(10, day=3))
+        refresh_day_bitmaps(self.babysitter.id)
+        self.assertEqual(self.stored(), {
+            at(0).date(): (self.bits(32, 50), 0),
+            at(0, day=2).date(): (0, self.bits(36, 41)),
+        })
+
+        AvailableTime.objects.filter(babysitter=self.babysitter).delete()
+        refresh_day_bitmaps(self.babysitter.id, at(8), at(13))
+        self.assertEqual(self.stored(), {at(0, day=2).date(): (0, self.bits(36, 41))})
+
+    def test_bitmap_checks(self):
+        busy_babysitter = make_babysitter(phone_number='0500000001')
+        idle_babysitter = make_babysitter(phone_number='0500000002')
+        for babysitter in (self.babysitter, busy_babysitter):
+            AvailableTime.objects.create(babysitter=babysitter, start_time=at(8), end_time=at(12))
+        Meetings.objects.create(babysitter=busy_babysitter, family=self.parents, status='approved',
+                                start_time=at(11), end_time=at(12))
+        for babysitter in (self.babysitter, busy_babysitter, idle_babysitter):
+            refresh_day_bitmaps(babysitter.id)
+
+        ids = [self.babysitter.id, busy_babysitter.id, idle_babysitter.id]
+        with self.assertNumQueries(1):
+            checks = bitmap_checks(ids, at(9), at(11))
+        self.assertEqual(checks, {
+            self.babysitter.id: (True, False),
+            # The meeting touches the window
+            busy_babysitter.id: (True, True),
+            idle_babysitter.id: (False, False),
+        })
+        for babysitter_id in ids:
+            self.assertEqual(checks[babysitter_id], bitmap_check(babysitter_id, at(9), at(11)))
+
+    def test_day_bitmaps_drift(self):
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8), end_time=at(12))
+        refresh_day_bitmaps(self.babysitter.id)
+        self.assertEqual(day_bitmaps_drift(self.babysitter.id), 0)
+
+        DayBitmap.objects.filter(babysitter=self.babysitter).update(available=to_bytes(self.bits(32, 40)))
+        AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8, day=3), end_time=at(12, day=3))
+        self.assertEqual(day_bitmaps_drift(self.babysitter.id), 2)
+
+        refresh_day_bitmaps(self.babysitter.id)
+        self.assertEqual(day_bitmaps_drift(self.babysitter.id), 0)
+
+# ============================================
+#                 Query counts
+# ============================================
+
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+@override_settings(CACHES=NO_CACHE)
+class QueryCountTests(APITestCase):
+    """
+    Every list/detail endpoint runs a fixed number of queries, whatever the number of rows it returns.
+    """
+    def setUp(self):
+        self.parent_user = User.objects.create_user(username='parent', password='password')
+        self.babysitter_user = User.objects.create_user(username='babysitter', password='password')
+        self.parents = make_parents(user=self.parent_user)
+        self.babysitter = make_babysitter(user=self.babysitter_user)
+        self.rows = 0
+
+    def add_rows(self, count):
+        """
+        Add `count` more families (with kids), meetings, requests, reviews and available times.
+        """
+        for i in range(self.rows, self.rows + count):
+            family = make_parents(phone_number=f'052{i:07d}')
+            Kids.objects.bulk_create([Kids(family=family, name=f'Kid {i}'), Kids(family=family, name=f'Kid {i}b')])
+            Kids.objects.create(family=self.parents, name=f'Own kid {i}')
+            Meetings.objects.create(family=self.parents, babysitter=self.babysitter,
+                                    start_time=at(8, day=i % 28 + 1), end_time=at(9, day=i % 28 + 1))
+            Requests.objects.create(family=family, babysitter=self.babysitter)
+            Reviews.objects.create(family=family, babysitter=self.babysitter, rating=5, review_text='Great')
+            AvailableTime.objects.create(babysitter=self.babysitter, start_time=at(8, day=i % 28 + 1),
+                                         end_time=at(12, day=i % 28 + 1))
+        self.rows += count
+
+    def assertFixedQueries(self, expected, user, method, url, data=None):
+        # Same count with one row and with many rows
+        for count in (1, 20):
+            self.add_rows(count)
+            # A fresh user instance, so no profile is cached from the previous request
+            self.client.force_authenticate(user=User.objects.get(id=user.id))
+            with self.assertNumQueries(expected):
+                response = self.client.generic(method, url, json.dumps(data or {}), content_type='application/json')
+            self.assertLess(response.status_code, 400, response.data)
+
+    def test_parents_list(self):
+        self.assertFixedQueries(4, self.babysitter_user, 'GET', '/parents-list/')
+
+    def test_parents_profile(self):
+        self.assertFixedQueries(3, self.parent_user, 'GET', f'/parents-profile/{self.parents.family_id}/')
+
+    def test_kids_list(self):
+        self.assertFixedQueries(5, self.babysitter_user, 'GET', '/kids-list/',
+                                {'parent_id': self.parents.family_id})
+
+    def test_babysitters_list(self):
+        self.assertFixedQueries(3, self.parent_user, 'GET', '/babysitters-list/')
+
+    def test_babysitter_profile(self):
+        self.assertFixedQueries(1, self.babysitter_user, 'GET', f'/babysitter-profile/{self.babysitter.id}/')
+
+    def test_meetings_list(self):
+        self.assertFixedQueries(3, self.parent_user, 'GET', '/meetings-list/')
+        self.assertFixedQueries(4, self.babysitter_user, 'GET', '/meetings-list/')
+
+    def test_meeting_detail(self):
+        meeting = Meetings.objects.create(family=self.parents, babysitter=self.babysitter,
+                                          start_time=at(20), end_time=at(21))
+        self.assertFixedQueries(2, self.babysitter_user, 'GET', f'/meeting-update/{meeting.id}/')
+
+    def test_requests_list(self):
+        self.assertFixedQueries(4, self.babysitter_user, 'GET', '/requests-list/')
+
+    def test_request_detail(self):
+        request = Requests.objects.create(family=self.parents, babysitter=self.babysitter)
+        self.assertFixedQueries(2, self.babysitter_user, 'GET', f'/request-update/{request.id}/')
+        self.assertFixedQueries(1, self.parent_user, 'GET', f'/request-delete/{request.id}/')
+
+    def test_reviews_list(self):
+        self.assertFixedQueries(2, self.parent_user, 'GET', '/reviews-list/',
+                                {'babysitter_id': self.babysitter.id})
+        self.assertFixedQueries(3, self.parent_user, 'GET', '/reviews/')
+
+    def test_available_times(self):
+        self.assertFixedQueries(3, self.babysitter_user, 'GET', '/availability/')
+
+# ============================================
+#                 Pagination
+# ============================================
+
+class IntervalPaginationTests(TestCase):
+    """
+    The interval cursor pages a sorted stream without skipping or repeating intervals sharing a start time.
+    """
+    def setUp(self):
+        # Five intervals start at 08:00 (more than a page), two at 09:00, one at 10:00
+        self.intervals = [AvailableTime(start_time=start_time, end_time=start_time + timedelta(minutes=minutes))
+                          for start_time, count in [(at(8), 5), (at(9), 2), (at(10), 1)]
+                          for minutes in range(15, 15 * (count + 1), 15)]
+
+    def stream(self, position):
+        return (interval for interval in self.intervals if position is None or interval.start_time >= position)
+
+    def page_through(self, page_size):
+        url, pages = f'/availability-list/?page_size={page_size}', []
+        while url is not None:
+            paginator = IntervalCursorPagination()
+            pages.append(paginator.paginate_stream(self.stream, Request(APIRequestFactory().get(url))))
+            url = paginator.next_link
+        return pages
+
+    def test_equal_start_times(self):
+        for page_size in [1, 2, 3, 5, 8, 50]:
+            pages = self.page_through(page_size)
+            self.assertEqual([interval for page in pages for interval in page], self.intervals, page_size)
+            self.assertEqual([len(page) for page in pages[:-1]], [page_size] * (len(pages) - 1))
+
+    def test_invalid_cursor(self):
+        paginator = IntervalCursorPagination()
+        paginator.base_url = 'http://testserver/availability-list/'
+        cursor = paginator.encode_cursor(Cursor(offset=0, reverse=False, position='not a date'))
+        with self.assertRaises(NotFound):
+            paginator.paginate_stream(self.stream, Request(APIRequestFactory().get(cursor)))
+
+# ============================================
+#               Fast list path
+# ============================================
+
+@override_settings(CACHES=NO_CACHE)
+class FastListTests(APITestCase):
+    """
+    The .values() fast path returns the same JSON as the serializers, page by page.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='parent', password='password')
+        self.parents = make_parents(user=self.user)
+        for i in range(5):
+            babysitter = make_babysitter(phone_number=f'050000000{i}', hourly_rate=Decimal('42.5'),
+                                         user=User.objects.create_user(username=f'babysitter{i}'))
+            Requests.objects.create(family=self.parents, babysitter=babysitter, status='approved')
+            Reviews.objects.create(family=self.parents, babysitter=babysitter, review_text=f'Review {i}')
+
+    def assertSameAsSerializer(self, url, serializer_class, queryset, data=None):
+        self.client.force_authenticate(user=self.user)
+        results, next_url = [], url + '?page_size=2'
+        while next_url:
+            response = self.client.generic('GET', next_url, json.dumps(data or {}), content_type='application/json')
+            results += response.data['results']
+            next_url = response.data['next']
+        expected = serializer_class(queryset.order_by('-pk'), many=True, context={'request': response.wsgi_request}).data
+        self.assertTrue(results)
+        self.assertEqual(json.dumps(results), json.dumps(expected))
+
+    def test_babysitters_list(self):
+        self.assertSameAsSerializer('/babysitters-list/', BabysitterSerializerForParents, Babysitter.objects.all())
+
+    def test_requests_list(self):
+        self.assertSameAsSerializer('/requests-list/', RequestsSerializer, Requests.objects.all())
+
+    def test_reviews_list(self):
+        babysitter = Babysitter.objects.first()
+        self.assertSameAsSerializer('/reviews-list/', ReviewsSerializer, Reviews.objects.filter(babysitter=babysitter),
+                                    {'babysitter_id': babysitter.id})
+
+# ============================================
+#                 Renderers
+# ============================================
+
+class RendererTests(TestCase):
+    """
+    The orjson renderer and parser round-trip API values like DRF's stdlib JSON ones, with or without orjson.
+    """
+    data = {
+        'rate': Decimal('42.50'),
+        'utc': datetime(2025, 1, 1, 8, 30, 15, 123456, tzinfo=timezone.utc),
+        'offset': datetime(2025, 1, 1, 8, tzinfo=timezone(timedelta(hours=2))),
+        'day': datetime(2025, 1, 1).date(),
+        'time': datetime(2025, 1, 1, 8, 30, 1, 5).time(),
+        'id': uuid.UUID(int=1),
+        'text': 'line\u2028separator',
+        'nested': [{'count': 1, 'empty': None}],
+    }
+    decoded = {
+        'rate': 42.5,
+        'utc': '2025-01-01T08:30:15.123456Z',
+        'offset': '2025-01-01T08:00:00+02:00',
+        'day': '2025-01-01',
+        'time': '08:30:01.000005',
+        'id': '00000000-0000-0000-0000-000000000001',
+        'text': 'line\u2028separator',
+        'nested': [{'count': 1, 'empty': None}],
+    }
+
+    def round_trip(self):
+        rendered = ORJSONRenderer().render(self.data)
+        self.assertEqual(rendered, JSONRenderer().render(self.data))
+        self.assertNotIn('\u2028'.encode(), rendered)
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(rendered), parser_context={}), self.decoded)
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"rate": '), parser_context={})
+
+    @skipIf(orjson is None, "orjson is not installed")
+    def test_orjson(self):
+        self.round_trip()
+
+    def test_stdlib_fallback(self):
+        with patch('base.renderers.orjson', None):
+            self.round_trip()
+
+# ============================================
+#               Response cache
+# ============================================
+
+class ResponseCacheTests(APITestCase):
+    """
+    Cached read endpoints are served from the cache until a signal invalidates them.
+    """
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.user = User.objects.create_user(username='parent', password='password')
+        self.parents = make_parents(user=self.user)
+        self.babysitter = make_babysitter(user=User.objects.create_user(username='babysitter'))
+        self.client.force_authenticate(user=self.user)
+
+    def get_reviews(self):
+        return self.client.generic('GET', '/reviews-list/', json.dumps({'babysitter_id': self.babysitter.id}),
+                                   content_type='application/json')
+
+    def test_hit_until_invalidated(self):
+        self.assertEqual(self.get_reviews()['X-Cache'], 'MISS')
+        # Only the ETag aggregate
+        with self.assertNumQueries(1):
+            response = self.get_reviews()
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reviews.objects.create(family=self.parents, babysitter=self.babysitter, review_text='Great')
+        response = self.get_reviews()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(cache_stats()['endpoints']['ShowReviews'], {'hits': 1, 'misses': 2})
+
+    def test_other_babysitter_not_invalidated(self):
+        other = make_babysitter(phone_number='0500000001')
+        self.get_reviews()
+        with self.captureOnCommitCallbacks(execute=True):
+            Reviews.objects.create(family=self.parents, babysitter=other, review_text='Great')
+        self.assertEqual(self.get_reviews()['X-Cache'], 'HIT')
+
+    def test_per_user_payloads(self):
+        other_user = User.objects.create_user(username='other')
+        make_parents(phone_number='0510000001', user=other_user)
+        Requests.objects.create(family=self.parents, babysitter=self.babysitter)
+        self.assertEqual(len(self.client.get('/requests-list/').data['results']), 1)
+
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get('/requests-list/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_scopes_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            class Unscoped(CachedResponseMixin, generics.ListAPIView):
+                queryset = Babysitter.objects.all()
+
+        class Scoped(CachedResponseMixin, generics.ListAPIView):
+            queryset = Babysitter.objects.all()
+            cache_scopes = ['babysitters']
+        self.assertEqual(Scoped().get_cache_scopes(None), ['babysitters'])
+
+# ============================================
+#               Conditional GET
+# ============================================
+
+@override_settings(CACHES=NO_CACHE)
+class ConditionalGetTests(APITestCase):
+    """
+    Read endpoints answer 304 Not Modified while their data is unchanged.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='parent', password='password')
+        self.parents = make_parents(user=self.user)
+        self.babysitter = make_babysitter()
+        self.client.force_authenticate(user=self.user)
+        self.request = Requests.objects.create(family=self.parents, babysitter=self.babysitter)
+
+    def test_list_not_modified(self):
+        etag = self.client.get('/requests-list/')['ETag']
+        # One aggregate query, nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.client.get('/requests-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_changes(self):
+        other = Requests.objects.create(family=self.parents, babysitter=make_babysitter(phone_number='0500000001'))
+        etag = self.client.get('/requests-list/')['ETag']
+        other.delete()
+        response = self.client.get('/requests-list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        self.request.status = 'approved'
+        self.request.save()
+        self.assertEqual(self.client.get('/requests-list/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_page_validators(self):
+        requests = [Requests.objects.create(family=self.parents, babysitter=make_babysitter(phone_number=f'05100000{i:02d}'))
+                    for i in range(30)]
+        parameters = {'page_size': 10}
+        etag = self.client.get('/requests-list/', parameters)['ETag']
+        # Only the rows of the page (and the next one) are aggregated, not the whole list
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/requests-list/', parameters, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertIn('LIMIT 11', queries[-1]['sql'])
+
+        requests[0].status = 'approved'
+        requests[0].save()
+        self.assertEqual(self.client.get('/requests-list/', parameters, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        requests[-1].status = 'approved'
+        requests[-1].save()
+        self.assertEqual(self.client.get('/requests-list/', parameters, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_profile_with_nested_kids(self):
+        url = f'/parents-profile/{self.parents.family_id}/'
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        Kids.objects.create(family=self.parents, name='Kid')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+# ============================================
+#               Sparse fieldsets
+# ============================================
+
+@override_settings(CACHES=NO_CACHE)
+class SparseFieldsTests(APITestCase):
+    """
+    ?fields= / ?exclude= narrow both the output and the selected columns, within the role's fields.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='parent', password='password')
+        self.parents = make_parents(user=self.user)
+        make_babysitter(user=User.objects.create_user(username='babysitter'))
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/babysitters-list/?fields=name,hourly_rate')
+        self.assertEqual(list(response.data['results'][0]), ['name', 'hourly_rate'])
+        self.assertFalse(any('"description"' in query['sql'] for query in queries))
+
+    def test_exclude(self):
+        response = self.client.get('/babysitters-list/?exclude=description,profile_picture')
+        self.assertEqual(list(response.data['results'][0]),
+                         ['name', 'age', 'address', 'hourly_rate', 'rating_average', 'rating_count'])
+
+    def test_fields_hidden_from_role(self):
+        response = self.client.get('/babysitters-list/?fields=name,phone_number')
+        self.assertEqual(response.status_code, 400)
+
+    def test_nested_fields_unaffected(self):
+        Kids.objects.create(family=self.parents, name='Kid', age=3)
+        response = self.client.get(f'/parents-profile/{self.parents.family_id}/?fields=last_name,kids')
+        self.assertEqual(response.data, {'last_name': 'Family', 'kids': [{'name': 'Kid', 'age': 3}]})
+
+    def test_writes_ignore_fields(self):
+        babysitter = make_babysitter('0500000001')
+        Requests.objects.create(family=self.parents, babysitter=babysitter, status='approved')
+        AvailableTime.objects.create(babysitter=babysitter, start_time=at(8), end_time=at(20))
+        refresh_availability(babysitter.id)
+        response = self.client.post('/meetings-add/?fields=unknown',
+                                    {'babysitter_id': babysitter.id, 'start_time': at(9), 'end_time': at(10)})
+        self.assertEqual(response.status_code, 201, response.data)
+        response = self.client.post('/register/?fields=unknown', {
+            'username': 'other', 'email': 'other@example.com', 'password': 'password', 'user_type': 'Parent',
+            'dad_name': 'Dad', 'mom_name': 'Mom', 'address': 'Tel Aviv', 'last_name': 'Other',
+            'phone_number': '0510000001'})
+        self.assertEqual(response.status_code, 201, response.data)
+
+# ============================================
+#                 Delta Sync
+# ============================================
+
+class SyncTests(APITestCase):
+    """
+    The sync endpoint returns the rows changed since the cursor and the ids deleted since.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='parent', password='password')
+        self.parents = make_parents(user=self.user)
+        self.babysitter = make_babysitter()
+        self.client.force_authenticate(user=self.user)
+
+    def sync(self, since=None):
+        response = self.client.get('/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_full_sync(self):
+        Requests.objects.create(family=self.parents, babysitter=self.babysitter)
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual(data['profile']['last_name'], 'Family')
+        self.assertEqual(len(data['requests']['changed']), 1)
+        self.assertNotIn('availability', data)
+
+    def test_changes_since_cursor(self):
+        old = Kids.objects.create(family=self.parents, name='Old', age=3)
+        Kids.objects.filter(id=old.id).update(updated_at=at(8))
+        Parents.objects.filter(pk=self.parents.pk).update(updated_at=at(8))
+        self.client.force_authenticate(user=User.objects.get(pk=self.user.pk))
+        cursor = self.sync()['cursor']
+
+        new = Kids.objects.create(family=self.parents, name='New', age=5)
+        data = self.sync(cursor)
+        self.assertFalse(data['full'])
+        self.assertIsNone(data['profile'])
+        self.assertEqual([kid['id'] for kid in data['kids']['changed']], [new.id])
+
+    def test_deletions(self):
+        request = Requests.objects.create(family=self.parents, babysitter=self.babysitter)
+        cursor = self.sync()['cursor']
+        request_id = request.id
+        request.delete()
+        data = self.sync(cursor)
+        self.assertEqual(data['requests'], {'changed': [], 'deleted': [request_id]})
+
+    def test_expired_cursor(self):
+        data = self.sync((datetime.now(timezone.utc) - timedelta(days=365)).isoformat())
+        self.assertTrue(data['full'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/sync/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+# ============================================
+#                 Streaming
+# ============================================
+
+@override_settings(CACHES=NO_CACHE)
+class StreamingTests(APITestCase):
+    """
+    ?stream=true returns the whole list as one JSON array streamed in chunks.
+    """
+    def setUp(self):
+        self.parents = make_parents()
+        self.babysitter = make_babysitter()
+        # More than a page
+        Requests.objects.bulk_create(Requests(family=self.parents, babysitter=self.babysitter) for _ in range(60))
+        self.client.force_authenticate(user=User.objects.create_superuser(username='admin'))
+
+    def test_stream(self):
+        response = self.client.get('/requests-admin/?stream=true')
+        self.assertTrue(response.streaming)
+        data = json.loads(b''.join(response.streaming_content))
+        expected = RequestsSerializer(Requests.objects.order_by('pk'), many=True).data
+        self.assertEqual(data, json.loads(json.dumps(expected)))
+
+    def test_chunks(self):
+        chunks = list(stream_json_array(range(5), lambda chunk: [{'n': n} for n in chunk], chunk_size=2))
+        self.assertEqual(len(chunks), 5)
+        self.assertEqual(json.loads(b''.join(chunks)), [{'n': n} for n in range(5)])
+        self.assertEqual(b''.join(stream_json_array([], list)), b'[]')
+
+# ============================================
+#                  Exports
+# ============================================
+
+class ExportTests(APITestCase):
+    """
+    Admin exports stream whole tables as CSV or NDJSON, optionally limited to a creation time range.
+    """
+    def setUp(self):
+        self.parents = make_parents()
+        self.babysitter = make_babysitter()
+        self.requests = [Requests.objects.create(family=self.parents, babysitter=self.babysitter) for _ in range(3)]
+        Requests.objects.filter(pk=self.requests[0].pk).update(created_at=at(8))
+        self.client.force_authenticate(user=User.objects.create_superuser(username='admin'))
+
+    def test_csv(self):
+        response = self.client.get('/export/requests.csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,family_id,babysitter_id,status,created_at,updated_at,is_active')
+        self.assertEqual(len(lines), 4)
+
+    def test_csv_formulas(self):
+        for i, name in enumerate(['=HYPERLINK("http://example.com")', '+1', '-1', '@SUM(A1)', 'Plain - name']):
+            make_babysitter(phone_number=f'050000001{i}', name=name, hourly_rate=-5)
+        response = self.client.get('/export/babysitters.csv')
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['name'] for row in rows[1:]],
+                         ['\'=HYPERLINK("http://example.com")', "'+1", "'-1", "'@SUM(A1)", 'Plain - name'])
+        # Only text is quoted, numbers are kept as numbers
+        self.assertEqual(rows[1]['hourly_rate'], '-5.00')
+
+    def test_ndjson_range(self):
+        response = self.client.get('/export/requests.ndjson', {'from': at(9).isoformat()})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([row['id'] for row in rows], [request.id for request in self.requests[1:]])
+
+    def test_admin_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='user'))
+        self.assertEqual(self.client.get('/export/requests.csv').status_code, 403)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('export_table', 'requests', '--format', 'ndjson', '--to', at(9).isoformat(), stdout=output)
+        self.assertEqual([json.loads(line)['id'] for line in output.getvalue().splitlines()], [self.requests[0].id])
+
+# ============================================
+#                  Ratings
+# ============================================
+
+@override_settings(CACHES=NO_CACHE)
+class RatingTests(APITestCase):
+    """
+    The rating aggregates of a babysitter follow the review writes and can be recomputed.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='parent', password='password')
+        self.parents = make_parents(user=self.user)
+        self.babysitter = make_babysitter(user=User.objects.create_user(username='babysitter'))
+        Requests.objects.create(family=self.parents, babysitter=self.babysitter, status='approved')
+        self.client.force_authenticate(user=self.user)
+
+    def assertRatings(self, count, total, average, histogram):
+        self.babysitter.refresh_from_db()
+        self.assertEqual((self.babysitter.rating_count, self.babysitter.rating_sum), (count, total))
+        self.assertAlmostEqual(self.babysitter.rating_average, average)
+        self.assertEqual([getattr(self.babysitter, f'rating_{star}_count') for star in range(1, 6)], histogram)
+
+    def test_ordering_pages_ties(self):
+        # More unrated babysitters than DRF's offset_cutoff share the same average
+        make_tied_babysitters(1300)
+        for parameters in [{'ordering': '-rating_average'}, {'ordering': 'rating_average'}, {'min_rating': 0}]:
+            rows = page_through(self.client, '/babysitters-list/', {'page_size': 100, 'fields': 'name', **parameters})
+            self.assertEqual(len({row['name'] for row in rows}), 1301)
+
+    def test_ordering_previous_pages(self):
+        make_tied_babysitters(30)
+        first = self.client.get('/babysitters-list/', {'ordering': '-rating_average', 'page_size': 10})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def review(self, rating):
+        response = self.client.post('/reviews/', {'babysitter_id': self.babysitter.id, 'review_text': 'Text',
+                                                  'rating': rating})
+        self.assertEqual(response.status_code, 201)
+        return Reviews.objects.latest('id')
+
+    def test_incremental(self):
+        first = self.review(5)
+        self.review(2)
+        self.assertRatings(2, 7, 3.5, [0, 1, 0, 0, 1])
+        self.client.patch(f'/reviews/{first.id}/', {'rating': 4})
+        self.assertRatings(2, 6, 3.0, [0, 1, 0, 1, 0])
+        self.client.delete(f'/reviews/{first.id}/')
+        self.assertRatings(1, 2, 2.0, [0, 1, 0, 0, 0])
+
+    def test_out_of_range(self):
+        response = self.client.post('/reviews/', {'babysitter_id': self.babysitter.id, 'rating': 6})
+        self.assertEqual(response.status_code, 400)
+
+    def test_recompute(self):
+        Reviews.objects.create(family=self.parents, babysitter=self.babysitter, rating=4)
+        self.assertEqual(recompute_ratings(verify=True), [self.babysitter.id])
+        self.assertEqual(recompute_ratings(), [self.babysitter.id])
+        self.assertRatings(1, 4, 4.0, [0, 0, 0, 1, 0])
+        self.assertEqual(recompute_ratings(verify=True), [])
+
+    def test_list_by_rating(self):
+        other = make_babysitter('0500000001', user=User.objects.create_user(username='other'))
+        Babysitter.objects.filter(id=other.id).update(rating_average=4.5, rating_count=2)
+        Babysitter.objects.filter(id=self.babysitter.id).update(rating_average=3.0, rating_count=1)
+        response = self.client.get('/babysitters-list/?ordering=-rating_average')
+        self.assertEqual([row['rating_average'] for row in response.data['results']], [4.5, 3.0])
+        response = self.client.get('/babysitters-list/?min_rating=4')
+        self.assertEqual([row['rating_average'] for row in response.data['results']], [4.5])
+        self.assertEqual(self.client.get('/babysitters-list/?ordering=name').status_code, 400)
+
+# ============================================
+#              Babysitter Search
+# ============================================
+
+@override_settings(CACHES=NO_CACHE)
+class BabysitterSearchTests(APITestCase):
+    """
+    The babysitter list filters by hourly rate, age and city, and sorts by them.
+    """
+    def setUp(self):
+        for i, (age, hourly_rate, address) in enumerate([(20, 40, 'Tel Aviv'), (30, 60, 'Haifa'), (40, 80, 'Dizengoff 5, tel aviv')]):
+            make_babysitter(f'050000000{i}', name=f'Babysitter {i}', age=age, hourly_rate=hourly_rate, address=address,
+                            user=User.objects.create_user(username=f'babysitter{i}'))
+        user = User.objects.create_user(username='parent')
+        make_parents(user=user)
+        self.client.force_authenticate(user=user)
+
+    def names(self, parameters):
+        response = self.client.get('/babysitters-list/', parameters)
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.names({'min_hourly_rate': 50, 'max_hourly_rate': 80}), ['Babysitter 2', 'Babysitter 1'])
+        self.assertEqual(self.names({'max_age': 30}), ['Babysitter 1', 'Babysitter 0'])
+        self.assertEqual(self.names({'city': ' TEL AVIV'}), ['Babysitter 2', 'Babysitter 0'])
+        self.assertEqual(self.names({'city': 'tel aviv', 'min_age': 30}), ['Babysitter 2'])
+
+    def test_ordering(self):
+        self.assertEqual(self.names({'ordering': 'hourly_rate'}), ['Babysitter 0', 'Babysitter 1', 'Babysitter 2'])
+        self.assertEqual(self.names({'ordering': '-age', 'page_size': 1}), ['Babysitter 2'])
+
+    def test_city(self):
+        babysitter = Babysitter.objects.get(name='Babysitter 1')
+        self.assertEqual(babysitter.city, 'haifa')
+        babysitter.address = 'Herzl 1,  Tel  Aviv'
+        babysitter.save(update_fields=['address'])
+        self.assertEqual(self.names({'city': 'Tel Aviv'}), ['Babysitter 2', 'Babysitter 1', 'Babysitter 0'])
+        self.assertEqual(self.names({'city': 'Herzl 1'}), [])
+
+    def test_ordering_pages_ties(self):
+        # More babysitters than DRF's offset_cutoff share the same rate and age
+        make_tied_babysitters(1300, hourly_rate=50, age=25, address='Haifa')
+        for parameters in [{'ordering': 'hourly_rate'}, {'ordering': '-hourly_rate'}, {'ordering': 'age'},
+                           {'ordering': '-age', 'min_age': 25}, {'ordering': 'hourly_rate', 'city': 'haifa'}]:
+            rows = page_through(self.client, '/babysitters-list/', {'page_size': 100, 'fields': 'name', **parameters})
+            self.assertEqual(len({row['name'] for row in rows}), len(rows))
+            self.assertGreaterEqual(len(rows), 1300)
+
+    def test_invalid_range(self):
+        response = self.client.get('/babysitters-list/', {'min_age': 40, 'max_age': 20})
+        self.assertEqual(response.status_code, 400)
+
+# ============================================
+#              Full Text Search
+# ============================================
+
+class TextSearchTests(APITestCase):
+    """
+    The search index follows the babysitter and review writes, and ranks the matches with BM25.
+    """
+    def setUp(self):
+        self.french = make_babysitter('0500000001', name='Dana', description='Speaks French, first aid certified',
+                                      user=User.objects.create_user(username='dana'))
+        self.dogs = make_babysitter('0500000002', name='Lihi', description='Loves dogs and swimming',
+                                    user=User.objects.create_user(username='lihi'))
+        user = User.objects.create_user(username='parent')
+        self.parents = make_parents(user=user)
+        self.client.force_authenticate(user=user)
+
+    def search(self, text):
+        response = self.client.get('/babysitters-search/', {'q': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_search(self):
+        self.assertEqual(self.search('speaks French, first aid'), [self.french.id])
+        self.assertEqual(self.search('"first aid" -dogs'), [self.french.id])
+        self.assertCountEqual(self.search('french or swim'), [self.french.id, self.dogs.id])
+        self.assertEqual(self.search('italian'), [])
+
+    def test_index_follows_writes(self):
+        review = Reviews.objects.create(family=self.parents, babysitter=self.dogs, review_text='Great with toddlers')
+        self.assertEqual(self.search('toddler'), [self.dogs.id])
+        review.delete()
+        self.assertEqual(self.search('toddler'), [])
+
+        self.french.description = 'Plays piano'
+        self.french.save()
+        self.assertEqual(self.search('piano'), [self.french.id])
+        User.objects.filter(username='dana').update(is_active=False)
+        self.assertEqual(self.search('piano'), [])
+
+    def test_ranking(self):
+        Reviews.objects.create(family=self.parents, babysitter=self.french, review_text='The kids loved the swimming')
+        # Description matches weigh more than review matches
+        self.assertEqual(self.search('swimming'), [self.dogs.id, self.french.id])
+
+    def test_pages(self):
+        response = self.client.get('/babysitters-search/', {'q': 'french or dogs', 'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_not_modified(self):
+        etag = self.client.get('/babysitters-search/', {'q': 'french'})['ETag']
+        response = self.client.get('/babysitters-search/', {'q': 'french'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Reviews.objects.create(family=self.parents, babysitter=self.dogs, review_text='Learning French')
+        response = self.client.get('/babysitters-search/', {'q': 'french'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual([row['id'] for row in response.data['results']], [self.french.id, self.dogs.id])
+
+    @skipIf(connection.vendor != 'sqlite', "The FTS5 index is SQLite only")
+    def test_triggers_reinstalled_after_migrate(self):
+        # Migrations that rebuild the babysitter table (e.g. 0018) drop its triggers
+        self.assertEqual(check_search_triggers(databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER base_babysitter_fts_update')
+        self.assertEqual([error.id for error in check_search_triggers(databases=['default'])], ['base.W001'])
+
+        Babysitter.objects.filter(id=self.dogs.id).update(description='Plays chess')
+        reinstall_search_index(sender=apps.get_app_config('base'), using='default')
+        self.assertEqual(check_search_triggers(databases=['default']), [])
+        self.assertEqual(self.search('chess'), [self.dogs.id])
+
+# ============================================
+#                  Nearby
+# ============================================
+
+class StubGeocoder:
+    LOCATIONS = {'home': (32.0, 34.8), 'near': (32.01, 34.8), 'closer': (32.005, 34.8), 'far': (32.5, 34.8)}
+
+    def geocode(self, address):
+        return self.LOCATIONS.get(address)
+
+@override_settings(CACHES=NO_CACHE, GEOCODER='base.tests.StubGeocoder')
+class NearbyTests(APITestCase):
+    """
+    Addresses are geocoded on save and the babysitter list has a nearby mode ordered by distance.
+    """
+    def setUp(self):
+        self.babysitters = {}
+        for i, address in enumerate(['near', 'closer', 'far', 'nowhere']):
+            self.babysitters[address] = make_babysitter(f'050000000{i}', address=address,
+                                                        user=User.objects.create_user(username=address))
+        user = User.objects.create_user(username='parent')
+        self.parents = make_parents(user=user, address='home')
+        self.client.force_authenticate(user=user)
+
+    def test_geocoding(self):
+        self.assertEqual((self.parents.latitude, self.parents.longitude), (32.0, 34.8))
+        babysitter = self.babysitters['nowhere']
+        self.assertIsNone(babysitter.geohash)
+        babysitter.address = 'far'
+        babysitter.save()
+        babysitter.refresh_from_db()
+        self.assertEqual(babysitter.geohash[:5], geohash_encode(32.5, 34.8, 5))
+
+    def test_geocoding_update_fields(self):
+        babysitter = self.babysitters['near']
+        babysitter.address = 'far'
+        babysitter.save(update_fields=['address'])
+        babysitter.refresh_from_db()
+        self.assertEqual((babysitter.latitude, babysitter.longitude), (32.5, 34.8))
+        self.assertEqual(babysitter.geohash[:5], geohash_encode(32.5, 34.8, 5))
+        self.parents.address = 'nowhere'
+        self.parents.save(update_fields=['address'])
+        self.parents.refresh_from_db()
+        self.assertEqual((self.parents.latitude, self.parents.longitude), (None, None))
+
+    def test_nearby(self):
+        response = self.client.get('/babysitters-list/', {'nearby': 'true', 'radius': 5, 'fields': 'address'})
+        self.assertEqual([row['address'] for row in response.data['results']], ['closer', 'near'])
+        response = self.client.get('/babysitters-list/', {'nearby': 'true', 'latitude': 32.5, 'longitude': 34.8,
+                                                          'fields': 'address'})
+        self.assertEqual([row['address'] for row in response.data['results']], ['far'])
+
+    def test_nearby_pages(self):
+        response = self.client.get('/babysitters-list/', {'nearby': 'true', 'page_size': 1, 'fields': 'address'})
+        self.assertEqual([row['address'] for row in response.data['results']], ['closer'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['address'] for row in response.data['results']], ['near'])
+
+    def test_unlocated_parent(self):
+        Parents.objects.filter(pk=self.parents.pk).update(latitude=None, longitude=None)
+        self.client.force_authenticate(user=User.objects.get(username='parent'))
+        response = self.client.get('/babysitters-list/', {'nearby': 'true'})
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_per_parent(self):
+        cache.clear()
+        parameters = {'nearby': 'true', 'radius': 5, 'fields': 'address'}
+        self.assertEqual([row['address'] for row in self.client.get('/babysitters-list/', parameters).data['results']],
+                         ['closer', 'near'])
+        # Another parent's nearby search is around their own address
+        other = User.objects.create_user(username='other')
+        make_parents('0510000001', user=other, address='far')
+        self.client.force_authenticate(user=other)
+        self.assertEqual([row['address'] for row in self.client.get('/babysitters-list/', parameters).data['results']],
+                         ['far'])
+        # Moving invalidates the parent's cached searches
+        with self.captureOnCommitCallbacks(execute=True):
+            self.parents.address = 'far'
+            self.parents.save()
+        self.client.force_authenticate(user=User.objects.get(username='parent'))
+        self.assertEqual([row['address'] for row in self.client.get('/babysitters-list/', parameters).data['results']],
+                         ['far'])
+
+    def test_etag_follows_location(self):
+        parameters = {'nearby': 'true', 'radius': 100}
+        etag = self.client.get('/babysitters-list/', parameters)['ETag']
+        self.assertEqual(self.client.get('/babysitters-list/', parameters, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.parents.address = 'far'
+        self.parents.save()
+        self.client.force_authenticate(user=User.objects.get(username='parent'))
+        self.assertEqual(self.client.get('/babysitters-list/', parameters, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_distance_ties(self):
+        # Every babysitter of a city is geocoded to its center
+        make_tied_babysitters(1100, latitude=32.01, longitude=34.8, geohash=geohash_encode(32.01, 34.8))
+        rows = page_through(self.client, '/babysitters-list/', {'nearby': 'true', 'radius': 5, 'page_size': 100,
+                                                                'fields': 'name'})
+        self.assertEqual(len(rows), 1102)
+        self.assertEqual(len({row['name'] for row in rows if row['name'].startswith('Tied')}), 1100)
+
+    def test_covering_cells(self):
+        # The cells of a 5 km search around the center contain every point within 5 km
+        cells = covering_cells(32.0, 34.8, 5)
+        for latitude, longitude in [(32.04, 34.8), (31.96, 34.8), (32.0, 34.85), (32.0, 34.75)]:
+            self.assertTrue(any(geohash_encode(latitude, longitude).startswith(cell) for cell in cells))
+
+# ============================================
+#               Recommendations
+# ============================================
+
+@override_settings(CACHES=NO_CACHE, GEOCODER='base.tests.StubGeocoder')
+class RecommendationTests(APITestCase):
+    """
+    The batch job stores every parent's top K babysitters, read back by the recommended list.
+    """
+    def setUp(self):
+        self.babysitters = {}
+        for i, address in enumerate(['near', 'closer', 'far', 'nowhere']):
+            self.babysitters[address] = make_babysitter(f'050000000{i}', address=address,
+                                                        user=User.objects.create_user(username=address))
+        user = User.objects.create_user(username='parent')
+        self.parents = make_parents(user=user, address='home')
+        self.client.force_authenticate(user=user)
+
+    def recommended(self):
+        response = self.client.get('/babysitters-recommended/')
+        self.assertEqual(response.status_code, 200)
+        return [row['address'] for row in response.data['results']]
+
+    def test_distance(self):
+        self.assertEqual(self.recommended(), [])
+        recompute_recommendations()
+        self.assertEqual(self.recommended(), ['closer', 'near', 'far', 'nowhere'])
+
+    def test_approval_history(self):
+        Requests.objects.create(family=self.parents, babysitter=self.babysitters['closer'], status='declined')
+        Requests.objects.create(family=self.parents, babysitter=self.babysitters['far'], status='approved')
+        recompute_recommendations()
+        self.assertEqual(self.recommended(), ['near', 'closer', 'far', 'nowhere'])
+
+    def test_availability(self):
+        # The parents met on a Monday morning, only the unlocated babysitter is free on the next Mondays
+        other = make_babysitter('0500000009', address='nowhere', user=User.objects.create_user(username='other'))
+        Meetings.objects.create(family=self.parents, babysitter=other, status='approved',
+                                start_time=datetime(2024, 12, 30, 10, tzinfo=timezone.utc),
+                                end_time=datetime(2024, 12, 30, 12, tzinfo=timezone.utc))
+        AvailableTime.objects.create(babysitter=self.babysitters['nowhere'], start_time=at(9, day=6), end_time=at(13, day=6))
+        recompute_recommendations(now=at(0))
+        recommended = self.recommended()
+        self.assertLess(recommended.index('nowhere'), recommended.index('far'))
+
+    def test_top_k(self):
+        recompute_recommendations(k=2)
+        recompute_recommendations(k=2)
+        self.assertEqual(self.recommended(), ['closer', 'near'])
+        self.assertEqual(Recommendation.objects.filter(family=self.parents).count(), 2)
+
+    def test_single_read(self):
+        recompute_recommendations()
+        User.objects.filter(username='near').update(is_active=False)
+        with CaptureQueriesContext(connection) as queries:
+            recommended = self.recommended()
+        self.assertEqual(recommended, ['closer', 'far', 'nowhere'])
+        self.assertEqual(len([query for query in queries if 'base_recommendation' in query['sql']]), 1)
+
+    def test_not_modified(self):
+        recompute_recommendations()
+        etag = self.client.get('/babysitters-recommended/')['ETag']
+        response = self.client.get('/babysitters-recommended/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # Deactivated babysitters leave the list
+        User.objects.filter(username='near').update(is_active=False)
+        response = self.client.get('/babysitters-recommended/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        recompute_recommendations()
+        response = self.client.get('/babysitters-recommended/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command('recompute_recommendations', stdout=output)
+        self.assertIn('Stored the recommendations of 1 parents', output.getvalue())
+        self.assertEqual(self.recommended(), ['closer', 'near', 'far', 'nowhere'])
@@ -8,8 +8,10 @@ from rest_framework.routers import DefaultRouter
 
 router = DefaultRouter()
 router.register(r'availability', views.AvailableTimeActions, basename='availability')
+router.register(r'recurring-availability', views.RecurringAvailabilityActions, basename='recurring-availability')
 router.register(r'reviews', views.ReviewsViewSet, basename='reviews')
 router.register(r'babysitters-admin', views.AdminForBabysitter, basename='babysitter-admin')
+router.register(r'requests-admin', views.AdminForRequests, basename='requests-admin')
 
 urlpatterns = [
     # General
@@ -20,6 +22,9 @@ urlpatterns = [
     path('user-delete/', views.deactivate_my_user),
     # Babysitter 
     path('babysitters-list/', views.BabysitterListView.as_view()),
+    path('babysitters-available/', views.BabysitterAvailabilitySearch.as_view()),
+    path('babysitters-search/', views.BabysitterTextSearch.as_view()),
+    path('babysitters-recommended/', views.BabysitterRecommendations.as_view()),
     path('babysitter-profile/<int:pk>/', views.BabysitterActions.as_view()),
     # Parents
     path('parents-list/' , views.ParentsListView.as_view()),
@@ -31,6 +36,7 @@ urlpatterns = [
     # Available Time
     path('availability-list/', views.AvailableTimeListView.as_view()),
     # + availability/* CRUD (in the router)
+    # + recurring-availability/* CRUD (in the router)
     # Requests
     path('request-add/', views.RequestsViewSet.as_view()),
     path('requests-list/', views.ShowRequests.as_view()),
@@ -41,9 +47,15 @@ urlpatterns = [
     # + reviews/* CRUD (in the router)
     # Meetings
     path('meetings-add/', views.CreateMeetingView.as_view()),
+    path('meetings-add-batch/', views.CreateMeetingsBatchView.as_view()),
     path('meetings-list/', views.ShowMeetings.as_view()),
     path('meeting-update/<int:pk>/', views.MeetingActionsForBabysitter.as_view()),
     path('meeting-availablity/', views.show_babysitter_availability_for_meetings),
+    # Sync
+    path('sync/', views.sync_changes),
+    # Admin
+    path('cache-stats/', views.show_cache_stats),
+    path('export/<str:table>.<str:file_format>', views.export_table),
     # Router
     path('', include(router.urls)),
 ]
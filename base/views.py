@@ -1,11 +1,31 @@
+import heapq
+from urllib.parse import urlencode
 from django.http import HttpResponse
 from django.contrib.auth.models import User
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db import transaction
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import permissions , viewsets , generics, exceptions, status
 from .serializer import *
-from .models import Babysitter, Meetings, Requests, Parents, Kids, Reviews, AvailableTime
+from .models import address_city, Babysitter, Meetings, Requests, Parents, Kids, Reviews, AvailableTime, RecurringAvailability
 from .permissions import IsParent, IsBabysitter, check_parent_approved_by_babysitter
+from .availability import free_slots, babysitters_free_between, refresh_availability, coalesce_available_time
+from .booking import BookingError, MAX_BATCH_MEETINGS, book_meeting, book_meetings, approve_meeting
+from .recurring import recurring_window, recurring_intervals
+from .pagination import IntervalCursorPagination
+from .fastlist import FastListMixin
+from .streaming import StreamingListMixin
+from .caching import CachedResponseMixin, cache_response, cache_stats
+from .conditional import ConditionalGetMixin, conditional_response
+from .sync import changes_since
+from .export import EXPORTS, EXPORT_FORMATS, export_response
+from .ratings import add_rating, remove_rating
+from .search import search_babysitters
+from .geo import near
+from .recommendations import recommended_babysitters
 
 # ============================================
 #                General Pages
@@ -69,23 +89,205 @@ def deactivate_my_user(request):
 
 ## ===== Babysitter =====
 
-class BabysitterListView(generics.ListAPIView):
+class BabysitterListView(ConditionalGetMixin, CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
     Retrieve and display a list of all babysitters.
+    - **min_hourly_rate** / **max_hourly_rate** (decimal, optional): The hourly rate range (query parameters).
+    - **min_age** / **max_age** (int, optional): The age range (query parameters).
+    - **city** (str, optional): Only list babysitters in this city (the last part of their address, as in
+      "Dizengoff 5, Tel Aviv"), case insensitive (query parameter).
+    - **min_rating** (float, optional): Only list babysitters rated at least this on average (query parameter).
+    - **nearby** (bool, optional): Only list babysitters within radius km, nearest first (query parameter).
+    - **latitude** / **longitude** (float, optional): The center of the nearby search, the parent's address
+      by default (query parameters).
+    - **radius** (float, optional): The nearby search radius in km, 10 by default and at most 100 (query parameter).
+    - **ordering** (str, optional): One of `orderings` (query parameter). Defaults to the nearest first in nearby
+      mode, to the best rated first when filtering by rating, else to the newest first.
 
     This view is used by parents.
     """
     queryset = Babysitter.objects.filter(user__is_active=True)
     serializer_class = BabysitterSerializerForParents
     permission_classes = [IsParent]
+    orderings = ['hourly_rate', '-hourly_rate', 'age', '-age', 'rating_average', '-rating_average']
+
+    def get_cache_scopes(self, request):
+        # Nearby searches around the parent's address depend on it as well
+        if self.uses_parent_location():
+            return ['babysitters', f'parents:{request.user.Parent.family_id}']
+        return ['babysitters']
+
+    def get_cache_per_user(self, request):
+        return self.uses_parent_location()
+
+    def get_conditional_context(self, request):
+        return {'location': self.nearby_location()} if self.uses_parent_location() else None
+
+    # The page links keep the query string, so the list parameters are read from it
+    @property
+    def cursor_ordering(self):
+        ordering = self.request.query_params.get('ordering')
+        if ordering is None:
+            if self.get_filters()['nearby']:
+                return 'distance'
+            # Walking the primary key would skip most rows of a rating filter, its index is walked instead
+            return '-rating_average' if 'min_rating' in self.request.query_params else '-pk'
+        if ordering not in self.orderings:
+            raise exceptions.ValidationError({"ordering": [f"Must be one of: {', '.join(self.orderings)}."]})
+        return ordering
+
+    def get_filters(self):
+        if not hasattr(self, 'filters'):
+            filters_serializer = BabysitterFiltersSerializer(data=self.request.query_params)
+            filters_serializer.is_valid(raise_exception=True)
+            self.filters = filters_serializer.validated_data
+        return self.filters
+
+    def uses_parent_location(self):
+        filters = self.get_filters()
+        return filters['nearby'] and 'latitude' not in filters
+
+    def nearby_location(self):
+        filters = self.get_filters()
+        if 'latitude' in filters:
+            return filters['latitude'], filters['longitude']
+        parents = self.request.user.Parent
+        if parents.latitude is None:
+            raise exceptions.ValidationError(
+                {"nearby": ["Your address could not be located, send latitude and longitude."]})
+        return parents.latitude, parents.longitude
 
-class BabysitterActions(generics.RetrieveUpdateAPIView):
+    def get_queryset(self):
+        filters = self.get_filters()
+        queryset = super().get_queryset()
+        if 'min_hourly_rate' in filters:
+            queryset = queryset.filter(hourly_rate__gte=filters['min_hourly_rate'])
+        if 'max_hourly_rate' in filters:
+            queryset = queryset.filter(hourly_rate__lte=filters['max_hourly_rate'])
+        if 'min_age' in filters:
+            queryset = queryset.filter(age__gte=filters['min_age'])
+        if 'max_age' in filters:
+            queryset = queryset.filter(age__lte=filters['max_age'])
+        if 'city' in filters:
+            queryset = queryset.filter(city=address_city(filters['city']))
+        if 'min_rating' in filters:
+            queryset = queryset.filter(rating_average__gte=filters['min_rating'])
+        if filters['nearby']:
+            latitude, longitude = self.nearby_location()
+            queryset = near(queryset, latitude, longitude, filters['radius'])
+        return queryset
+
+class BabysitterAvailabilitySearch(generics.ListAPIView):
+    """
+    Retrieve a list of all babysitters that are free for a given time window.
+    - **from** (str): The start of the window (in datetime format).
+    - **to** (str): The end of the window (in datetime format).
+
+    This view is used by parents.
+    """
+    queryset = Babysitter.objects.none()
+    serializer_class = BabysitterSearchSerializer
+    permission_classes = [IsParent]
+
+    def get_queryset(self):
+        window_serializer = TimeWindowSerializer(data=self.request.data)
+        window_serializer.is_valid(raise_exception=True)
+        window = window_serializer.validated_data
+        if 'from' not in window or 'to' not in window:
+            raise exceptions.ValidationError("You must enter both from and to")
+        return babysitters_free_between(window['from'], window['to'])
+
+class BabysitterTextSearch(generics.GenericAPIView):
+    """
+    Search the babysitters' names, descriptions and reviews, best matches first.
+    - **q** (str): Words, "quoted phrases", -excluded words and `or` between words (query parameter).
+    - **page_size** (int, optional): The number of results, at most 500 (query parameter).
+    - **offset** (int, optional): The number of best matches to skip (query parameter).
+
+    This view is used by parents.
+    """
+    queryset = Babysitter.objects.none()
+    serializer_class = BabysitterTextSearchSerializer
+    permission_classes = [IsParent]
+    max_page_size = 500
+
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({"detail": "You must enter a search query (q)."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            page_size = min(int(request.query_params.get('page_size', settings.REST_FRAMEWORK['PAGE_SIZE'])),
+                            self.max_page_size)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({"detail": "page_size and offset must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if page_size < 1 or offset < 0:
+            return Response({"detail": "page_size and offset must be positive."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # One more match than requested tells whether there is a next page
+        matches = search_babysitters(text, page_size + 1, offset)
+        babysitters = Babysitter.objects.in_bulk([babysitter_id for babysitter_id, _ in matches[:page_size]])
+        results = []
+        for babysitter_id, score in matches[:page_size]:
+            if babysitter_id in babysitters:
+                babysitters[babysitter_id].score = score
+                results.append(babysitters[babysitter_id])
+
+        next_link = None
+        if len(matches) > page_size:
+            next_link = request.build_absolute_uri(
+                f"{request.path}?{urlencode({'q': text, 'page_size': page_size, 'offset': offset + page_size})}")
+
+        # The matches follow the indexed texts and the babysitters their updated_at, so they validate the page
+        values = {'matches': matches, 'updated': [babysitter.updated_at for babysitter in results]}
+        last_modified = max((babysitter.updated_at for babysitter in results), default=None)
+        return conditional_response(
+            request, values, last_modified,
+            lambda: Response({"next": next_link, "results": self.get_serializer(results, many=True).data},
+                             status=status.HTTP_200_OK),
+            check_last_modified=False)
+
+class BabysitterRecommendations(generics.GenericAPIView):
+    """
+    Retrieve the babysitters recommended to the parent, best first, as scored by the last
+    recompute_recommendations run (empty until the parent's first run).
+
+    This view is used by parents.
+    """
+    queryset = Babysitter.objects.none()
+    serializer_class = BabysitterRecommendationSerializer
+    permission_classes = [IsParent]
+
+    def get(self, request):
+        recommendations = recommended_babysitters(request.user.Parent)
+        babysitters = []
+        for recommendation in recommendations:
+            recommendation.babysitter.score = recommendation.score
+            babysitters.append(recommendation.babysitter)
+
+        # A recompute run or a babysitter update changes the rows, deactivations the ids
+        values = {'recommendations': [(recommendation.babysitter_id, recommendation.score, recommendation.computed_at,
+                                       recommendation.babysitter.updated_at) for recommendation in recommendations]}
+        last_modified = max((max(recommendation.computed_at, recommendation.babysitter.updated_at)
+                             for recommendation in recommendations), default=None)
+        return conditional_response(
+            request, values, last_modified,
+            lambda: Response({"computed_at": recommendations[0].computed_at if recommendations else None,
+                              "results": self.get_serializer(babysitters, many=True).data},
+                             status=status.HTTP_200_OK),
+            check_last_modified=False)
+
+class BabysitterActions(ConditionalGetMixin, CachedResponseMixin, generics.RetrieveUpdateAPIView):
     """
     API view for babysitters to retrieve or update their profile.
     """
     queryset = Babysitter.objects.all()
     serializer_class = BabysitterSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_per_user = True
+
+    def get_cache_scopes(self, request):
+        return [f"babysitter:{self.kwargs['pk']}"]
 
     # Filter the user
     def get_queryset(self):
@@ -97,27 +299,29 @@ class BabysitterActions(generics.RetrieveUpdateAPIView):
 
 ## ===== Parents =====
 
-class ParentsListView(generics.ListAPIView):
+class ParentsListView(ConditionalGetMixin, generics.ListAPIView):
     """
     Retrieve and display a list of all parents.
 
     This view is used by babysitters.
     """
-    queryset = Parents.objects.all()
+    queryset = Parents.objects.prefetch_related('kids')
     serializer_class = ParentsSerializerForBabysitter
     permission_classes = [IsBabysitter]
+    conditional_related = ('kids',)
 
-class ParentsActions(generics.RetrieveUpdateAPIView):
+class ParentsActions(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     API view for parents to retrieve or update their profile.
     """
     queryset = Parents.objects.all()
     serializer_class = ParentsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = ('kids',)
 
     # Filter the user
     def get_queryset(self):
-        return Parents.objects.filter(user=self.request.user)
+        return Parents.objects.filter(user=self.request.user).prefetch_related('kids')
     
     # Update the user with patch
     def perform_update(self, serializer):
@@ -125,7 +329,7 @@ class ParentsActions(generics.RetrieveUpdateAPIView):
 
 ## ===== Kids =====
 
-class KidsListView(generics.ListAPIView):
+class KidsListView(ConditionalGetMixin, generics.ListAPIView):
     """
     Retrieve and display a list of kids for a given parent id.
     - **parent_id** (int): The id of the parent.
@@ -177,7 +381,7 @@ class KidsCreate(generics.CreateAPIView):
         kid.save()
         return Response(self.get_serializer(kid).data,status=status.HTTP_201_CREATED)
 
-class KidsActions(generics.RetrieveUpdateAPIView):
+class KidsActions(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     Get kid info for the given kid id.
     
@@ -187,10 +391,13 @@ class KidsActions(generics.RetrieveUpdateAPIView):
     serializer_class = KidsSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return Kids.objects.select_related('family')
+
     def perform_update(self, serializer):
-        kid = self.get_object()
+        kid = serializer.instance
         parent = kid.family        
-        if parent.user != self.request.user:
+        if parent.user_id != self.request.user.id:
             raise exceptions.PermissionDenied("You do not have permission to update this kid.")
 
         serializer.save()
@@ -207,6 +414,7 @@ class AvailableTimeListView(generics.ListAPIView):
     queryset = AvailableTime.objects.all()
     serializer_class = AvailableTimeSerializer
     permission_classes = [IsParent]
+    pagination_class = IntervalCursorPagination
 
     def get_queryset(self):
         try:
@@ -224,7 +432,40 @@ class AvailableTimeListView(generics.ListAPIView):
 
         return AvailableTime.objects.filter(babysitter=babysitter)
 
-class AvailableTimeActions(viewsets.ModelViewSet):
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        if isinstance(queryset, Response):
+            return queryset
+        window_serializer = TimeWindowSerializer(data=request.data)
+        window_serializer.is_valid(raise_exception=True)
+        window = window_serializer.validated_data
+
+        # Concrete available times, optionally limited to the window
+        if 'from' in window:
+            queryset = queryset.filter(end_time__gt=window['from'])
+        if 'to' in window:
+            queryset = queryset.filter(start_time__lt=window['to'])
+        babysitter_id = request.data.get('babysitter_id')
+        recurring_start, recurring_end = recurring_window(window.get('from'), window.get('to'))
+
+        def available_times(position):
+            concrete = queryset if position is None else queryset.filter(start_time__gte=position)
+            concrete = concrete.order_by('start_time', 'end_time').iterator()
+            # Recurring availability is expanded for the window only
+            occurrences = recurring_intervals(babysitter_id,
+                                              recurring_start if position is None else max(recurring_start, position),
+                                              recurring_end)
+            recurring = (AvailableTime(babysitter_id=babysitter_id, start_time=start_time, end_time=end_time)
+                         for start_time, end_time in occurrences
+                         if position is None or start_time >= position)
+            return heapq.merge(concrete, recurring,
+                               key=lambda available_time: (available_time.start_time, available_time.end_time))
+
+        page = self.paginator.paginate_stream(available_times, request, self)
+        return self.paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+class AvailableTimeActions(ConditionalGetMixin, StreamingListMixin, CachedResponseMixin, FastListMixin,
+                           viewsets.ModelViewSet):
     """
     Manage the available time slots for the logged-in babysitter.
 
@@ -233,6 +474,11 @@ class AvailableTimeActions(viewsets.ModelViewSet):
     queryset = AvailableTime.objects.all()
     serializer_class = AvailableTimeSerializer
     permission_classes = [IsBabysitter]
+    cursor_ordering = 'start_time'
+    cache_per_user = True
+
+    def get_cache_scopes(self, request):
+        return [f'availability:{request.user.Babysitter.id}']
 
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
@@ -245,22 +491,25 @@ class AvailableTimeActions(viewsets.ModelViewSet):
                 {"detail": "Babysitter does not exist."},
                 status=status.HTTP_404_NOT_FOUND)
         
-        # Create the availability time
-        available_time = AvailableTime.objects.create( 
-            babysitter = babysitter, 
-            start_time = serializer.validated_data.get('start_time'), 
-            end_time = serializer.validated_data.get('end_time')
-        )
-        available_time.save()
+        # Create the availability time & its free slots
+        with transaction.atomic():
+            available_time = AvailableTime.objects.create( 
+                babysitter = babysitter, 
+                start_time = serializer.validated_data.get('start_time'), 
+                end_time = serializer.validated_data.get('end_time')
+            )
+            if getattr(settings, 'COALESCE_AVAILABLE_TIMES', False):
+                available_time = coalesce_available_time(available_time)
+            refresh_availability(babysitter.id, available_time.start_time, available_time.end_time)
         return Response(self.get_serializer(available_time).data,status=status.HTTP_201_CREATED)
     
     def get_queryset(self):
-        return AvailableTime.objects.filter(babysitter__user=self.request.user)
+        return AvailableTime.objects.filter(babysitter__user=self.request.user).select_related('babysitter')
     
     def partial_update(self, request, *args, **kwargs):
         instance = self.get_object()
         # Check babysitter's authentication
-        if instance.babysitter.user != request.user:
+        if instance.babysitter.user_id != request.user.id:
             return Response(
                 {"detail": "You do not have permission to update this availability."},
                 status=status.HTTP_403_FORBIDDEN,
@@ -271,9 +520,43 @@ class AvailableTimeActions(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         self.perform_update(serializer)
         return Response(serializer.data)
+
+    def perform_update(self, serializer):
+        old_start, old_end = serializer.instance.start_time, serializer.instance.end_time
+        with transaction.atomic():
+            available_time = serializer.save()
+            if getattr(settings, 'COALESCE_AVAILABLE_TIMES', False):
+                available_time = coalesce_available_time(available_time)
+            # Cover both the old and the new (possibly merged) time period
+            refresh_availability(available_time.babysitter_id,
+                                 min(old_start, available_time.start_time),
+                                 max(old_end, available_time.end_time))
         
     def perform_destroy(self, instance):
+        with transaction.atomic():
             instance.delete()
+            refresh_availability(instance.babysitter_id, instance.start_time, instance.end_time)
+
+class RecurringAvailabilityActions(ConditionalGetMixin, viewsets.ModelViewSet):
+    """
+    Manage the weekly (recurring) availability of the logged-in babysitter.
+
+    Fields required for creating a recurring availability:
+    - **weekday** (int): The day of the week (0 = Monday ... 6 = Sunday).
+    - **start_time** / **end_time** (str): The time of day (an end not after the start means the next day).
+    - **start_date** (str): The first date of the pattern.
+    - **end_date** (str, optional): The last date of the pattern.
+    - **exceptions** (list, optional): Dates without the occurrence.
+    """
+    queryset = RecurringAvailability.objects.all()
+    serializer_class = RecurringAvailabilitySerializer
+    permission_classes = [IsBabysitter]
+
+    def get_queryset(self):
+        return RecurringAvailability.objects.filter(babysitter__user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(babysitter=Babysitter.objects.get(user=self.request.user))
 
 ## ===== Requests =====
 
@@ -315,60 +598,67 @@ class RequestsViewSet(generics.CreateAPIView):
         return Response({"detail":"Request created successfully"} ,
                         status=status.HTTP_201_CREATED)
 
-class ShowRequests(generics.ListAPIView):
+class ShowRequests(ConditionalGetMixin, CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
     Show all requests info created by the logged-in parent / sent to the logged-in babysitter.    
     """
     queryset = Requests.objects.all()
     serializer_class = RequestsSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cache_per_user = True
+
+    def get_cache_scopes(self, request):
+        if hasattr(request.user, 'Parent'):
+            return [f'requests:family:{request.user.Parent.family_id}']
+        return [f'requests:babysitter:{request.user.Babysitter.id}']
 
     def get_queryset(self):
         # depends user type
+        # The profile is cached on the user by the hasattr() check
         if hasattr(self.request.user, 'Parent'):
-            return Requests.objects.filter(family=Parents.objects.get(user=self.request.user))
+            return Requests.objects.filter(family=self.request.user.Parent)
         else:
-            return Requests.objects.filter(babysitter=Babysitter.objects.get(user=self.request.user))
+            return Requests.objects.filter(babysitter=self.request.user.Babysitter)
 
-class RequestDeactivate(generics.RetrieveUpdateAPIView):
+class RequestDeactivate(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     Allows authenticated babysitters and parents to delete the requests sent to/by them (by setting is_active to False).
     """
-    queryset = Requests.objects.all()
+    queryset = Requests.objects.select_related('babysitter', 'family')
     serializer_class = RequestsIsActiveSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         obj = super().get_object()
         # Ensure the logged-in babysitter/parent is the same as the babysitter/parent in the request
-        if obj.babysitter.user != self.request.user and obj.family.user != self.request.user:
+        if obj.babysitter.user_id != self.request.user.id and obj.family.user_id != self.request.user.id:
             raise exceptions.PermissionDenied("You are not authorized to update this request.")
         return obj
 
-class RequestActionsForBabysitter(generics.RetrieveUpdateAPIView):
+class RequestActionsForBabysitter(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     Allows authenticated babysitters to get/edit request status of the requests sent to them.
     """
-    queryset = Requests.objects.all()
+    queryset = Requests.objects.select_related('babysitter')
     serializer_class = RequestsStatusSerializer
     permission_classes = [IsBabysitter]
 
     def get_object(self):
         obj = super().get_object()
         # Ensure the logged-in babysitter is the same as the babysitter in the request
-        if obj.babysitter.user != self.request.user:
+        if obj.babysitter.user_id != self.request.user.id:
             raise exceptions.PermissionDenied("You are not authorized to update this request.")
         return obj
 
 ## ===== Reviews =====
 
-class ReviewsViewSet(viewsets.ModelViewSet):
+class ReviewsViewSet(ConditionalGetMixin, FastListMixin, viewsets.ModelViewSet):
     """
     Manage the reviews created by the logged-in parent.
 
     Allows parents to viewing, adding, editing, or removing their own reviews.
     """
-    queryset =Reviews.objects.all()
+    queryset =Reviews.objects.select_related('family')
     serializer_class = ReviewsSerializer
     permission_classes = [IsParent]
 
@@ -389,22 +679,38 @@ class ReviewsViewSet(viewsets.ModelViewSet):
         if not check_parent_approved_by_babysitter(babysitter, parents):
             return Response({"detail": "Parent not approved by babysitter!"}, status=status.HTTP_404_NOT_FOUND)    
 
-        reviews = Reviews.objects.create(family = parents , 
-                                         babysitter= babysitter ,
-                                         review_text=serializer.validated_data.get('review_text') ,
-                                         rating=serializer.validated_data.get('rating')  )
-
-        reviews.save()
+        with transaction.atomic():
+            reviews = Reviews.objects.create(family = parents , 
+                                             babysitter= babysitter ,
+                                             review_text=serializer.validated_data.get('review_text') ,
+                                             rating=serializer.validated_data.get('rating')  )
+            add_rating(babysitter.id, reviews.rating)
         return Response({"detail":"Review created successfully"} ,
                             status=status.HTTP_201_CREATED)
     
     def get_object(self):
         instance = super().get_object()
-        if instance.family.user != self.request.user:
+        if instance.family.user_id != self.request.user.id:
             raise exceptions.PermissionDenied( "You do not have permission to update this availability.")
         return instance 
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            # The stored rating, not the one read by get_object: a concurrent update may have changed it
+            old_rating = Reviews.objects.select_for_update().values_list('rating', flat=True).get(id=serializer.instance.id)
+            reviews = serializer.save()
+            if reviews.rating != old_rating:
+                remove_rating(reviews.babysitter_id, old_rating)
+                add_rating(reviews.babysitter_id, reviews.rating)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            # A concurrent delete of the same review already removed its rating
+            deleted, _ = Reviews.objects.filter(id=instance.id).delete()
+            if deleted:
+                remove_rating(instance.babysitter_id, instance.rating)
     
-class ShowReviews(generics.ListAPIView):
+class ShowReviews(ConditionalGetMixin, CachedResponseMixin, FastListMixin, generics.ListAPIView):
     """
     Retrieve a list of all reviews for a given babysitter id.
     - **babysitter_id** (int): The id of the babysitter.
@@ -415,6 +721,10 @@ class ShowReviews(generics.ListAPIView):
     serializer_class = ReviewsSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_cache_scopes(self, request):
+        babysitter_id = request.data.get('babysitter_id', None)
+        return None if babysitter_id is None else [f'reviews:{babysitter_id}']
+
     def get_queryset(self):
         id = self.request.data.get('babysitter_id', None)
         if id is None:
@@ -457,42 +767,75 @@ class CreateMeetingView(generics.CreateAPIView):
         if not check_parent_approved_by_babysitter(babysitter, parents):
             return Response({"detail": "Parent not approved by babysitter!"}, status=status.HTTP_404_NOT_FOUND)
 
-        start_time = serializer.validated_data['start_time']
-        end_time = serializer.validated_data['end_time']
-
-        # Check if babysitter is available at the given meeting time
-        available_time = AvailableTime.objects.filter(
-            babysitter=babysitter,
-            start_time__lte=start_time,
-            end_time__gte=end_time
-        ).exists()
-        if not available_time:
-            return Response({"message": "Babysitter is not available at the requested time."},
-                            status=status.HTTP_400_BAD_REQUEST) 
-
-        # Check for existing meeting during the requested time period
-        conflicting_meeting = Meetings.objects.filter(
-            babysitter=babysitter,
-            start_time__lte=end_time,
-            end_time__gte=start_time,
-            status='approved'
-        ).exists()
-        if conflicting_meeting:
-            return Response({"message": "Babysitter is busy during the requested time."},
-                            status=status.HTTP_400_BAD_REQUEST) 
-        
-        # Create & Save the new meeting
-        meeting = Meetings(
-            babysitter=babysitter,
-            family=parents,
-            start_time=start_time,
-            end_time=end_time
-        )    
-        meeting.save()
+        # Check availability and conflicts & save the new meeting atomically
+        try:
+            book_meeting(babysitter.id, parents,
+                         serializer.validated_data['start_time'],
+                         serializer.validated_data['end_time'])
+        except BookingError as error:
+            return Response({"message": str(error)}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({"message": "Meeting created successfully"}, status=status.HTTP_201_CREATED)
 
-class ShowMeetings(generics.ListAPIView):
+class CreateMeetingsBatchView(generics.CreateAPIView):
+    """
+    Allows a parent to create several meetings with a babysitter at once.
+    Fields required for creating the meetings:
+    - **meetings** (list): Items with **start_time** and **end_time** (in datetime format).
+    - **babysitter_id** (int): The babysitter id.
+    - (The `family` field is automatically associated with the currently logged-in parent.)
+
+    Returns a result per item: the valid meetings are created, the invalid ones are reported.
+    """
+    queryset = Meetings.objects.all()
+    serializer_class = MeetingsBatchSerializerForCreating
+    permission_classes = [IsParent]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        items = serializer.validated_data['meetings']
+        if len(items) > MAX_BATCH_MEETINGS:
+            return Response({"detail": f"At most {MAX_BATCH_MEETINGS} meetings can be created at once."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        parents = Parents.objects.get(user=request.user)
+
+        # Check babysitter validity
+        try:
+            babysitter_id = self.request.data.get('babysitter_id', None)
+            if babysitter_id is None:
+                return Response({"detail": "babysitter_id is required."}, status=status.HTTP_404_NOT_FOUND)
+            babysitter = Babysitter.objects.get(id=babysitter_id)
+        except Babysitter.DoesNotExist:
+            return Response({"detail": "Babysitter does not exist."}, status=status.HTTP_404_NOT_FOUND)
+
+        if not check_parent_approved_by_babysitter(babysitter, parents):
+            return Response({"detail": "Parent not approved by babysitter!"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Check start and end time inputs of every item
+        results = [None] * len(items)
+        periods, positions = [], []
+        for position, item in enumerate(items):
+            item_serializer = MeetingsSerializerForCreating(data=item)
+            if item_serializer.is_valid():
+                periods.append((item_serializer.validated_data['start_time'], item_serializer.validated_data['end_time']))
+                positions.append(position)
+            else:
+                results[position] = {**item, "created": False, "errors": item_serializer.errors}
+
+        # Check availability and conflicts of all items & save the valid meetings atomically
+        if periods:
+            for position, (meeting, error) in zip(positions, book_meetings(babysitter.id, parents, periods)):
+                results[position] = {**items[position], "created": meeting is not None}
+                if error:
+                    results[position]["message"] = error
+
+        created = any(result["created"] for result in results)
+        return Response(results, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+class ShowMeetings(ConditionalGetMixin, generics.ListAPIView):
     """
     Show all meetings created by the logged-in parent.    
     This view is used by parents.    
@@ -509,27 +852,55 @@ class ShowMeetings(generics.ListAPIView):
             return Meetings.objects.filter(babysitter__user=user)
         return Meetings.objects.none()
 
-class MeetingActionsForBabysitter(generics.RetrieveUpdateAPIView):
+class MeetingActionsForBabysitter(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     Allows authenticated babysitters to get/edit meeting status of the meetings waits for them.
     """
-    queryset = Meetings.objects.all()
+    queryset = Meetings.objects.select_related('babysitter')
     serializer_class = MeetingsStatusSerializer
     permission_classes = [IsBabysitter]
 
     def get_object(self):
         obj = super().get_object()
         # Ensure the logged-in babysitter is the same as the babysitter in the request
-        if obj.babysitter.user != self.request.user:
+        if obj.babysitter.user_id != self.request.user.id:
             raise exceptions.PermissionDenied("You are not authorized to update this request.")
         return obj
 
+    def perform_update(self, serializer):
+        # Approvals are checked against the other approved meetings under the babysitter lock
+        if serializer.validated_data.get('status') != 'approved':
+            with transaction.atomic():
+                was_approved = serializer.instance.status == 'approved'
+                meeting = serializer.save()
+                # An approved meeting that is no longer approved frees its time again
+                if was_approved:
+                    refresh_availability(meeting.babysitter_id, meeting.start_time, meeting.end_time)
+            return
+        try:
+            serializer.instance, self.declined_meeting_ids = approve_meeting(serializer.instance.babysitter_id,
+                                                                            serializer.instance.id)
+        except BookingError as error:
+            raise exceptions.ValidationError({"message": str(error)})
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        # Report the overlapping pending meetings declined by an approval
+        if hasattr(self, 'declined_meeting_ids'):
+            response.data['declined_meeting_ids'] = self.declined_meeting_ids
+        return response
+
 @api_view(['GET'])
 @permission_classes([IsParent])
+# Without both edges the recurring availability is expanded from now, so only fixed windows are cached
+@cache_response(lambda request: [f"availability:{request.data.get('babysitter_id')}"]
+                if 'from' in request.data and 'to' in request.data else None)
 def show_babysitter_availability_for_meetings(request):
     """
     Show all babysitter availability time windows (both appear in AvailableTime and are not busy with another meeting).
     - **babysitter_id** (int): The id of the babysitter.
+    - **from** (str, optional): Only show free time after this moment (in datetime format).
+    - **to** (str, optional): Only show free time before this moment (in datetime format).
     This view is used by the parent.
     """
     # Validate babysitter ID
@@ -537,57 +908,77 @@ def show_babysitter_availability_for_meetings(request):
     if not babysitter_id:
         return Response({"detail": "babysitter_id is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-    try:
-        babysitter = Babysitter.objects.get(id=babysitter_id)
-    except Babysitter.DoesNotExist:
+    if not Babysitter.objects.filter(id=babysitter_id).exists():
         return Response({"detail": "Babysitter does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
-    # Fetch existing meetings
-    existing_meetings = Meetings.objects.filter(babysitter=babysitter, status='approved')
-
-    # Fetch all available times for the babysitter
-    available_times = AvailableTime.objects.filter(babysitter=babysitter)
-
-    split_available_times = []
-    # Filter and split available times
-    for available_time in available_times:
-        current_start = available_time.start_time
-        current_end = available_time.end_time
-        for meeting in existing_meetings:
-            if current_start < meeting.end_time and current_end > meeting.start_time:
-                # Split the available time into two parts if there's a conflict
-                if current_start < meeting.start_time:
-                    split_available_times.append({
-                        'start_time': current_start,
-                        'end_time': meeting.start_time
-                    })
-                if current_end > meeting.end_time:
-                    current_start = meeting.end_time  # Adjust the current_start for the next segment
-                else:
-                    current_start = None  # No further valid segments after this meeting
-                    break
-        if current_start:
-            split_available_times.append({
-                'start_time': current_start,
-                'end_time': current_end
-            })
+    # Validate the optional time window
+    window_serializer = TimeWindowSerializer(data=request.data)
+    if not window_serializer.is_valid():
+        return Response(window_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    window = window_serializer.validated_data
 
-    # Serialize the result
-    serializer = AvailableTimeSerializer(data=split_available_times, many=True)
-    serializer.is_valid(raise_exception=True)
+    # Subtract the approved meetings from the available times
+    slots = free_slots(babysitter_id, window.get('from'), window.get('to'))
 
+    # Serialize the result
+    serializer = FreeSlotSerializer(slots, many=True, context={'request': request})
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+## ===== Sync =====
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_changes(request):
+    """
+    Return the caller's profile and requests, meetings, availability, kids and reviews changed since the
+    previous sync, with the ids of the deleted ones.
+    - **since** (str, optional): The cursor returned by the previous sync (ISO 8601). Omit for a full sync.
+    """
+    if not hasattr(request.user, 'Parent') and not hasattr(request.user, 'Babysitter'):
+        return Response({"detail": "Only parents and babysitters can sync."}, status=status.HTTP_403_FORBIDDEN)
+
+    since = request.data.get('since', request.query_params.get('since'))
+    if since:
+        since = parse_datetime(str(since))
+        if since is None:
+            return Response({"detail": "since must be an ISO 8601 datetime."}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    return Response(changes_since(request.user, since or None), status=status.HTTP_200_OK)
+
 ## ===== Admin =====
 
-class AdminForBabysitter(viewsets.ModelViewSet):
+class AdminForBabysitter(ConditionalGetMixin, StreamingListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Babysitter.objects.all()
     serializer_class = BabysitterSerializer
     permission_classes = [permissions.IsAdminUser]  # Only admin users can access
 
-class AdminForRequests(viewsets.ModelViewSet):
+class AdminForRequests(ConditionalGetMixin, StreamingListMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Requests.objects.all()
     serializer_class = RequestsSerializer
     permission_classes = [permissions.IsAdminUser]  # Only admin users can access
 
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def export_table(request, table, file_format):
+    """
+    Download a whole table (babysitters, meetings, requests or reviews) as CSV or NDJSON, streamed.
+    - **from** (str, optional): Only export the rows created at or after this moment (in datetime format).
+    - **to** (str, optional): Only export the rows created before this moment (in datetime format).
+    """
+    if table not in EXPORTS or file_format not in EXPORT_FORMATS:
+        return Response({"detail": "Unknown table or format."}, status=status.HTTP_404_NOT_FOUND)
+    window_serializer = TimeWindowSerializer(data=request.query_params or request.data)
+    window_serializer.is_valid(raise_exception=True)
+    window = window_serializer.validated_data
+    return export_response(table, file_format, window.get('from'), window.get('to'))
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def show_cache_stats(request):
+    """
+    Show the response cache hit/miss counters of this process, per endpoint and in total.
+    """
+    return Response(cache_stats(), status=status.HTTP_200_OK)
+
 # ...
\ No newline at end of file
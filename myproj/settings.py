@@ -49,9 +49,48 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
  
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'base.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'base.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_FILTER_BACKENDS': (
+        'base.fieldsets.SparseFieldsFilter',
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'base.pagination.CursorPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Merge overlapping / touching available times of a babysitter when they are written (off by default: clients
+# then see their own rows as they wrote them, and the coalesce_available_times command can merge them in bulk)
+COALESCE_AVAILABLE_TIMES = False
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+# Cache (alias in CACHES) and timeout in seconds of the read endpoints responses
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Deletions are kept this long for the delta sync, older cursors get a full sync
+SYNC_TOMBSTONE_RETENTION = timedelta(days=30)
+
+# Geocoder of the babysitters / parents addresses: a class with a geocode(address) -> (latitude, longitude) method
+GEOCODER = 'base.geo.CityGeocoder'
+
+# Babysitter recommendations (see base.recommendations): relative weights of the signals and the number of
+# babysitters stored per parent by the recompute_recommendations job
+RECOMMENDATION_WEIGHTS = {'distance': 0.3, 'rating': 0.25, 'price': 0.15, 'availability': 0.15, 'approval': 0.15}
+RECOMMENDATION_TOP_K = 50
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=25),